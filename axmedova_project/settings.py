@@ -103,6 +103,32 @@ else:
         }
     }
 
+# Cache
+# Файловый кеш общий для всех процессов Passenger на одном сервере
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+    }
+}
+
+# Время жизни профиля в памяти процесса (секунды)
+PROFILE_CACHE_TIMEOUT = config('PROFILE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Время жизни закешированных страниц (секунды)
+# Страницы также сбрасываются при изменении контента в админке
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Счетчики просмотров: 'memory' (буфер процесса) или 'cache' (нужен атомарный incr, Redis/Memcached)
+# В режиме 'memory' каждый процесс записывает свои просмотры сам; накопленное
+# процессом, который был убит, теряется (до VIEW_COUNTER_MAX_PENDING просмотров
+# или VIEW_COUNTER_FLUSH_INTERVAL секунд), а команда flush_view_counters
+# бесполезна. В режиме 'cache' команду нужно запускать по cron.
+VIEW_COUNTER_BACKEND = config('VIEW_COUNTER_BACKEND', default='memory')
+VIEW_COUNTER_FLUSH_INTERVAL = config('VIEW_COUNTER_FLUSH_INTERVAL', default=60, cast=int)
+VIEW_COUNTER_MAX_PENDING = config('VIEW_COUNTER_MAX_PENDING', default=100, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -154,8 +180,28 @@ if USE_R2_STORAGE:
     
     # Object parameters теперь настроены в storage_backends.py для каждого типа отдельно
     
+    # Политика сжатия медиа (core/compression.py): объем образца и минимальная
+    # экономия, при которой текстовый файл сохраняется в gzip
+    MEDIA_COMPRESSION_SAMPLE = config('MEDIA_COMPRESSION_SAMPLE', default=64 * 1024, cast=int)
+    MEDIA_COMPRESSION_MIN_SAVING = config('MEDIA_COMPRESSION_MIN_SAVING', default=0.1, cast=float)
+    
+    # Загрузка больших файлов из админки напрямую в R2 (core/direct_uploads.py)
+    DIRECT_UPLOADS = config('DIRECT_UPLOADS', default=True, cast=bool)
+    DIRECT_UPLOAD_PART_SIZE = config('DIRECT_UPLOAD_PART_SIZE', default=8 * 1024 * 1024, cast=int)
+    DIRECT_UPLOAD_URL_EXPIRES = 3600
+    # Загрузка на сервере (boto3): части по 8 МБ в 8 потоков для файлов от 16 МБ
+    MEDIA_MULTIPART_THRESHOLD = 16 * 1024 * 1024
+    MEDIA_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+    MEDIA_UPLOAD_CONCURRENCY = config('MEDIA_UPLOAD_CONCURRENCY', default=8, cast=int)
+    
+    # Локальный кеш медиа, которые читает Django (core/media_cache.py):
+    # объем в байтах (0 — выключен) и интервал проверки ETag в секундах
+    MEDIA_CACHE_DIR = config('MEDIA_CACHE_DIR', default=str(BASE_DIR / 'cache' / 'media'))
+    MEDIA_CACHE_SIZE = config('MEDIA_CACHE_SIZE', default=512 * 1024 * 1024, cast=int)
+    MEDIA_CACHE_REVALIDATE = config('MEDIA_CACHE_REVALIDATE', default=300, cast=int)
+    
     # Media files on R2
-    DEFAULT_FILE_STORAGE = 'core.storage_backends.MediaStorage'
+    DEFAULT_FILE_STORAGE = 'core.storage_backends.CachedMediaStorage'
     # URL для media - без bucket name, т.к. storage class добавляет location
     if AWS_S3_CUSTOM_DOMAIN:
         MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/media/'
@@ -164,7 +210,11 @@ if USE_R2_STORAGE:
     
     # Static files - загрузка на R2 для экономии места
     if USE_R2_FOR_STATIC:
-        STATICFILES_STORAGE = 'core.storage_backends.StaticStorage'
+        # Сборка с хешами и .gz/.br локально, на R2 загружаются только изменения
+        STATICFILES_STORAGE = 'core.storage_backends.R2ManifestStaticStorage'
+        STATIC_UPLOAD_WORKERS = config('STATIC_UPLOAD_WORKERS', default=8, cast=int)
+        # Кеширование файлов без хеша в имени (плагины CKEditor и т.п.)
+        STATIC_UNHASHED_MAX_AGE = config('STATIC_UNHASHED_MAX_AGE', default=3600, cast=int)
         # URL для static - без bucket name, т.к. storage class добавляет location
         if AWS_S3_CUSTOM_DOMAIN:
             STATIC_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/static/'
@@ -192,12 +242,37 @@ else:
     # Local storage (default)
     MEDIA_URL = '/media/'
     MEDIA_ROOT = config('MEDIA_ROOT', default=BASE_DIR / 'media')
+    DEFAULT_FILE_STORAGE = 'core.storage_backends.LocalMediaStorage'
     STATIC_ROOT = config('STATIC_ROOT', default=BASE_DIR / 'staticfiles')
+    # Имена с хешем + .gz/.br версии для WhiteNoise
+    STATICFILES_STORAGE = 'core.storage_backends.ManifestStaticStorage'
+    # Отдача медиа веб-сервером (см. core/media.py): '', 'x-sendfile' или 'x-accel-redirect'
+    MEDIA_SENDFILE = config('MEDIA_SENDFILE', default='')
+    MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+
+
+# Адаптивные версии изображений (WebP + JPEG), создаются при загрузке
+IMAGE_DERIVATIVE_WIDTHS = tuple(
+    int(width) for width in config('IMAGE_DERIVATIVE_WIDTHS', default='320,640,960,1280').split(',')
+)
+IMAGE_DERIVATIVE_QUALITY = config('IMAGE_DERIVATIVE_QUALITY', default=80, cast=int)
+# Ширина превью первой страницы PDF (книги, публикации) в пикселях
+PDF_PREVIEW_WIDTH = config('PDF_PREVIEW_WIDTH', default=960, cast=int)
 
+# Загружаемые файлы хранятся под именем по хешу содержимого (повторная
+# загрузка не создает копию), у изображений удаляется EXIF и ограничивается
+# размер по большей стороне (core/uploads.py)
+MEDIA_CONTENT_ADDRESSED = config('MEDIA_CONTENT_ADDRESSED', default=True, cast=bool)
+MEDIA_MAX_IMAGE_SIZE = config('MEDIA_MAX_IMAGE_SIZE', default=2560, cast=int)
 
 # CKEditor Configuration
 CKEDITOR_UPLOAD_PATH = "uploads/"
-CKEDITOR_IMAGE_BACKEND = "pillow"
+# Без каталогов по датам: одинаковые картинки в разные дни — один файл
+CKEDITOR_RESTRICT_BY_DATE = False
+# Backend как "pillow", но записывает загрузки в реестр для браузера файлов
+CKEDITOR_IMAGE_BACKEND = "core.editor_uploads.RegistryBackend"
+# Файлов на странице браузера CKEditor (core/editor_uploads.py)
+EDITOR_BROWSE_PER_PAGE = 48
 CKEDITOR_JQUERY_URL = 'https://ajax.googleapis.com/ajax/libs/jquery/2.2.4/jquery.min.js'
 
 CKEDITOR_CONFIGS = {
@@ -238,6 +313,11 @@ if 'test' in sys.argv:
     STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
     if not USE_R2_STORAGE:
         STATIC_ROOT = config('STATIC_ROOT', default=BASE_DIR / 'staticfiles')
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -259,6 +339,27 @@ ADMIN_EMAIL = config('ADMIN_EMAIL', default='admin@example.com')
 # Telegram Bot Configuration
 TELEGRAM_BOT_TOKEN = config('TELEGRAM_BOT_TOKEN', default='')
 TELEGRAM_CHAT_ID = config('TELEGRAM_CHAT_ID', default='')
+TELEGRAM_API_URL = config('TELEGRAM_API_URL', default='https://api.telegram.org')
+TELEGRAM_TIMEOUT = config('TELEGRAM_TIMEOUT', default=10, cast=float)
+# Лимит Telegram: ~1 сообщение в секунду на чат (20 в минуту для групп)
+TELEGRAM_RATE_LIMIT = config('TELEGRAM_RATE_LIMIT', default=1.0, cast=float)
+TELEGRAM_RATE_BURST = config('TELEGRAM_RATE_BURST', default=3, cast=int)
+# Circuit breaker: после N ошибок подряд API не вызывается RESET секунд
+TELEGRAM_BREAKER_THRESHOLD = config('TELEGRAM_BREAKER_THRESHOLD', default=5, cast=int)
+TELEGRAM_BREAKER_RESET = config('TELEGRAM_BREAKER_RESET', default=60, cast=int)
+# Сводка заказов: окно в секундах (0 — отправлять каждый заказ сразу)
+# и число заказов, после которого сводка уходит не дожидаясь конца окна
+TELEGRAM_DIGEST_WINDOW = config('TELEGRAM_DIGEST_WINDOW', default=0, cast=int)
+TELEGRAM_DIGEST_MAX_ORDERS = config('TELEGRAM_DIGEST_MAX_ORDERS', default=20, cast=int)
+
+# Outbox уведомлений (manage.py process_outbox)
+# Повторы: OUTBOX_RETRY_BASE * 2^(n-1) секунд, не больше OUTBOX_RETRY_MAX
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=8, cast=int)
+OUTBOX_RETRY_BASE = config('OUTBOX_RETRY_BASE', default=30, cast=int)
+OUTBOX_RETRY_MAX = config('OUTBOX_RETRY_MAX', default=3600, cast=int)
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=50, cast=int)
+# Время резервирования сообщения воркером (должно превышать таймаут отправки)
+OUTBOX_LEASE = config('OUTBOX_LEASE', default=300, cast=int)
 
 # Security Settings for Production
 if not DEBUG:
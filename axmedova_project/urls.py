@@ -8,6 +8,8 @@ from django.conf.urls.static import static
 from django.contrib.sitemaps.views import sitemap
 from django.views.generic import TemplateView
 from core.sitemaps import StaticViewSitemap, BlogPostSitemap, PublicationSitemap, BookSitemap
+from core.media import media_urlpatterns
+from core.editor_uploads import editor_urlpatterns
 
 sitemaps = {
     'static': StaticViewSitemap,
@@ -18,17 +20,18 @@ sitemaps = {
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('ckeditor/', include('ckeditor_uploader.urls')),
+    path('ckeditor/', include(editor_urlpatterns())),
     path('', include('core.urls')),
     path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
     path('robots.txt', TemplateView.as_view(template_name='robots.txt', content_type='text/plain'), name='robots'),
 ]
 
 # Serve media files in development and production (fallback)
+# Медиа отдаются с поддержкой Range/304 и X-Sendfile (core/media.py)
 # Не обслуживаем статику локально, если используется R2
 if settings.DEBUG:
     if hasattr(settings, 'MEDIA_ROOT') and settings.MEDIA_ROOT:
-        urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+        urlpatterns += media_urlpatterns()
     # Статика через R2 не обслуживается локально
     if hasattr(settings, 'STATIC_ROOT') and settings.STATIC_ROOT and not (hasattr(settings, 'USE_R2_STORAGE') and settings.USE_R2_STORAGE and getattr(settings, 'USE_R2_FOR_STATIC', False)):
         urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -36,7 +39,7 @@ else:
     # Serve media files in production as fallback (when .htaccess doesn't work)
     # Только если не используется R2
     if hasattr(settings, 'MEDIA_ROOT') and settings.MEDIA_ROOT and not (hasattr(settings, 'USE_R2_STORAGE') and settings.USE_R2_STORAGE):
-        urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+        urlpatterns += media_urlpatterns()
 
 # Customize admin site
 admin.site.site_header = "Ахмедова Феруза Медетовна - Администрирование"
@@ -3,8 +3,10 @@ from django.utils.html import format_html
 from .models import (
     Profile, Service, Publication, Project, BlogPost,
     ServiceOrder, Achievement, Testimonial, ContactMessage,
-    Book, BookOrder
+    Book, BookOrder, OutboxMessage, MediaCompression, MediaReference, EditorUpload
 )
+from .outbox import requeue
+from .direct_uploads import DirectUploadAdminMixin
 
 
 @admin.register(Profile)
@@ -39,7 +41,8 @@ class ServiceAdmin(admin.ModelAdmin):
 
 
 @admin.register(Publication)
-class PublicationAdmin(admin.ModelAdmin):
+class PublicationAdmin(DirectUploadAdminMixin, admin.ModelAdmin):
+    direct_upload_fields = ('pdf_file',)
     list_display = ['title', 'publication_type', 'year', 'citation_count', 'is_featured', 'created_at']
     list_filter = ['publication_type', 'year', 'is_featured']
     search_fields = ['title', 'authors', 'keywords', 'abstract']
@@ -191,7 +194,11 @@ class ContactMessageAdmin(admin.ModelAdmin):
 
 
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(DirectUploadAdminMixin, admin.ModelAdmin):
+    # При R2 PDF загружается из браузера напрямую в bucket. Обложка идет
+    # обычным способом: прямая загрузка минует нормализацию изображений
+    # (EXIF, размер) и имена по содержимому (core/uploads.py)
+    direct_upload_fields = ('pdf_file',)
     list_display = ['title', 'author', 'publication_year', 'price', 'is_available', 'is_featured', 'views_count']
     list_filter = ['is_available', 'is_featured', 'publication_year', 'language']
     search_fields = ['title', 'author', 'description', 'isbn']
@@ -265,3 +272,51 @@ class BookOrderAdmin(admin.ModelAdmin):
         qs = super().get_queryset(request)
         return qs.select_related('book')
 
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'channel', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'channel', 'created_at']
+    readonly_fields = ['channel', 'payload', 'attempts', 'last_error', 'created_at', 'sent_at']
+    ordering = ['-created_at']
+    date_hierarchy = 'created_at'
+    actions = ['requeue_messages']
+    
+    def requeue_messages(self, request, queryset):
+        """Повторная отправка выбранных уведомлений"""
+        count = requeue(queryset)
+        self.message_user(request, f"Поставлено в очередь: {count}")
+    requeue_messages.short_description = 'Отправить повторно'
+
+
+@admin.register(MediaCompression)
+class MediaCompressionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'content_type', 'reason', 'original_size', 'stored_size', 'sample_ratio', 'created_at']
+    list_filter = ['reason', 'content_type', 'created_at']
+    search_fields = ['name']
+    readonly_fields = [field.name for field in MediaCompression._meta.fields]
+    ordering = ['-created_at']
+    date_hierarchy = 'created_at'
+
+
+@admin.register(MediaReference)
+class MediaReferenceAdmin(admin.ModelAdmin):
+    list_display = ['name', 'model', 'object_id', 'field', 'updated_at']
+    list_filter = ['model', 'field']
+    search_fields = ['name']
+    readonly_fields = [field.name for field in MediaReference._meta.fields]
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(EditorUpload)
+class EditorUploadAdmin(admin.ModelAdmin):
+    list_display = ['original_name', 'name', 'is_image', 'width', 'height', 'size', 'uploaded_at']
+    list_filter = ['is_image', 'uploaded_at']
+    search_fields = ['original_name', 'name']
+    readonly_fields = [field.name for field in EditorUpload._meta.fields]
+    date_hierarchy = 'uploaded_at'
+    
+    def has_add_permission(self, request):
+        return False
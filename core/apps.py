@@ -1,3 +1,5 @@
+import atexit
+
 from django.apps import AppConfig
 
 
@@ -9,4 +11,8 @@ class CoreConfig(AppConfig):
     def ready(self):
         """Импорт signals при загрузке приложения"""
         import core.signals
+        
+        # Сохранить накопленные просмотры при остановке процесса
+        from core.counters import flush_on_exit
+        atexit.register(flush_on_exit)
 
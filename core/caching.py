@@ -0,0 +1,253 @@
+"""
+Кеширование часто используемых данных сайта
+"""
+
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.views.decorators.http import condition
+
+from .models import Profile
+
+
+PROFILE_VERSION_KEY = 'core:profile:version'
+
+# Профиль, закешированный в памяти текущего процесса
+_profile_state = {
+    'version': None,
+    'profile': None,
+    'loaded_at': 0.0,
+}
+
+
+def _profile_version():
+    """Текущая версия профиля в общем кеше (одна на все процессы)"""
+    version = cache.get(PROFILE_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(PROFILE_VERSION_KEY, version, None):
+            version = cache.get(PROFILE_VERSION_KEY, version)
+    return version
+
+
+def get_profile(request=None):
+    """
+    Получить профиль социолога с кешированием
+
+    Профиль хранится в памяти процесса и сверяется с версией в общем кеше,
+    поэтому изменение в админке видно всем процессам Passenger.
+    В пределах одного запроса результат запоминается на объекте request.
+
+    Args:
+        request: HttpRequest (необязательно)
+
+    Returns:
+        Profile или None, если профиль не создан
+    """
+    if request is not None and hasattr(request, '_cached_profile'):
+        return request._cached_profile
+
+    version = _profile_version()
+    timeout = getattr(settings, 'PROFILE_CACHE_TIMEOUT', 300)
+    is_fresh = (
+        _profile_state['version'] == version
+        and time.monotonic() - _profile_state['loaded_at'] < timeout
+    )
+
+    if not is_fresh:
+        _profile_state['profile'] = Profile.objects.first()
+        _profile_state['version'] = version
+        _profile_state['loaded_at'] = time.monotonic()
+
+    profile = _profile_state['profile']
+    if request is not None:
+        request._cached_profile = profile
+    return profile
+
+
+def invalidate_profile():
+    """Сбросить закешированный профиль во всех процессах"""
+    _profile_state['version'] = None
+    _profile_state['profile'] = None
+    cache.set(PROFILE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+# --- Кеш страниц с учетом зависимостей от моделей ---
+
+PAGE_VERSION_KEY = 'core:page-version:{label}'
+PAGE_KEY = 'core:page:{digest}'
+
+# Модели, от которых зависят страницы: label -> модель
+_page_dependencies = {}
+
+
+def _model_label(model):
+    return model._meta.label_lower
+
+
+def _model_versions(labels):
+    """Текущие версии моделей (один запрос к кешу)"""
+    keys = {PAGE_VERSION_KEY.format(label=label): label for label in labels}
+    stored = cache.get_many(list(keys))
+    versions = {}
+    for key, label in keys.items():
+        version = stored.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.add(key, version, None)
+            version = cache.get(key, version)
+        versions[label] = version
+    return versions
+
+
+def invalidate_pages(model):
+    """
+    Сбросить все закешированные страницы, зависящие от модели
+
+    Версия меняется после коммита транзакции: иначе параллельный запрос
+    успел бы закешировать страницу со старыми данными под новой версией,
+    и она жила бы весь PAGE_CACHE_TIMEOUT. Вне транзакции — сразу.
+    """
+    key = PAGE_VERSION_KEY.format(label=_model_label(model))
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, None))
+
+
+def is_page_dependency(model):
+    """Используется ли модель хотя бы одной закешированной страницей"""
+    return _model_label(model) in _page_dependencies
+
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return False
+    # Flash-сообщения показываются один раз и не должны попасть в кеш
+    storage = getattr(request, '_messages', None)
+    if storage is not None and len(storage):
+        return False
+    return True
+
+
+def _is_cacheable_response(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not response.has_header('Set-Cookie')
+    )
+
+
+def cached_page(*models, params=()):
+    """
+    Декоратор кеширования страницы для анонимных GET-запросов
+
+    Страница зависит от перечисленных моделей (и всегда от Profile, который
+    выводится в шаблоне base.html). Сохранение или удаление объекта любой
+    из этих моделей сбрасывает только зависящие от нее страницы.
+
+    Args:
+        models: Модели, из которых строится страница
+        params: GET-параметры, влияющие на содержимое страницы
+    """
+    labels = sorted({_model_label(model) for model in (Profile,) + models})
+    for model in (Profile,) + models:
+        _page_dependencies[_model_label(model)] = model
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            versions = _model_versions(labels)
+            key_parts = [
+                view_func.__module__,
+                view_func.__name__,
+                request.get_host(),
+                repr(args),
+                repr(sorted(kwargs.items())),
+                repr([(name, request.GET.get(name, '')) for name in params]),
+                repr(sorted(versions.items())),
+            ]
+            digest = hashlib.md5('|'.join(key_parts).encode('utf-8')).hexdigest()
+            key = PAGE_KEY.format(digest=digest)
+
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if _is_cacheable_response(response):
+                timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 3600)
+                cache.set(key, response, timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+# --- Условные запросы (ETag / Last-Modified) ---
+
+def latest_change(queryset):
+    """
+    Время последнего изменения и количество объектов одним запросом
+
+    Количество входит в ETag, чтобы удаление объекта тоже меняло валидатор.
+    """
+    result = queryset.aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    if result['last_modified'] is None:
+        return None
+    return result['last_modified'], result['count']
+
+
+def _page_validators(state, request):
+    """Собрать ETag и Last-Modified с учетом профиля из base.html"""
+    if state is None:
+        return None, None
+    last_modified, count = state
+    profile = get_profile(request)
+    if profile is not None and profile.updated_at > last_modified:
+        last_modified = profile.updated_at
+    raw = f'{last_modified.isoformat()}|{count}|{profile.pk if profile else 0}'
+    etag = '"%s"' % hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return etag, last_modified
+
+
+def conditional_page(state_func):
+    """
+    Декоратор условных GET-запросов для страниц контента
+
+    state_func(request, *args, **kwargs) возвращает (updated_at, count) или None.
+    На запрос с If-None-Match / If-Modified-Since отвечает 304 после одного
+    легкого запроса к БД, не вызывая view и не рендеря шаблон.
+
+    Args:
+        state_func: Функция получения состояния страницы (см. latest_change)
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            validators = {}
+
+            def get_validators(req, *a, **kw):
+                if 'value' not in validators:
+                    validators['value'] = _page_validators(state_func(req, *a, **kw), req)
+                return validators['value']
+
+            conditional_view = condition(
+                etag_func=lambda req, *a, **kw: get_validators(req, *a, **kw)[0],
+                last_modified_func=lambda req, *a, **kw: get_validators(req, *a, **kw)[1],
+            )(view_func)
+            return conditional_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,149 @@
+"""
+Политика сжатия медиа файлов при загрузке в MediaStorage (R2)
+
+Раньше gzip применялся ко всем файлам из gzip_content_types, включая PDF.
+PDF, изображения и архивы уже сжаты внутри: gzip тратил CPU и память при
+загрузке, часто увеличивал файл и ломал Range-запросы к R2 (объект с
+Content-Encoding: gzip нельзя читать по диапазонам).
+
+Теперь для каждого файла:
+    1. Сжимаются только текстовые типы (gzip_content_types хранилища).
+    2. По первым MEDIA_COMPRESSION_SAMPLE байтам оценивается степень сжатия;
+       если экономия меньше MEDIA_COMPRESSION_MIN_SAVING, файл хранится как есть.
+    3. Решение, размеры и степень сжатия образца записываются в
+       MediaCompression — по ним команда media_compression_report считает
+       экономию места.
+"""
+
+import gzip
+import tempfile
+import zlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+
+
+# Форматы со встроенным сжатием: gzip не уменьшит их заметно
+PRECOMPRESSED_TYPES = (
+    'application/pdf',
+    'application/zip',
+    'application/gzip',
+    'application/x-7z-compressed',
+    'application/vnd.openxmlformats-officedocument.',
+    'image/jpeg',
+    'image/png',
+    'image/webp',
+    'image/gif',
+    'image/avif',
+    'font/woff',
+    'audio/',
+    'video/',
+)
+
+Decision = namedtuple('Decision', ['reason', 'encoding', 'sample_ratio'])
+
+
+def is_precompressed(content_type):
+    return (content_type or '').startswith(PRECOMPRESSED_TYPES)
+
+
+def sample_ratio(content, size=None):
+    """
+    Степень сжатия (gzip / исходный размер) первых size байт файла
+
+    Позиция в файле восстанавливается; для пустого файла возвращается None.
+    """
+    size = size or getattr(settings, 'MEDIA_COMPRESSION_SAMPLE', 64 * 1024)
+    position = content.tell()
+    sample = content.read(size)
+    content.seek(position)
+    if not sample:
+        return None
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: формат gzip
+    compressed = compressor.compress(sample) + compressor.flush()
+    return len(compressed) / len(sample)
+
+
+def decide(content, content_type, compressible_types):
+    """
+    Решить, сжимать ли файл
+
+    Args:
+        content: Файл (seekable), позиция — начало данных
+        content_type: MIME тип
+        compressible_types: Типы, которые в принципе имеет смысл сжимать
+
+    Returns:
+        Decision: reason ('compressed', 'precompressed', 'low_ratio',
+            'not_text'), encoding ('gzip' или '') и степень сжатия образца
+    """
+    ratio = sample_ratio(content)
+    if is_precompressed(content_type):
+        return Decision('precompressed', '', ratio)
+    if content_type not in compressible_types:
+        return Decision('not_text', '', ratio)
+    if ratio is None or ratio > 1 - getattr(settings, 'MEDIA_COMPRESSION_MIN_SAVING', 0.1):
+        return Decision('low_ratio', '', ratio)
+    return Decision('compressed', 'gzip', ratio)
+
+
+def gzip_content(content):
+    """
+    Сжать файл gzip во временный файл (в памяти до 1 МБ)
+
+    Returns:
+        SpooledTemporaryFile: Сжатые данные, позиция — начало
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    with gzip.GzipFile(mode='wb', fileobj=output, mtime=0) as archive:
+        for chunk in iter(lambda: content.read(64 * 1024), b''):
+            archive.write(chunk)
+    output.seek(0)
+    return output
+
+
+def record(name, content_type, decision, original_size, stored_size):
+    """
+    Сохранить решение о сжатии (ошибка записи не прерывает загрузку)
+
+    Запись идет в отдельной точке сохранения: файл часто сохраняется внутри
+    транзакции вызывающего кода (admin), и ошибка БД не должна ее ломать.
+    """
+    from .models import MediaCompression
+
+    try:
+        with transaction.atomic():
+            MediaCompression.objects.create(
+                name=name,
+                content_type=content_type[:100],
+                reason=decision.reason,
+                encoding=decision.encoding,
+                original_size=original_size,
+                stored_size=stored_size,
+                sample_ratio=decision.sample_ratio,
+            )
+    except Exception as e:
+        print(f"❌ Не удалось записать решение о сжатии {name}: {e}")
+
+
+def savings(queryset):
+    """
+    Экономия места по записям MediaCompression
+
+    Returns:
+        dict: reason -> {'files', 'original', 'stored', 'saved'}; для
+        несжатых файлов 'saved' — оценка прироста, которого удалось избежать
+        (по степени сжатия образца > 1)
+    """
+    report = {}
+    for item in queryset.only('reason', 'original_size', 'stored_size', 'sample_ratio').iterator():
+        row = report.setdefault(item.reason, {'files': 0, 'original': 0, 'stored': 0, 'saved': 0})
+        row['files'] += 1
+        row['original'] += item.original_size
+        row['stored'] += item.stored_size
+        if item.reason == 'compressed':
+            row['saved'] += item.original_size - item.stored_size
+        elif item.sample_ratio and item.sample_ratio > 1:
+            row['saved'] += round(item.original_size * (item.sample_ratio - 1))
+    return report
@@ -1,14 +1,14 @@
 """
 Context processors for making data available in all templates
 """
-from .models import Profile
+from .caching import get_profile
 
 
 def site_context(request):
     """
     Добавляет профиль и другую общую информацию во все шаблоны
     """
-    profile = Profile.objects.first()
+    profile = get_profile(request)
     
     return {
         'profile': profile,
@@ -0,0 +1,152 @@
+"""
+Буферизованные счетчики просмотров
+
+Просмотры копятся в памяти процесса (или в общем кеше) и периодически
+записываются в БД пакетными UPDATE ... SET views_count = views_count + n,
+вместо read-modify-write save() на каждый просмотр страницы.
+
+VIEW_COUNTER_BACKEND:
+    - 'memory': у каждого процесса свой буфер, он записывается самим
+      процессом (по VIEW_COUNTER_MAX_PENDING / VIEW_COUNTER_FLUSH_INTERVAL и
+      при выходе). Просмотры, накопленные процессом, который был убит
+      (kill -9, OOM, перезапуск Passenger), теряются. Команда
+      flush_view_counters видит только собственный пустой буфер.
+    - 'cache': просмотры копятся в общем кеше (нужен атомарный incr —
+      Redis/Memcached) и записываются командой flush_view_counters по cron;
+      остановка процесса их не теряет.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+
+# Модели со счетчиком просмотров; объекты идентифицируются по slug
+COUNTED_MODELS = ('core.blogpost', 'core.book')
+
+VIEWS_KEY = 'core:views:{label}:{slug}'
+VIEWS_DIRTY_KEY = 'core:views:dirty:{label}'
+
+
+class ViewCounterBuffer:
+    """Потокобезопасный буфер просмотров в памяти процесса"""
+
+    def __init__(self):
+        self._pending = defaultdict(int)
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add(self, label, slug, count=1):
+        with self._lock:
+            self._pending[(label, slug)] += count
+            return len(self._pending)
+
+    def is_due(self):
+        interval = getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 60)
+        return time.monotonic() - self._last_flush >= interval
+
+    def drain(self):
+        """Забрать накопленные просмотры и очистить буфер"""
+        with self._lock:
+            pending = dict(self._pending)
+            self._pending.clear()
+            self._last_flush = time.monotonic()
+        return pending
+
+
+_buffer = ViewCounterBuffer()
+_flush_lock = threading.Lock()
+
+
+def _use_cache():
+    return getattr(settings, 'VIEW_COUNTER_BACKEND', 'memory') == 'cache'
+
+
+def is_shared():
+    """Копятся ли просмотры в общем кеше (видны всем процессам)"""
+    return _use_cache()
+
+
+def record_view(model, slug):
+    """
+    Учесть просмотр объекта
+
+    Args:
+        model: Модель со счетчиком views_count (BlogPost или Book)
+        slug: Slug просмотренного объекта
+    """
+    label = model._meta.label_lower
+
+    if _use_cache():
+        # Для backend'ов с атомарным incr (Redis, Memcached)
+        key = VIEWS_KEY.format(label=label, slug=slug)
+        cache.add(key, 0, None)
+        cache.incr(key)
+        cache.set(VIEWS_DIRTY_KEY.format(label=label), True, None)
+        return
+
+    pending = _buffer.add(label, slug)
+    max_pending = getattr(settings, 'VIEW_COUNTER_MAX_PENDING', 100)
+    if pending >= max_pending or _buffer.is_due():
+        flush_view_counters()
+
+
+def _drain_cache():
+    """Забрать накопленные просмотры из общего кеша"""
+    pending = defaultdict(int)
+    for label in COUNTED_MODELS:
+        dirty_key = VIEWS_DIRTY_KEY.format(label=label)
+        if not cache.get(dirty_key):
+            continue
+        cache.delete(dirty_key)
+
+        model = apps.get_model(label)
+        slugs = model.objects.values_list('slug', flat=True)
+        keys = {VIEWS_KEY.format(label=label, slug=slug): slug for slug in slugs}
+        for key, count in cache.get_many(list(keys)).items():
+            if count:
+                cache.decr(key, count)
+                pending[(label, keys[key])] += count
+    return pending
+
+
+def flush_view_counters():
+    """
+    Записать накопленные просмотры в БД
+
+    Объекты с одинаковым приростом обновляются одним UPDATE.
+
+    Returns:
+        int: Количество учтенных просмотров
+    """
+    with _flush_lock:
+        pending = defaultdict(int)
+        for item, count in _buffer.drain().items():
+            pending[item] += count
+        if _use_cache():
+            for item, count in _drain_cache().items():
+                pending[item] += count
+
+        # (label, прирост) -> список slug
+        batches = defaultdict(list)
+        for (label, slug), count in pending.items():
+            batches[(label, count)].append(slug)
+
+        for (label, count), slugs in batches.items():
+            model = apps.get_model(label)
+            model.objects.filter(slug__in=slugs).update(views_count=F('views_count') + count)
+
+        return sum(pending.values())
+
+
+def flush_on_exit():
+    """Сохранить просмотры при остановке процесса (atexit)"""
+    try:
+        flush_view_counters()
+    except Exception as e:
+        print(f"❌ Ошибка при сохранении счетчиков просмотров: {e}")
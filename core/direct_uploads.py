@@ -0,0 +1,308 @@
+"""
+Загрузка больших файлов из админки напрямую в R2 (presigned multipart)
+
+Раньше PDF книги шел через процесс Passenger (Django принимал весь файл,
+затем boto3 отправлял его в R2), занимая процесс на все время передачи.
+Теперь при R2 виджет файла в админке:
+    1. запрашивает у Django план загрузки (create_upload): ключ объекта,
+       размер части и presigned URL для каждой части;
+    2. загружает части из браузера прямо в R2, по несколько параллельно;
+    3. завершает загрузку (complete_upload) и получает подписанный токен;
+    4. отправляет форму только с токеном — Django проверяет подпись и
+       сохраняет в поле имя уже загруженного объекта.
+
+Если прямая загрузка не удалась, файл остается в поле и отправляется
+обычным способом. Для чтения ETag частей в CORS bucket должен быть
+ExposeHeaders: ETag (см. R2_SETUP.txt).
+"""
+
+import math
+
+from django import forms
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.utils.html import format_html
+from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+
+
+UPLOAD_SALT = 'core.direct_upload.pending'
+FILE_SALT = 'core.direct_upload.file'
+
+# Ограничения S3/R2 для multipart: часть не меньше 5 МБ, не больше 10000 частей
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+
+def is_enabled(storage):
+    """Прямая загрузка возможна только в S3-совместимое хранилище (R2)"""
+    return getattr(settings, 'DIRECT_UPLOADS', True) and isinstance(storage, S3Boto3Storage)
+
+
+def field_label(model_field):
+    """Метка поля в токенах: 'core.book.pdf_file'"""
+    return f'{model_field.model._meta.label_lower}.{model_field.name}'
+
+
+def part_size(size):
+    """Размер части: DIRECT_UPLOAD_PART_SIZE, но так, чтобы частей было не больше MAX_PARTS"""
+    base = max(getattr(settings, 'DIRECT_UPLOAD_PART_SIZE', 8 * 1024 * 1024), MIN_PART_SIZE)
+    return max(base, math.ceil(size / MAX_PARTS))
+
+
+def create_upload(model_field, filename, size, content_type='', storage=None):
+    """
+    Начать multipart загрузку файла для поля модели
+
+    Args:
+        model_field: FileField модели (задает upload_to и storage)
+        filename: Имя файла у пользователя
+        size: Размер файла в байтах
+        content_type: MIME тип из браузера
+
+    Returns:
+        dict: upload (подписанный токен загрузки), part_size, urls (presigned
+            URL частей по порядку)
+    """
+    storage = storage or model_field.storage
+    name = model_field.generate_filename(None, filename)
+    name = storage.get_available_name(name, max_length=model_field.max_length)
+    key = storage._normalize_name(clean_name(name))
+    params = storage._get_write_parameters(key)
+    if content_type:
+        params['ContentType'] = content_type
+
+    client = storage.connection.meta.client
+    upload_id = client.create_multipart_upload(Bucket=storage.bucket_name, Key=key, **params)['UploadId']
+
+    chunk = part_size(size)
+    expires = getattr(settings, 'DIRECT_UPLOAD_URL_EXPIRES', 3600)
+    urls = [
+        client.generate_presigned_url(
+            'upload_part',
+            Params={'Bucket': storage.bucket_name, 'Key': key, 'UploadId': upload_id, 'PartNumber': number},
+            ExpiresIn=expires,
+        )
+        for number in range(1, max(1, math.ceil(size / chunk)) + 1)
+    ]
+    token = signing.dumps({'field': field_label(model_field), 'name': name, 'upload_id': upload_id}, salt=UPLOAD_SALT)
+    return {'upload': token, 'part_size': chunk, 'urls': urls}
+
+
+def _pending(token, model_field):
+    try:
+        data = signing.loads(token, salt=UPLOAD_SALT, max_age=getattr(settings, 'DIRECT_UPLOAD_URL_EXPIRES', 3600) * 2)
+    except signing.BadSignature:
+        raise ValidationError('Недействительный токен загрузки')
+    if data['field'] != field_label(model_field):
+        raise ValidationError('Токен загрузки относится к другому полю')
+    return data
+
+
+def complete_upload(model_field, token, parts, storage=None):
+    """
+    Завершить multipart загрузку
+
+    Args:
+        token: Токен из create_upload
+        parts: Список {'PartNumber': n, 'ETag': '"..."'} загруженных частей
+
+    Returns:
+        str: Подписанный токен файла для отправки с формой
+    """
+    storage = storage or model_field.storage
+    data = _pending(token, model_field)
+    parts = sorted(
+        ({'PartNumber': int(part['PartNumber']), 'ETag': str(part['ETag'])} for part in parts),
+        key=lambda part: part['PartNumber'],
+    )
+    storage.connection.meta.client.complete_multipart_upload(
+        Bucket=storage.bucket_name,
+        Key=storage._normalize_name(clean_name(data['name'])),
+        UploadId=data['upload_id'],
+        MultipartUpload={'Parts': parts},
+    )
+    return signing.dumps({'field': data['field'], 'name': data['name']}, salt=FILE_SALT)
+
+
+def abort_upload(model_field, token, storage=None):
+    """Отменить незавершенную загрузку (части удаляются из R2)"""
+    storage = storage or model_field.storage
+    data = _pending(token, model_field)
+    storage.connection.meta.client.abort_multipart_upload(
+        Bucket=storage.bucket_name,
+        Key=storage._normalize_name(clean_name(data['name'])),
+        UploadId=data['upload_id'],
+    )
+
+
+def confirmed_name(token, label, storage):
+    """
+    Имя загруженного объекта по токену файла
+
+    Raises:
+        ValidationError: Токен неверен, просрочен, от другого поля или объекта нет
+    """
+    try:
+        data = signing.loads(token, salt=FILE_SALT, max_age=getattr(settings, 'DIRECT_UPLOAD_TOKEN_AGE', 86400))
+    except signing.BadSignature:
+        raise ValidationError('Недействительный токен загруженного файла')
+    if data['field'] != label:
+        raise ValidationError('Файл загружен для другого поля')
+    if not storage.exists(data['name']):
+        raise ValidationError('Загруженный файл не найден в хранилище')
+    return data['name']
+
+
+# --- Формы ---
+
+class UploadToken(str):
+    """Токен прямой загрузки вместо файла в данных формы"""
+
+
+class DirectUploadWidget(forms.ClearableFileInput):
+    """
+    Поле файла с загрузкой напрямую в R2 (static/js/admin_direct_upload.js)
+
+    Токен загруженного файла передается скрытым полем <name>__direct.
+    """
+
+    class Media:
+        js = ('js/admin_direct_upload.js',)
+
+    def __init__(self, upload_url, label, attrs=None):
+        attrs = {**(attrs or {}), 'data-direct-upload-url': upload_url, 'data-direct-upload-field': label}
+        super().__init__(attrs)
+
+    def render(self, name, value, attrs=None, renderer=None):
+        html = super().render(name, value, attrs, renderer)
+        return html + format_html(
+            '<input type="hidden" name="{}__direct" value="">'
+            '<span class="direct-upload-status help" style="margin-left:8px;"></span>',
+            name,
+        )
+
+    def value_from_datadict(self, data, files, name):
+        upload = super().value_from_datadict(data, files, name)
+        token = data.get(f'{name}__direct')
+        if token and not upload:
+            return UploadToken(token)
+        return upload
+
+    def value_omitted_from_data(self, data, files, name):
+        return super().value_omitted_from_data(data, files, name) and f'{name}__direct' not in data
+
+
+class DirectUploadFieldMixin:
+    """Поле формы, принимающее токен прямой загрузки (возвращает имя объекта)"""
+    label_key = None
+    storage = None
+
+    def clean(self, data, initial=None):
+        if isinstance(data, UploadToken):
+            return self.clean_uploaded(confirmed_name(data, self.label_key, self.storage))
+        return super().clean(data, initial)
+
+    def clean_uploaded(self, name):
+        return name
+
+
+class DirectUploadFileField(DirectUploadFieldMixin, forms.FileField):
+    pass
+
+
+class DirectUploadImageField(DirectUploadFieldMixin, forms.ImageField):
+
+    def clean_uploaded(self, name):
+        from PIL import Image
+
+        try:
+            with self.storage.open(name) as f:
+                Image.open(f).verify()
+        except Exception:
+            self.storage.delete(name)
+            raise ValidationError(self.error_messages['invalid_image'], code='invalid_image')
+        return name
+
+
+def direct_formfield(model_field, upload_url, **kwargs):
+    """Поле формы для FileField/ImageField модели с прямой загрузкой"""
+    from django.db import models
+
+    form_class = DirectUploadImageField if isinstance(model_field, models.ImageField) else DirectUploadFileField
+    label = field_label(model_field)
+    kwargs['widget'] = DirectUploadWidget(upload_url, label)
+    formfield = model_field.formfield(form_class=form_class, **kwargs)
+    formfield.label_key = label
+    formfield.storage = model_field.storage
+    return formfield
+
+
+# --- Админка ---
+
+class DirectUploadAdminMixin:
+    """
+    ModelAdmin с прямой загрузкой в R2 для полей direct_upload_fields
+
+    Добавляет URL <model>/direct-upload/ для шагов create / complete / abort.
+    Без R2 поля работают как обычно. Объект сохраняется в R2 как есть, без
+    ContentAddressedMixin, поэтому поля изображений сюда не включаются.
+    """
+    direct_upload_fields = ()
+
+    def _direct_upload_url_name(self):
+        opts = self.model._meta
+        return f'{opts.app_label}_{opts.model_name}_direct_upload'
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if db_field.name in self.direct_upload_fields and is_enabled(db_field.storage):
+            from django.urls import reverse
+
+            kwargs.pop('widget', None)
+            url = reverse(f'{self.admin_site.name}:{self._direct_upload_url_name()}')
+            return direct_formfield(db_field, url, **kwargs)
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
+
+    def get_urls(self):
+        from django.urls import path
+
+        return [
+            path('direct-upload/', self.admin_site.admin_view(self.direct_upload_view),
+                 name=self._direct_upload_url_name()),
+        ] + super().get_urls()
+
+    def direct_upload_view(self, request):
+        import json
+        from django.core.exceptions import PermissionDenied
+        from django.http import HttpResponseNotAllowed, JsonResponse
+
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(['POST'])
+        if not (self.has_add_permission(request) or self.has_change_permission(request)):
+            raise PermissionDenied
+
+        try:
+            data = json.loads(request.body)
+            field_name = data['field'].rsplit('.', 1)[-1]
+            if field_name not in self.direct_upload_fields:
+                raise ValidationError('Поле не поддерживает прямую загрузку')
+            db_field = self.model._meta.get_field(field_name)
+            action = data['action']
+            if action == 'create':
+                result = create_upload(db_field, data['filename'], int(data['size']), data.get('content_type', ''))
+            elif action == 'complete':
+                result = {'file': complete_upload(db_field, data['upload'], data['parts'])}
+            elif action == 'abort':
+                abort_upload(db_field, data['upload'])
+                result = {}
+            else:
+                raise ValidationError('Неизвестное действие')
+        except ValidationError as e:
+            return JsonResponse({'error': ' '.join(e.messages)}, status=400)
+        except (KeyError, TypeError, ValueError) as e:
+            return JsonResponse({'error': f'Неверный запрос: {e}'}, status=400)
+        except Exception as e:
+            print(f"❌ Ошибка прямой загрузки в R2: {e}")
+            return JsonResponse({'error': 'Хранилище недоступно'}, status=502)
+        return JsonResponse(result)
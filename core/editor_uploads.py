@@ -0,0 +1,198 @@
+"""
+Реестр файлов, загруженных через CKEditor, и браузер файлов по нему
+
+Браузер ckeditor_uploader при каждом открытии обходит каталог uploads/ в
+хранилище (на R2 — listdir по всем подкаталогам) и строит URL для каждого
+файла и миниатюры, поэтому с сотнями загрузок открывается очень долго.
+
+Теперь каждая загрузка через CKEditor записывается в EditorUpload (имя,
+исходное имя файла, миниатюра, размеры, дата), а браузер показывает
+страницы этой таблицы по EDITOR_BROWSE_PER_PAGE файлов (keyset пагинация
+по дате загрузки) без обращений к хранилищу. Уже загруженные файлы
+переносятся в реестр командой import_editor_uploads.
+"""
+
+import os
+
+from ckeditor_uploader import utils as ckeditor_utils
+from ckeditor_uploader import views as ckeditor_views
+from ckeditor_uploader.backends import PillowBackend
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import Q
+from django.shortcuts import render
+from django.urls import re_path
+from django.utils import timezone
+from django.views.decorators.cache import never_cache
+
+from . import uploads
+from .pagination import KeysetPaginator
+from .storage_backends import ContentAddressedMixin
+
+
+def image_size(storage, name):
+    """
+    Размеры сохраненного изображения (после нормализации) или (None, None)
+
+    Читает файл из хранилища, поэтому нужна только для уже загруженных
+    файлов (import_editor_uploads); новые загрузки измеряются в памяти.
+    """
+    from PIL import Image
+
+    try:
+        with storage.open(name) as f, Image.open(f) as image:
+            return image.size
+    except Exception:
+        return None, None
+
+
+def register(storage, name, original_name='', thumbnail='', is_image=None, uploaded_at=None,
+             dimensions=None, size=None):
+    """
+    Записать файл в реестр (повторная загрузка того же файла обновляет запись)
+
+    Args:
+        dimensions: (ширина, высота) изображения, если известны; иначе файл
+            читается из хранилища
+        size: Размер файла в байтах, если известен
+
+    Returns:
+        EditorUpload: Запись реестра
+    """
+    from .models import EditorUpload
+
+    if is_image is None:
+        is_image = ckeditor_utils.is_valid_image_extension(name)
+    if not is_image:
+        width, height = None, None
+    else:
+        width, height = dimensions or image_size(storage, name)
+    if size is None:
+        try:
+            size = storage.size(name)
+        except Exception:
+            size = 0
+    upload, _ = EditorUpload.objects.update_or_create(
+        name=name,
+        defaults={
+            'original_name': (original_name or os.path.basename(name))[:255],
+            'thumbnail': thumbnail,
+            'is_image': is_image and width is not None,
+            'width': width,
+            'height': height,
+            'size': size,
+            'uploaded_at': uploaded_at or timezone.now(),
+        },
+    )
+    return upload
+
+
+class RegistryBackend(PillowBackend):
+    """Backend загрузки CKEditor (как PillowBackend), записывающий файлы в реестр"""
+
+    thumbnail_name = ''
+
+    def create_thumbnail(self, file_object, file_path):
+        self.thumbnail_name = super().create_thumbnail(file_object, file_path)
+        return self.thumbnail_name
+
+    def _normalize(self):
+        """
+        Нормализовать изображение в памяти до сохранения (как это сделает
+        ContentAddressedMixin), чтобы размеры и объем файла в реестре взять
+        без чтения из хранилища. Хранилище получит уже нормализованный файл
+        и не станет менять его повторно.
+        """
+        if not isinstance(self.storage_engine, ContentAddressedMixin):
+            return
+        if not getattr(settings, 'MEDIA_CONTENT_ADDRESSED', True):
+            return
+        normalized = uploads.normalize_image(self.file_object)
+        if normalized is not None:
+            normalized.name = self.file_object.name
+            self.file_object = normalized
+
+    def _dimensions(self):
+        from PIL import Image
+
+        try:
+            with Image.open(self.file_object) as image:
+                return image.size
+        except Exception:
+            return None, None
+        finally:
+            self.file_object.seek(0)
+
+    def save_as(self, filepath):
+        original_name = os.path.basename(self.file_object.name or '')
+        is_image = self.is_image
+        if is_image:
+            self._normalize()
+            dimensions = self._dimensions()
+        else:
+            dimensions = None
+        size = self.file_object.size
+        saved_path = super().save_as(filepath)
+        try:
+            register(
+                self.storage_engine, saved_path,
+                original_name=original_name,
+                thumbnail=self.thumbnail_name,
+                is_image=is_image,
+                dimensions=dimensions,
+                size=size,
+            )
+        except Exception as e:
+            print(f"❌ Не удалось записать загрузку CKEditor {saved_path} в реестр: {e}")
+        return saved_path
+
+
+def browse_entry(upload, storage):
+    """Файл для шаблона браузера: src, thumb, размеры и имя"""
+    src = storage.url(upload.name)
+    if upload.thumbnail:
+        thumb = storage.url(upload.thumbnail)
+    elif upload.is_image:
+        thumb = src
+    else:
+        thumb = ckeditor_utils.get_icon_filename(upload.name)
+    return {
+        'src': src,
+        'thumb': thumb,
+        'is_image': upload.is_image,
+        'name': upload.original_name or os.path.basename(upload.name),
+        'width': upload.width,
+        'height': upload.height,
+    }
+
+
+def browse(request):
+    """
+    Браузер файлов CKEditor по реестру EditorUpload
+
+    Поиск по исходному имени файла (?q=), страницы по курсору.
+    """
+    from .models import EditorUpload
+
+    queryset = EditorUpload.objects.all()
+    query = request.GET.get('q', '').strip()
+    if query:
+        queryset = queryset.filter(Q(original_name__icontains=query) | Q(name__icontains=query))
+
+    paginator = KeysetPaginator(queryset, getattr(settings, 'EDITOR_BROWSE_PER_PAGE', 48), ['-uploaded_at', '-pk'])
+    page_obj = paginator.get_page(request.GET.get('page'), request.GET.get('cursor'))
+    storage = ckeditor_utils.storage
+    context = {
+        'files': [browse_entry(upload, storage) for upload in page_obj],
+        'page_obj': page_obj,
+        'query': query,
+    }
+    return render(request, 'ckeditor/upload_browser.html', context)
+
+
+def editor_urlpatterns():
+    """URL CKEditor: загрузка из ckeditor_uploader, браузер файлов по реестру"""
+    return [
+        re_path(r'^upload/', staff_member_required(ckeditor_views.upload), name='ckeditor_upload'),
+        re_path(r'^browse/', never_cache(staff_member_required(browse)), name='ckeditor_browse'),
+    ]
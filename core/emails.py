@@ -0,0 +1,97 @@
+"""
+Email уведомления о заказах и сообщениях
+
+Письма не отправляются из view: они ставятся в outbox (текст + HTML версия)
+и доставляются воркером process_outbox через одно SMTP соединение.
+"""
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from .outbox import enqueue
+
+
+SIGNATURE = 'С уважением,\nАхмедова Феруза Медетовна'
+
+
+def queue_email(subject, to, text='', fields=(), reply_to=None):
+    """
+    Поставить письмо в очередь
+
+    Args:
+        subject: Тема письма
+        to: Список получателей
+        text: Основной текст
+        fields: Пары (название, значение), выводятся перед текстом
+        reply_to: Список адресов для ответа
+
+    Returns:
+        OutboxMessage
+    """
+    context = {'subject': subject, 'text': text, 'fields': list(fields)}
+    return enqueue('email', {
+        'subject': subject,
+        'body': render_to_string('emails/message.txt', context).strip(),
+        'html': render_to_string('emails/message.html', context),
+        'from_email': settings.DEFAULT_FROM_EMAIL,
+        'to': list(to),
+        'reply_to': list(reply_to) if reply_to else None,
+    })
+
+
+def queue_contact_emails(contact_message):
+    """Письмо администратору о сообщении из контактной формы"""
+    queue_email(
+        subject=f'Новое сообщение: {contact_message.subject}',
+        to=[settings.ADMIN_EMAIL],
+        fields=[('От', f'{contact_message.name} ({contact_message.email})')],
+        text=contact_message.message,
+        reply_to=[contact_message.email],
+    )
+
+
+def queue_service_order_emails(order):
+    """Письма администратору и клиенту о заказе услуги"""
+    queue_email(
+        subject=f'Новый заказ услуги: {order.service.title}',
+        to=[settings.ADMIN_EMAIL],
+        fields=[('Клиент', order.full_name), ('Email', order.email), ('Телефон', order.phone)],
+        text=f'Описание: {order.message}',
+        reply_to=[order.email],
+    )
+    queue_email(
+        subject='Подтверждение заказа услуги',
+        to=[order.email],
+        text=(
+            f'Здравствуйте, {order.full_name}!\n\n'
+            f'Ваш заказ услуги "{order.service.title}" принят. Мы свяжемся с вами в ближайшее время.\n\n'
+            f'{SIGNATURE}'
+        ),
+    )
+
+
+def queue_book_order_emails(order):
+    """Письма администратору и клиенту о заказе книги"""
+    total_price = order.get_total_price()
+    price_info = f"Общая стоимость: {total_price} ₽" if total_price else "Цена не указана"
+
+    queue_email(
+        subject=f'Новый заказ книги: {order.book.title}',
+        to=[settings.ADMIN_EMAIL],
+        fields=[
+            ('Клиент', order.full_name), ('Email', order.email), ('Телефон', order.phone),
+            ('Адрес', order.address), ('Количество', order.quantity),
+        ],
+        text=f'{price_info}\n\nДополнительно: {order.message}',
+        reply_to=[order.email],
+    )
+    queue_email(
+        subject='Подтверждение заказа книги',
+        to=[order.email],
+        text=(
+            f'Здравствуйте, {order.full_name}!\n\n'
+            f'Ваш заказ книги "{order.book.title}" (количество: {order.quantity}) принят. '
+            f'Мы свяжемся с вами в ближайшее время для уточнения деталей доставки.\n\n'
+            f'{price_info}\n\n{SIGNATURE}'
+        ),
+    )
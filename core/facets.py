@@ -0,0 +1,122 @@
+"""
+Материализованные фасеты для фильтров списков
+
+Количество публикаций по годам и типам, книг по годам и статей по категориям
+хранится в таблице Facet и обновляется инкрементально из сигналов моделей.
+Списки значений кешируются, поэтому фильтры не требуют запросов к БД.
+"""
+
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Facet, Publication, Book, BlogPost
+
+
+FACET_KEY = 'core:facets:{kind}'
+
+FacetValue = namedtuple('FacetValue', ['value', 'count'])
+
+# Модель -> [(вид фасета, значение для объекта или None, если объект не учитывается)]
+FACET_SOURCES = {
+    Publication: [
+        ('publication_year', lambda obj: str(obj.year)),
+        ('publication_type', lambda obj: obj.publication_type),
+    ],
+    Book: [
+        ('book_year', lambda obj: str(obj.publication_year) if obj.is_available else None),
+    ],
+    BlogPost: [
+        ('blog_category', lambda obj: obj.category if obj.is_published and obj.category else None),
+    ],
+}
+
+
+def facet_values(instance):
+    """Значения фасетов для объекта: {вид: значение}"""
+    return {kind: get_value(instance) for kind, get_value in FACET_SOURCES[type(instance)]}
+
+
+def _adjust(kind, value, delta):
+    updated = Facet.objects.filter(kind=kind, value=value).update(count=F('count') + delta)
+    if not updated and delta > 0:
+        try:
+            with transaction.atomic():
+                Facet.objects.create(kind=kind, value=value, count=delta)
+        except IntegrityError:
+            # Запись создана параллельным запросом
+            Facet.objects.filter(kind=kind, value=value).update(count=F('count') + delta)
+    # После коммита: иначе параллельный запрос закешировал бы старые значения
+    # без срока жизни
+    key = FACET_KEY.format(kind=kind)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def apply_change(old, new):
+    """
+    Учесть изменение значений фасетов объекта
+
+    Args:
+        old: Значения до сохранения ({} для нового объекта)
+        new: Значения после сохранения ({} для удаленного объекта)
+    """
+    for kind in set(old) | set(new):
+        old_value, new_value = old.get(kind), new.get(kind)
+        if old_value == new_value:
+            continue
+        if old_value is not None:
+            _adjust(kind, old_value, -1)
+        if new_value is not None:
+            _adjust(kind, new_value, 1)
+
+
+def _sort_key(kind):
+    if kind in ('publication_year', 'book_year'):
+        return lambda item: -int(item.value) if item.value.lstrip('-').isdigit() else 0
+    return lambda item: item.value
+
+
+def get_facets(kind):
+    """
+    Значения фильтра с количеством объектов
+
+    Returns:
+        list[FacetValue]: Годы — по убыванию, остальное — по алфавиту
+    """
+    key = FACET_KEY.format(kind=kind)
+    facets = cache.get(key)
+    if facets is None:
+        facets = [
+            FacetValue(value, count)
+            for value, count in Facet.objects.filter(kind=kind, count__gt=0).values_list('value', 'count')
+        ]
+        facets.sort(key=_sort_key(kind))
+        cache.set(key, facets, None)
+    return facets
+
+
+def rebuild_facets():
+    """
+    Пересчитать все фасеты по данным моделей
+
+    Returns:
+        int: Количество записей Facet
+    """
+    counts = {}
+    for model, sources in FACET_SOURCES.items():
+        for obj in model.objects.iterator():
+            for kind, get_value in sources:
+                value = get_value(obj)
+                if value is not None:
+                    counts[(kind, value)] = counts.get((kind, value), 0) + 1
+
+    with transaction.atomic():
+        Facet.objects.all().delete()
+        Facet.objects.bulk_create(
+            Facet(kind=kind, value=value, count=count) for (kind, value), count in counts.items()
+        )
+    for kind, _ in Facet.KIND_CHOICES:
+        cache.delete(FACET_KEY.format(kind=kind))
+    return len(counts)
@@ -0,0 +1,228 @@
+"""
+Адаптивные версии изображений (WebP и JPEG нескольких ширин)
+
+Версии создаются при загрузке изображения и хранятся рядом с оригиналом
+в том же storage (MediaStorage на R2): books/covers/a.jpg ->
+books/covers/a__w640.webp, books/covers/a__w640.jpg. Ширины созданных
+версий сохраняются в поле <поле>_variants модели, поэтому шаблонный тег
+responsive_image строит srcset без обращений к storage.
+
+Там же вычисляются размеры (<поле>_width/_height с учетом EXIF-поворота)
+и крошечная размытая заглушка (LQIP) в <поле>_placeholder — шаблоны выводят
+width/height и фон-заглушку, не открывая файл.
+"""
+
+import base64
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .caching import invalidate_profile
+from .uploads import release
+
+
+# Модель -> поля изображений, для которых создаются версии
+IMAGE_FIELDS = {
+    'core.profile': ('photo',),
+    'core.project': ('image',),
+    'core.blogpost': ('featured_image',),
+    'core.achievement': ('certificate_image',),
+    'core.testimonial': ('client_photo',),
+    'core.book': ('cover_image', 'pdf_preview'),
+    'core.publication': ('pdf_preview',),
+}
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+
+
+# Ширина заглушки LQIP в пикселях (растягивается браузером с размытием)
+PLACEHOLDER_WIDTH = 16
+
+
+def variants_field(field_name):
+    """Имя поля модели со списком ширин версий"""
+    return f'{field_name}_variants'
+
+
+def placeholder_field(field_name):
+    """Имя поля модели с заглушкой LQIP"""
+    return f'{field_name}_placeholder'
+
+
+def dimension_fields(field_name):
+    """
+    Имена полей модели с шириной и высотой изображения
+
+    Это обычные поля, а не width_field/height_field ImageField: те Django
+    заполняет при каждой загрузке объекта, открывая файл (на R2 — GET на
+    каждую строку), если размеры еще не записаны.
+    """
+    return f'{field_name}_width', f'{field_name}_height'
+
+
+def derivative_widths():
+    return sorted(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (320, 640, 960, 1280)))
+
+
+def derivative_name(name, width, ext):
+    """Имя версии изображения: <имя без расширения>__w<ширина>.<ext>"""
+    stem, _ = os.path.splitext(name)
+    return f'{stem}__w{width}.{ext}'
+
+
+def plan_widths(original_width, widths=None):
+    """
+    Ширины версий для изображения шириной original_width
+
+    Изображения не увеличиваются: ширины больше оригинала заменяются
+    одной версией в исходном размере.
+    """
+    widths = widths or derivative_widths()
+    planned = [width for width in widths if width < original_width]
+    if not planned or original_width <= widths[-1]:
+        planned.append(original_width)
+    return planned
+
+
+def _load(source):
+    """Открыть изображение с учетом EXIF-поворота; возвращает (image, есть ли прозрачность)"""
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        return image.convert('RGBA' if has_alpha else 'RGB'), has_alpha
+
+
+def render_placeholder(image, has_alpha=False):
+    """
+    Заглушка LQIP: data URI крошечной WebP версии (несколько сотен байт)
+
+    Для прозрачных изображений заглушка не создается — она просвечивала бы.
+    """
+    if has_alpha:
+        return ''
+    height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+    tiny = image.resize((PLACEHOLDER_WIDTH, height), Image.BILINEAR)
+    buffer = io.BytesIO()
+    tiny.save(buffer, 'WEBP', quality=40)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def render_derivatives(source, widths=None):
+    """
+    Построить версии изображения
+
+    Args:
+        source: Файл (или путь) с исходным изображением
+        widths: Ширины версий (по умолчанию IMAGE_DERIVATIVE_WIDTHS)
+
+    Returns:
+        list[tuple[int, str, bytes]]: (ширина, расширение, данные)
+    """
+    image, has_alpha = _load(source)
+    return _render(image, has_alpha, widths)
+
+
+def _render(image, has_alpha, widths=None):
+    quality = getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 80)
+    results = []
+    for width in plan_widths(image.width, widths):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for ext, (pil_format, _) in FORMATS.items():
+            frame = resized
+            if pil_format == 'JPEG' and has_alpha:
+                # JPEG без прозрачности: подложка цвета страницы
+                frame = Image.new('RGB', resized.size, (243, 236, 221))
+                frame.paste(resized, mask=resized.getchannel('A'))
+            buffer = io.BytesIO()
+            options = {'quality': quality, 'optimize': True}
+            if pil_format == 'JPEG':
+                options['progressive'] = True
+            else:
+                options['method'] = 6
+            frame.save(buffer, pil_format, **options)
+            results.append((width, ext, buffer.getvalue()))
+    return results
+
+
+def generate_derivatives(field_file, widths=None):
+    """
+    Создать и сохранить версии изображения рядом с оригиналом
+
+    Args:
+        field_file: ImageFieldFile с загруженным изображением
+
+    Returns:
+        dict: Значения полей модели: <поле>_variants, _width, _height, _placeholder
+    """
+    storage = field_file.storage
+    with field_file.open('rb') as source:
+        image, has_alpha = _load(source)
+    derivatives = _render(image, has_alpha, widths)
+
+    for width, ext, data in derivatives:
+        name = derivative_name(field_file.name, width, ext)
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(data))
+
+    field_name = field_file.field.name
+    width_field, height_field = dimension_fields(field_name)
+    return {
+        variants_field(field_name): sorted({width for width, _, _ in derivatives}),
+        placeholder_field(field_name): render_placeholder(image, has_alpha),
+        width_field: image.width,
+        height_field: image.height,
+    }
+
+
+def release_image(storage, name, instance, field_name, widths):
+    """
+    Удалить замененное изображение поля и его версии, если их не использует
+    другая запись (см. uploads.release)
+
+    Args:
+        widths: Ширины версий старого изображения (<поле>_variants)
+
+    Returns:
+        bool: Файлы удалены
+    """
+    derivatives = [derivative_name(name, width, ext) for width in widths for ext in FORMATS]
+    return release(storage, name, instance, field_name, derivatives)
+
+
+def process_instance(instance, field_names=None):
+    """
+    Создать версии для изображений объекта и сохранить ширины, размеры и
+    заглушки в поля модели
+
+    Returns:
+        dict: Обновленные поля модели
+    """
+    model = type(instance)
+    field_names = field_names or IMAGE_FIELDS.get(model._meta.label_lower, ())
+    updates = {}
+    for field_name in field_names:
+        field_file = getattr(instance, field_name)
+        if field_file:
+            updates.update(generate_derivatives(field_file))
+        else:
+            width_field, height_field = dimension_fields(field_name)
+            updates[variants_field(field_name)] = []
+            updates[placeholder_field(field_name)] = ''
+            updates[width_field] = updates[height_field] = None
+    if updates:
+        # update() не вызывает сигналы сохранения и не перезаписывает другие поля
+        model.objects.filter(pk=instance.pk).update(**updates)
+        for name, value in updates.items():
+            setattr(instance, name, value)
+        if model._meta.label_lower == 'core.profile':
+            # Профиль кешируется в процессах, а update() не вызывает его сброс
+            invalidate_profile()
+    return updates
@@ -0,0 +1,36 @@
+"""
+Management command to delete media files that nothing references anymore
+Usage: python manage.py collect_orphaned_media [--dry-run] [--min-age-hours N] [--verbose]
+"""
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from core.media_gc import collect_orphans
+
+
+class Command(BaseCommand):
+    help = 'Stream over the media storage listing and delete files without references in the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report orphaned files, delete nothing')
+        parser.add_argument('--min-age-hours', type=int, default=24,
+                            help='Keep files uploaded less than N hours ago (default: 24)')
+        parser.add_argument('--verbose', action='store_true', help='Print every orphaned file')
+
+    def handle(self, *args, **options):
+        on_orphan = (lambda name: self.stdout.write(f'  {name}')) if options['verbose'] else None
+        stats = collect_orphans(
+            default_storage,
+            dry_run=options['dry_run'],
+            min_age=timedelta(hours=options['min_age_hours']),
+            on_orphan=on_orphan,
+        )
+        for error in stats['errors']:
+            self.stderr.write(f'❌ {error}')
+
+        if options['dry_run']:
+            summary = f"{stats['orphaned']} of {stats['scanned']} files are orphaned (dry run, nothing deleted)"
+        else:
+            summary = f"{stats['deleted']} of {stats['orphaned']} orphaned files deleted, {stats['scanned']} scanned"
+        self.stdout.write(self.style.SUCCESS(f'✓ {summary}'))
@@ -0,0 +1,23 @@
+"""
+Management command to write buffered view counters to the database
+Usage: python manage.py flush_view_counters
+
+Only useful with VIEW_COUNTER_BACKEND = 'cache': in 'memory' mode every worker
+keeps its own buffer, which this command cannot see.
+"""
+from django.core.management.base import BaseCommand
+from core.counters import flush_view_counters, is_shared
+
+
+class Command(BaseCommand):
+    help = 'Flush buffered BlogPost/Book view counters to the database'
+
+    def handle(self, *args, **options):
+        if not is_shared():
+            self.stderr.write(self.style.WARNING(
+                "⚠ VIEW_COUNTER_BACKEND = 'memory': views are buffered inside each web worker "
+                "and flushed by the worker itself, this command only sees its own empty buffer. "
+                "Set VIEW_COUNTER_BACKEND = 'cache' to flush views from cron."
+            ))
+        flushed = flush_view_counters()
+        self.stdout.write(self.style.SUCCESS(f'✓ {flushed} views flushed'))
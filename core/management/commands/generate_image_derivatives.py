@@ -0,0 +1,64 @@
+"""
+Management command to create responsive image versions, dimensions and
+LQIP placeholders for existing media
+Usage: python manage.py generate_image_derivatives [--force]
+       python manage.py generate_image_derivatives --static images/author-portrait.jpg --widths 480,810
+"""
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.images import IMAGE_FIELDS, derivative_name, dimension_fields, process_instance, render_derivatives, variants_field
+
+
+class Command(BaseCommand):
+    help = 'Generate WebP/JPEG width variants for uploaded images (or bundled static images)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate images that already have variants')
+        parser.add_argument('--static', nargs='+', metavar='PATH', help='Static images (relative to STATICFILES_DIRS)')
+        parser.add_argument('--widths', help='Comma-separated widths, e.g. 480,960')
+
+    def handle(self, *args, **options):
+        widths = [int(width) for width in options['widths'].split(',')] if options['widths'] else None
+        if options['static']:
+            return self.handle_static(options['static'], widths)
+
+        processed = failed = 0
+        for label, field_names in IMAGE_FIELDS.items():
+            model = apps.get_model(label)
+            for instance in model.objects.iterator():
+                pending = [
+                    name for name in field_names
+                    if getattr(instance, name) and (options['force'] or self.is_missing(instance, name))
+                ]
+                if not pending:
+                    continue
+                try:
+                    process_instance(instance, pending)
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'❌ {model.__name__} #{instance.pk}: {e}')
+                else:
+                    processed += 1
+                    self.stdout.write(f'  {model.__name__} #{instance.pk}: {", ".join(pending)}')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {processed} objects processed, {failed} failed'))
+
+    def is_missing(self, instance, name):
+        width_field, _ = dimension_fields(name)
+        return not getattr(instance, variants_field(name)) or getattr(instance, width_field) is None
+
+    def handle_static(self, paths, widths):
+        for path in paths:
+            source = next((Path(root) / path for root in settings.STATICFILES_DIRS if (Path(root) / path).exists()), None)
+            if source is None:
+                raise CommandError(f'Static file not found: {path}')
+            derivatives = render_derivatives(source, widths)
+            for width, ext, data in derivatives:
+                target = source.parent / Path(derivative_name(source.name, width, ext)).name
+                target.write_bytes(data)
+                self.stdout.write(f'  {target.name} ({len(data) // 1024} KB)')
+            widths_done = sorted({width for width, _, _ in derivatives})
+            self.stdout.write(self.style.SUCCESS(f'✓ {path}: widths {",".join(map(str, widths_done))}'))
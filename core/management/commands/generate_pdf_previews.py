@@ -0,0 +1,35 @@
+"""
+Management command to render first-page previews for existing PDF files
+Usage: python manage.py generate_pdf_previews [--force]
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from core.pdf_previews import PDF_PREVIEWS, generate_pdf_preview
+
+
+class Command(BaseCommand):
+    help = 'Render first-page previews (with responsive variants) for book and publication PDFs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate previews that already exist')
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        for label, previews in PDF_PREVIEWS.items():
+            model = apps.get_model(label)
+            for instance in model.objects.iterator():
+                pending = [
+                    pdf_field for pdf_field, preview_field in previews.items()
+                    if getattr(instance, pdf_field) and (options['force'] or not getattr(instance, preview_field))
+                ]
+                for pdf_field in pending:
+                    try:
+                        generate_pdf_preview(instance, pdf_field)
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f'❌ {model.__name__} #{instance.pk}: {e}')
+                    else:
+                        processed += 1
+                        self.stdout.write(f'  {model.__name__} #{instance.pk}: {getattr(instance, pdf_field).name}')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {processed} previews generated, {failed} failed'))
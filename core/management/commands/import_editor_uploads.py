@@ -0,0 +1,42 @@
+"""
+Management command to import files already uploaded through CKEditor into the registry
+Usage: python manage.py import_editor_uploads [--force]
+"""
+from ckeditor_uploader.utils import get_thumb_filename, is_valid_image_extension
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from core.editor_uploads import register
+from core.media_gc import list_media
+from core.models import EditorUpload
+from core.uploads import is_derivative
+
+
+class Command(BaseCommand):
+    help = 'Register existing CKEditor uploads (with dimensions and thumbnails) for the paged file browser'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-read files that are already registered')
+
+    def handle(self, *args, **options):
+        path = settings.CKEDITOR_UPLOAD_PATH
+        imported = skipped = failed = 0
+        for name, modified in list_media(default_storage, path):
+            if is_derivative(name) or name.rsplit('/', 1)[-1].startswith('.'):
+                continue
+            if not options['force'] and EditorUpload.objects.filter(name=name).exists():
+                skipped += 1
+                continue
+            thumbnail = ''
+            if is_valid_image_extension(name) and default_storage.exists(get_thumb_filename(name)):
+                thumbnail = get_thumb_filename(name)
+            try:
+                register(default_storage, name, thumbnail=thumbnail, uploaded_at=modified)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'❌ {name}: {e}')
+            else:
+                imported += 1
+                self.stdout.write(f'  {name}')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {imported} uploads imported, {skipped} already registered, {failed} failed'))
@@ -0,0 +1,40 @@
+"""
+Management command to report storage saved by the media compression policy
+Usage: python manage.py media_compression_report [--days N]
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.compression import savings
+from core.models import MediaCompression
+
+
+def _size(value):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(value) < 1024 or unit == 'GB':
+            return f'{value:.1f} {unit}' if unit != 'B' else f'{value} B'
+        value /= 1024
+
+
+class Command(BaseCommand):
+    help = 'Summarize compression decisions for uploaded media and the storage they saved'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Only uploads from the last N days')
+
+    def handle(self, *args, **options):
+        queryset = MediaCompression.objects.all()
+        if options['days']:
+            queryset = queryset.filter(created_at__gte=timezone.now() - timedelta(days=options['days']))
+
+        report = savings(queryset)
+        labels = dict(MediaCompression.REASON_CHOICES)
+        total_saved = 0
+        for reason, row in sorted(report.items()):
+            total_saved += row['saved']
+            self.stdout.write(
+                f"  {labels.get(reason, reason)}: {row['files']} files, "
+                f"{_size(row['original'])} -> {_size(row['stored'])}, saved {_size(row['saved'])}"
+            )
+        self.stdout.write(self.style.SUCCESS(f'✓ Storage saved by the compression policy: {_size(total_saved)}'))
@@ -0,0 +1,28 @@
+"""
+Management command to deliver queued notifications from the outbox
+Usage: python manage.py process_outbox [--loop] [--interval 5]
+
+Run it from cron (every minute) or as a long-running worker with --loop.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from core.outbox import process_outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending outbox notifications with retries and backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop')
+        parser.add_argument('--batch-size', type=int, default=None, help='Messages claimed per batch')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = process_outbox(options['batch_size'])
+            if sent or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'✓ {sent} sent, {failed} failed'))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,14 @@
+"""
+Management command to recompute filter facet counts
+Usage: python manage.py rebuild_facets
+"""
+from django.core.management.base import BaseCommand
+from core.facets import rebuild_facets
+
+
+class Command(BaseCommand):
+    help = 'Recompute publication/book/blog filter facet counts'
+
+    def handle(self, *args, **options):
+        count = rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(f'✓ {count} facet values rebuilt'))
@@ -0,0 +1,14 @@
+"""
+Management command to rebuild the publication full-text search index
+Usage: python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+from core.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild full-text search index for publications'
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'✓ {count} publications indexed'))
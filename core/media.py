@@ -0,0 +1,192 @@
+"""
+Отдача медиа файлов с локального диска (когда R2 не используется)
+
+В отличие от django.views.static.serve поддерживаются запросы диапазона
+(Range / 206 Partial Content), поэтому просмотрщик PDF в браузере
+показывает первую страницу, не скачивая всю книгу, а также условные
+запросы (ETag / Last-Modified -> 304). Файл отдается потоком блоками по
+MEDIA_BLOCK_SIZE байт, не читаясь в память целиком.
+
+Если веб-сервер умеет отдавать файлы сам, Django только проверяет путь и
+передает его серверу заголовком (MEDIA_SENDFILE):
+    'x-sendfile'       — Apache mod_xsendfile / LiteSpeed (X-Sendfile)
+    'x-accel-redirect' — nginx (X-Accel-Redirect, internal location
+                         MEDIA_ACCEL_PREFIX, указывающий на MEDIA_ROOT)
+Диапазоны и условные запросы в этом случае обрабатывает сервер.
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.clickjacking import xframe_options_sameorigin
+from django.views.decorators.http import require_safe
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Как у MediaStorage на R2
+CACHE_CONTROL = 'public, max-age=2592000'
+
+
+class RangeFile:
+    """Файл, ограниченный диапазоном байт [start, start + length)"""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Разобрать заголовок Range для файла размером size
+
+    Поддерживается один диапазон; несколько диапазонов (multipart/byteranges)
+    игнорируются, и отдается весь файл.
+
+    Returns:
+        tuple[int, int] | None | False: (начало, конец включительно), None —
+        заголовка нет или он не поддерживается, False — диапазон вне файла (416)
+    """
+    match = RANGE_RE.match(header.replace(' ', '')) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not size:
+        return False
+    if not first:
+        if not last:
+            return None
+        # bytes=-N: последние N байт
+        length = int(last)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        return False
+    return start, end
+
+
+def _range_applies(request, etag, mtime):
+    """If-Range: диапазон действует, только если файл не изменился"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    modified = parse_http_date_safe(if_range)
+    return modified is not None and int(mtime) <= modified
+
+
+def _content_type(fullpath):
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    if encoding:
+        # .gz / .br отдаются как есть, а не распаковываются браузером
+        return 'application/octet-stream'
+    return content_type or 'application/octet-stream'
+
+
+def _offload(path, fullpath, content_type):
+    """Ответ для отдачи файла веб-сервером или None, если отдача идет через Django"""
+    mode = getattr(settings, 'MEDIA_SENDFILE', '')
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = str(fullpath)
+    elif mode == 'x-accel-redirect':
+        prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(path)
+    else:
+        return None
+    return response
+
+
+@require_safe
+@xframe_options_sameorigin
+def serve_media(request, path):
+    """
+    Отдать файл из MEDIA_ROOT с поддержкой Range и условных запросов
+
+    Просмотр PDF на странице книги встраивается через <embed>, поэтому
+    X-Frame-Options ослаблен до SAMEORIGIN.
+    """
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    try:
+        stat = os.stat(fullpath)
+    except OSError:
+        raise Http404('Файл не найден')
+    if not os.path.isfile(fullpath):
+        raise Http404('Файл не найден')
+
+    size = stat.st_size
+    etag = '"%x-%x"' % (stat.st_mtime_ns, size)
+    last_modified = int(stat.st_mtime)
+
+    content_type = _content_type(fullpath)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _offload(path, fullpath, content_type)
+    if response is not None:
+        response.setdefault('ETag', etag)
+        response.setdefault('Last-Modified', http_date(last_modified))
+        response['Cache-Control'] = CACHE_CONTROL
+        return response
+
+    byte_range = None
+    if _range_applies(request, etag, stat.st_mtime):
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    file = open(fullpath, 'rb')
+    if byte_range:
+        start, end = byte_range
+        response = FileResponse(RangeFile(file, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        response = FileResponse(file, content_type=content_type)
+    response.block_size = getattr(settings, 'MEDIA_BLOCK_SIZE', 64 * 1024)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def media_urlpatterns():
+    """URL для отдачи MEDIA_URL из MEDIA_ROOT (как django.conf.urls.static.static)"""
+    prefix = settings.MEDIA_URL
+    if not prefix or '://' in prefix or not getattr(settings, 'MEDIA_ROOT', None):
+        return []
+    return [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(prefix.lstrip('/')), serve_media, name='media'),
+    ]
@@ -0,0 +1,198 @@
+"""
+Локальный дисковый кеш медиа файлов, читаемых Django из R2
+
+Генерация версий изображений, превью PDF, проверка загруженных файлов и
+браузер CKEditor читают оригиналы через storage.open(). Без кеша каждое
+чтение — это HEAD и GET к R2 и загрузка файла целиком.
+
+CachedMediaStorage (storage_backends.py) хранит недавно прочитанные объекты
+в MEDIA_CACHE_DIR:
+    - объем ограничен MEDIA_CACHE_SIZE байт; при превышении удаляются
+      файлы, которые дольше всего не читались (LRU по времени изменения,
+      которое обновляется при каждом чтении). Процесс считает объем по мере
+      загрузки файлов и обходит каталог, только когда оценка превысила
+      MEDIA_CACHE_SIZE, а не при каждом промахе;
+    - рядом с файлом хранится ETag объекта; копия старше
+      MEDIA_CACHE_REVALIDATE секунд проверяется условным GET
+      (If-None-Match), и при 304 файл не загружается повторно;
+    - загрузка и удаление через хранилище удаляют копию сразу, другие
+      процессы заметят изменение при проверке ETag.
+
+Файлы хранятся распакованными (объекты с Content-Encoding: gzip
+распаковываются при загрузке в кеш). Кеш общий для процессов Passenger:
+файлы заменяются атомарно через os.replace.
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+
+ETAG_SUFFIX = '.etag'
+
+
+class DiskCache:
+    """
+    Кеш объектов R2 на диске с LRU вытеснением
+
+    Args:
+        root: Каталог кеша
+        max_size: Максимальный объем в байтах (0 — кеш выключен)
+        revalidate_after: Через сколько секунд проверять ETag копии
+    """
+
+    def __init__(self, root, max_size, revalidate_after=300):
+        self.root = str(root)
+        self.max_size = max_size
+        self.revalidate_after = revalidate_after
+        # Объем кеша по оценке этого процесса (None — еще не посчитан)
+        self._size = None
+        self._size_lock = threading.Lock()
+
+    def path(self, key):
+        """Путь к копии объекта (по хешу ключа, чтобы не зависеть от символов в имени)"""
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, digest[:2], digest)
+
+    def etag(self, key):
+        try:
+            with open(self.path(key) + ETAG_SUFFIX, encoding='ascii') as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def fetch(self, client, bucket, key):
+        """
+        Путь к актуальной копии объекта (загружается из R2 при необходимости)
+
+        Raises:
+            FileNotFoundError: Объекта нет в R2
+        """
+        path = self.path(key)
+        etag = self.etag(key) if os.path.exists(path) else None
+        if etag:
+            try:
+                validated = os.stat(path + ETAG_SUFFIX).st_mtime
+            except OSError:
+                validated = 0
+            if time.time() - validated < self.revalidate_after:
+                self._touch(path)
+                return path
+
+        params = {'Bucket': bucket, 'Key': key}
+        if etag:
+            params['IfNoneMatch'] = etag
+        try:
+            response = client.get_object(**params)
+        except ClientError as e:
+            status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+            if status == 304:
+                self._touch(path)
+                self._touch(path + ETAG_SUFFIX)
+                return path
+            if status == 404 or e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                self.invalidate(key)
+                raise FileNotFoundError(key) from e
+            raise
+
+        self._store(path, response)
+        self._stored(path)
+        return path
+
+    def _stored(self, path):
+        """Учесть загруженную копию; вытеснение — только при превышении оценки объема"""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with self._size_lock:
+            if self._size is not None:
+                self._size += size
+                if self._size <= self.max_size:
+                    return
+        self.evict(keep=path)
+
+    def _store(self, path, response):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        body = response['Body']
+        if response.get('ContentEncoding') == 'gzip':
+            body = gzip.GzipFile(fileobj=body, mode='rb')
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(body, f, 64 * 1024)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        finally:
+            response['Body'].close()
+        with open(path + ETAG_SUFFIX, 'w', encoding='ascii') as f:
+            f.write(response.get('ETag', ''))
+
+    @staticmethod
+    def _touch(path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def invalidate(self, key):
+        """Удалить копию объекта (после загрузки или удаления)"""
+        path = self.path(key)
+        for name in (path, path + ETAG_SUFFIX):
+            try:
+                os.unlink(name)
+            except OSError:
+                pass
+
+    def entries(self):
+        """Копии в кеше: список (время последнего чтения, размер, путь)"""
+        entries = []
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith((ETAG_SUFFIX, '.tmp')):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self, keep=None):
+        """
+        Удалить давно не читавшиеся копии, пока объем больше max_size
+
+        Args:
+            keep: Путь копии, которую нельзя удалять (только что загружена
+                для чтения, даже если она одна больше max_size)
+
+        Returns:
+            int: Количество удаленных копий
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            for name in (path, path + ETAG_SUFFIX):
+                try:
+                    os.unlink(name)
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+        with self._size_lock:
+            self._size = total
+        return removed
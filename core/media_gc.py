@@ -0,0 +1,257 @@
+"""
+Поиск и удаление медиа файлов, на которые больше нет ссылок
+
+Файлы, замененные в админке (photo, cover_image, pdf_file, featured_image,
+картинки CKEditor в uploads/), остаются в хранилище навсегда. Команда
+collect_orphaned_media проходит по списку объектов media/ постранично
+(list_objects_v2 по 1000 ключей) и удаляет объекты, на которые нет ссылок:
+    - из полей FileField/ImageField моделей и таблицы MediaReference;
+    - из атрибутов src/href в HTML полях CKEditor (BlogPost.content,
+      Book.description и другие RichTextField).
+Версии изображений (__w640.webp, _thumb CKEditor) сохраняются, пока есть
+ссылка на оригинал. Удаленные файлы убираются и из реестра загрузок CKEditor
+(EditorUpload).
+
+Имена со ссылками собираются не в память, а во временную SQLite таблицу
+(отсортированное множество на диске), поэтому память не растет с
+количеством файлов. Объекты моложе min_age не удаляются: загрузка через
+CKEditor или напрямую в R2 появляется в хранилище раньше, чем сохраняется
+ссылающаяся на нее запись. Удаление — пакетами delete_objects по 1000 ключей.
+"""
+
+import os
+import re
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta, timezone
+from urllib.parse import unquote, urlsplit
+
+from django.apps import apps
+from django.conf import settings
+from storages.backends.s3boto3 import S3Boto3Storage
+
+from .uploads import DERIVATIVE_RE, file_fields
+
+
+# Максимум ключей в одном запросе DeleteObjects (ограничение S3/R2)
+DELETE_BATCH = 1000
+
+HTML_URL_RE = re.compile(r'''(?:src|href)\s*=\s*["']([^"']+)["']''', re.IGNORECASE)
+
+
+class NameSet:
+    """
+    Множество строк во временной SQLite базе на диске
+
+    Используется как контекстный менеджер; файл удаляется при выходе.
+    """
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute('PRAGMA journal_mode = OFF')
+        self.db.execute('PRAGMA synchronous = OFF')
+        self.db.execute('CREATE TABLE names (name TEXT PRIMARY KEY) WITHOUT ROWID')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.db.close()
+        os.unlink(self.path)
+
+    def add_many(self, names):
+        self.db.executemany('INSERT OR IGNORE INTO names VALUES (?)', ((name,) for name in names))
+        self.db.commit()
+
+    def __contains__(self, name):
+        return self.db.execute('SELECT 1 FROM names WHERE name = ?', (name,)).fetchone() is not None
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM names').fetchone()[0]
+
+
+def stem(name):
+    """Имя без расширения: версии изображения хранятся рядом с оригиналом под этим именем"""
+    return os.path.splitext(name)[0]
+
+
+def base_stem(name):
+    """Имя оригинала (без расширения) для версии изображения или None"""
+    root = stem(name)
+    base = DERIVATIVE_RE.sub('', root)
+    return base if base != root else None
+
+
+def _without_scheme(url):
+    return url.split('://', 1)[1] if '://' in url else url.lstrip('/')
+
+
+def media_name(url):
+    """Имя файла в хранилище по URL из HTML или None, если URL не из MEDIA_URL"""
+    media_url = settings.MEDIA_URL
+    url = unquote(url.strip()).split('#', 1)[0].split('?', 1)[0]
+    if '://' in media_url:
+        # R2: https://<домен или endpoint/bucket>/media/...
+        url, prefix = _without_scheme(url), _without_scheme(media_url)
+    else:
+        # Локально: /media/... (в том числе в абсолютных ссылках на сайт)
+        url, prefix = urlsplit(url).path, media_url
+    if not url.startswith(prefix):
+        return None
+    return url[len(prefix):] or None
+
+
+def html_fields(model):
+    from ckeditor.fields import RichTextField
+
+    return [field.name for field in model._meta.concrete_fields if isinstance(field, RichTextField)]
+
+
+def referenced_names():
+    """Имена файлов со ссылками из базы (с повторами)"""
+    from .models import MediaReference
+
+    yield from MediaReference.objects.values_list('name', flat=True).iterator()
+    for model in apps.get_app_config('core').get_models():
+        for field_name in file_fields(model):
+            yield from model._base_manager.exclude(**{field_name: ''}).exclude(
+                **{f'{field_name}__isnull': True}
+            ).values_list(field_name, flat=True).iterator()
+        for field_name in html_fields(model):
+            for html in model._base_manager.values_list(field_name, flat=True).iterator():
+                for url in HTML_URL_RE.findall(html or ''):
+                    name = media_name(url)
+                    if name:
+                        yield name
+
+
+def collect_references(names, batch=1000):
+    """
+    Записать ссылки в names: имя файла и имя без расширения (для версий)
+    """
+    pending = []
+    for name in referenced_names():
+        pending.append(name)
+        pending.append(f'stem:{stem(name)}')
+        if len(pending) >= batch:
+            names.add_many(pending)
+            pending = []
+    names.add_many(pending)
+
+
+def is_referenced(name, names):
+    if name in names:
+        return True
+    base = base_stem(name)
+    return base is not None and f'stem:{base}' in names
+
+
+def list_media(storage, path=''):
+    """
+    Объекты медиа хранилища: (имя, время изменения в UTC), постранично
+
+    Для R2 — list_objects_v2 с префиксом location, для локального
+    хранилища — обход MEDIA_ROOT.
+
+    Args:
+        path: Только файлы в этом каталоге (например, 'uploads/')
+    """
+    if isinstance(storage, S3Boto3Storage):
+        prefix = f'{storage.location}/' if storage.location else ''
+        paginator = storage.connection.meta.client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(
+            Bucket=storage.bucket_name, Prefix=prefix + path, PaginationConfig={'PageSize': 1000},
+        )
+        for page in pages:
+            for item in page.get('Contents', ()):
+                yield item['Key'][len(prefix):], item['LastModified']
+        return
+
+    root = storage.location
+    for directory, _, filenames in os.walk(os.path.join(root, path)):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            yield name, datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc)
+
+
+def delete_batch(storage, names):
+    """
+    Удалить файлы одним запросом DeleteObjects (R2) или по одному (диск)
+
+    Returns:
+        tuple[list[str], list[str]]: Удаленные имена и ошибки удаления
+    """
+    if not names:
+        return [], []
+    if isinstance(storage, S3Boto3Storage):
+        keys = {storage._normalize_name(name): name for name in names}
+        response = storage.connection.meta.client.delete_objects(
+            Bucket=storage.bucket_name,
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': False},
+        )
+        # Удаленными считаются только ключи из Deleted: ключи из Errors остались в R2
+        deleted = [keys[item['Key']] for item in response.get('Deleted', ()) if item['Key'] in keys]
+        disk_cache = getattr(storage, 'disk_cache', None)
+        if disk_cache is not None:
+            for name in deleted:
+                disk_cache.invalidate(storage._normalize_name(name))
+        errors = [f"{error['Key']}: {error.get('Message', error.get('Code'))}" for error in response.get('Errors', ())]
+        return deleted, errors
+    deleted, errors = [], []
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError as e:
+            errors.append(f'{name}: {e}')
+        else:
+            deleted.append(name)
+    return deleted, errors
+
+
+def collect_orphans(storage, dry_run=True, min_age=timedelta(days=1), on_orphan=None):
+    """
+    Найти (и при dry_run=False удалить) медиа файлы без ссылок
+
+    Args:
+        storage: Медиа хранилище (default_storage)
+        dry_run: Только найти, ничего не удалять
+        min_age: Не трогать объекты моложе этого возраста
+        on_orphan: Вызывается для каждого найденного файла (имя)
+
+    Returns:
+        dict: scanned, orphaned, deleted, errors (список)
+    """
+    stats = {'scanned': 0, 'orphaned': 0, 'deleted': 0, 'errors': []}
+    cutoff = datetime.now(timezone.utc) - min_age
+    with NameSet() as names:
+        collect_references(names)
+        batch = []
+        for name, modified in list_media(storage):
+            stats['scanned'] += 1
+            if modified > cutoff or is_referenced(name, names):
+                continue
+            stats['orphaned'] += 1
+            if on_orphan:
+                on_orphan(name)
+            if dry_run:
+                continue
+            batch.append(name)
+            if len(batch) >= DELETE_BATCH:
+                _flush(storage, batch, stats)
+                batch = []
+        _flush(storage, batch, stats)
+    return stats
+
+
+def _flush(storage, batch, stats):
+    """Удалить пакет файлов и их записи в реестре загрузок CKEditor"""
+    from .models import EditorUpload
+
+    deleted, errors = delete_batch(storage, batch)
+    stats['deleted'] += len(deleted)
+    stats['errors'].extend(errors)
+    if deleted:
+        EditorUpload.objects.filter(name__in=deleted).delete()
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:22
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """GIN индекс (PostgreSQL) или FTS5 таблица (SQLite) и начальное заполнение"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX core_publication_search_gin ON core_publication USING gin (search_vector)'
+        )
+        schema_editor.execute(
+            "UPDATE core_publication SET search_vector = "
+            "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(keywords, '')), 'B') || "
+            "setweight(to_tsvector('russian', coalesce(authors, '')), 'B') || "
+            "setweight(to_tsvector('russian', coalesce(abstract, '')), 'C')"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE core_publication_fts USING fts5("
+            "title, authors, keywords, abstract, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            'INSERT INTO core_publication_fts (rowid, title, authors, keywords, abstract) '
+            'SELECT id, title, authors, keywords, abstract FROM core_publication'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS core_publication_search_gin')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS core_publication_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_alter_book_price_alter_service_price_from'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
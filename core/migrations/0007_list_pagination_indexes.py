@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_publication_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['is_published', '-published_at', '-created_at', '-id'], name='core_blog_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['is_available', '-is_featured', 'order', '-publication_year', 'id'], name='core_book_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['-year', 'title', 'id'], name='core_pub_list_idx'),
+        ),
+    ]
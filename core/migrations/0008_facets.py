@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+def populate_facets(apps, schema_editor):
+    """Начальное заполнение фасетов по существующим данным"""
+    Facet = apps.get_model('core', 'Facet')
+    Publication = apps.get_model('core', 'Publication')
+    Book = apps.get_model('core', 'Book')
+    BlogPost = apps.get_model('core', 'BlogPost')
+
+    counts = {}
+
+    def add(kind, value):
+        counts[(kind, value)] = counts.get((kind, value), 0) + 1
+
+    for year, publication_type in Publication.objects.values_list('year', 'publication_type'):
+        add('publication_year', str(year))
+        add('publication_type', publication_type)
+    for year in Book.objects.filter(is_available=True).values_list('publication_year', flat=True):
+        add('book_year', str(year))
+    for category in BlogPost.objects.filter(is_published=True).exclude(category='').values_list('category', flat=True):
+        add('blog_category', category)
+
+    Facet.objects.bulk_create(
+        Facet(kind=kind, value=value, count=count) for (kind, value), count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Facet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('publication_year', 'Год публикации'), ('publication_type', 'Тип публикации'), ('book_year', 'Год издания книги'), ('blog_category', 'Категория блога')], max_length=30, verbose_name='Фильтр')),
+                ('value', models.CharField(max_length=255, verbose_name='Значение')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество')),
+            ],
+            options={
+                'verbose_name': 'Фасет',
+                'verbose_name_plural': 'Фасеты',
+                'ordering': ['kind', 'value'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='facet',
+            constraint=models.UniqueConstraint(fields=('kind', 'value'), name='core_facet_kind_value_uniq'),
+        ),
+        migrations.RunPython(populate_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,134 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def _terms(value):
+    terms = []
+    seen = set()
+    for raw in (value or '').split(','):
+        name = ' '.join(raw.split())[:100]
+        key = name.lower()
+        if key and key not in seen:
+            seen.add(key)
+            terms.append((name, key))
+    return terms
+
+
+def _populate(owners, field, term_model, link_model, owner_field, term_field):
+    parsed = [(owner, _terms(getattr(owner, field))) for owner in owners]
+    names = {}
+    for _, terms in parsed:
+        for name, key in terms:
+            names.setdefault(key, name)
+    term_model.objects.bulk_create(term_model(name=name, normalized=key) for key, name in names.items())
+    by_key = {term.normalized: term for term in term_model.objects.all()}
+    link_model.objects.bulk_create(
+        link_model(**{owner_field: owner, term_field: by_key[key], 'position': position})
+        for owner, terms in parsed
+        for position, (_, key) in enumerate(terms)
+    )
+
+
+def populate_terms(apps, schema_editor):
+    """Разложить строки BlogPost.tags и Publication.keywords в таблицы"""
+    _populate(
+        apps.get_model('core', 'BlogPost').objects.exclude(tags=''), 'tags',
+        apps.get_model('core', 'Tag'), apps.get_model('core', 'BlogPostTag'), 'post', 'tag',
+    )
+    _populate(
+        apps.get_model('core', 'Publication').objects.exclude(keywords=''), 'keywords',
+        apps.get_model('core', 'Keyword'), apps.get_model('core', 'PublicationKeyword'), 'publication', 'keyword',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_facets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Keyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('normalized', models.CharField(editable=False, max_length=100, unique=True, verbose_name='Нормализованное название')),
+            ],
+            options={
+                'verbose_name': 'Ключевое слово',
+                'verbose_name_plural': 'Ключевые слова',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('normalized', models.CharField(editable=False, max_length=100, unique=True, verbose_name='Нормализованное название')),
+            ],
+            options={
+                'verbose_name': 'Тег',
+                'verbose_name_plural': 'Теги',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PublicationKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0, verbose_name='Порядок')),
+                ('keyword', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='publication_links', to='core.keyword', verbose_name='Ключевое слово')),
+                ('publication', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keyword_links', to='core.publication', verbose_name='Публикация')),
+            ],
+            options={
+                'verbose_name': 'Ключевое слово публикации',
+                'verbose_name_plural': 'Ключевые слова публикаций',
+                'ordering': ['position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BlogPostTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0, verbose_name='Порядок')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='core.blogpost', verbose_name='Статья')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_links', to='core.tag', verbose_name='Тег')),
+            ],
+            options={
+                'verbose_name': 'Тег статьи',
+                'verbose_name_plural': 'Теги статей',
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='tag_items',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='posts', through='core.BlogPostTag', to='core.tag'),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='keyword_items',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='publications', through='core.PublicationKeyword', to='core.keyword'),
+        ),
+        migrations.AddIndex(
+            model_name='publicationkeyword',
+            index=models.Index(fields=['keyword', 'publication'], name='core_pubkeyword_keyword_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='publicationkeyword',
+            constraint=models.UniqueConstraint(fields=('publication', 'keyword'), name='core_publicationkeyword_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='blogposttag',
+            index=models.Index(fields=['tag', 'post'], name='core_blogposttag_tag_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='blogposttag',
+            constraint=models.UniqueConstraint(fields=('post', 'tag'), name='core_blogposttag_uniq'),
+        ),
+        migrations.RunPython(populate_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_outbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxmessage',
+            name='channel',
+            field=models.CharField(choices=[('telegram', 'Telegram'), ('email', 'Email')], max_length=20, verbose_name='Канал'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_outbox_email_channel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='achievement',
+            name='certificate_image_variants',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Ширины версий изображения'),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='featured_image_variants',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Ширины версий изображения'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='cover_image_variants',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Ширины версий изображения'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Ширины версий изображения'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Ширины версий изображения'),
+        ),
+        migrations.AddField(
+            model_name='testimonial',
+            name='client_photo_variants',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Ширины версий изображения'),
+        ),
+    ]
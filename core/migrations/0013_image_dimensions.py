@@ -0,0 +1,133 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='achievement',
+            name='certificate_image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота изображения'),
+        ),
+        migrations.AddField(
+            model_name='achievement',
+            name='certificate_image_placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Заглушка изображения (LQIP)'),
+        ),
+        migrations.AddField(
+            model_name='achievement',
+            name='certificate_image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина изображения'),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='featured_image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота изображения'),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='featured_image_placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Заглушка изображения (LQIP)'),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='featured_image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина изображения'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='cover_image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота изображения'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='cover_image_placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Заглушка изображения (LQIP)'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='cover_image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина изображения'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='photo_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота изображения'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='photo_placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Заглушка изображения (LQIP)'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='photo_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина изображения'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота изображения'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Заглушка изображения (LQIP)'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина изображения'),
+        ),
+        migrations.AddField(
+            model_name='testimonial',
+            name='client_photo_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота изображения'),
+        ),
+        migrations.AddField(
+            model_name='testimonial',
+            name='client_photo_placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Заглушка изображения (LQIP)'),
+        ),
+        migrations.AddField(
+            model_name='testimonial',
+            name='client_photo_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина изображения'),
+        ),
+        migrations.AlterField(
+            model_name='achievement',
+            name='certificate_image',
+            field=models.ImageField(blank=True, height_field='certificate_image_height', null=True, upload_to='achievements/', verbose_name='Изображение сертификата', width_field='certificate_image_width'),
+        ),
+        migrations.AlterField(
+            model_name='blogpost',
+            name='featured_image',
+            field=models.ImageField(blank=True, height_field='featured_image_height', null=True, upload_to='blog/', verbose_name='Изображение', width_field='featured_image_width'),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='cover_image',
+            field=models.ImageField(height_field='cover_image_height', upload_to='books/covers/', verbose_name='Обложка', width_field='cover_image_width'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='photo',
+            field=models.ImageField(blank=True, height_field='photo_height', null=True, upload_to='profile/', verbose_name='Фото профиля', width_field='photo_width'),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='image',
+            field=models.ImageField(blank=True, height_field='image_height', null=True, upload_to='projects/', verbose_name='Изображение', width_field='image_width'),
+        ),
+        migrations.AlterField(
+            model_name='testimonial',
+            name='client_photo',
+            field=models.ImageField(blank=True, height_field='client_photo_height', null=True, upload_to='testimonials/', verbose_name='Фото клиента', width_field='client_photo_width'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='pdf_preview',
+            field=models.ImageField(blank=True, editable=False, height_field='pdf_preview_height', upload_to='books/previews/', verbose_name='Превью PDF', width_field='pdf_preview_width'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='pdf_preview_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота изображения'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='pdf_preview_placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Заглушка изображения (LQIP)'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='pdf_preview_variants',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Ширины версий изображения'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='pdf_preview_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина изображения'),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='pdf_preview',
+            field=models.ImageField(blank=True, editable=False, height_field='pdf_preview_height', upload_to='publications/previews/', verbose_name='Превью PDF', width_field='pdf_preview_width'),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='pdf_preview_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота изображения'),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='pdf_preview_placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Заглушка изображения (LQIP)'),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='pdf_preview_variants',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Ширины версий изображения'),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='pdf_preview_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина изображения'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_pdf_previews'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaCompression',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=500, verbose_name='Файл')),
+                ('content_type', models.CharField(max_length=100, verbose_name='Тип содержимого')),
+                ('reason', models.CharField(choices=[('compressed', 'Сжат gzip'), ('precompressed', 'Формат уже сжат'), ('low_ratio', 'Сжатие неэффективно'), ('not_text', 'Тип не сжимается')], max_length=20, verbose_name='Решение')),
+                ('encoding', models.CharField(blank=True, max_length=20, verbose_name='Content-Encoding')),
+                ('original_size', models.BigIntegerField(verbose_name='Исходный размер')),
+                ('stored_size', models.BigIntegerField(verbose_name='Размер в хранилище')),
+                ('sample_ratio', models.FloatField(blank=True, help_text='Размер gzip / исходный размер для первых байт файла', null=True, verbose_name='Степень сжатия образца')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+            ],
+            options={
+                'verbose_name': 'Сжатие медиа файла',
+                'verbose_name_plural': 'Сжатие медиа файлов',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:58
+
+from django.db import migrations, models
+
+
+def populate_references(apps, schema_editor):
+    """Записать ссылки на файлы для существующих объектов"""
+    reference_model = apps.get_model('core', 'MediaReference')
+    references = []
+    for model in apps.get_app_config('core').get_models():
+        fields = [field.name for field in model._meta.concrete_fields if isinstance(field, models.FileField)]
+        for field_name in fields:
+            rows = model._base_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            for pk, name in rows.values_list('pk', field_name).iterator():
+                references.append(reference_model(
+                    name=name, model=model._meta.label_lower, object_id=str(pk), field=field_name,
+                ))
+    reference_model.objects.bulk_create(references, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_media_compression'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=500, verbose_name='Файл')),
+                ('model', models.CharField(max_length=100, verbose_name='Модель')),
+                ('object_id', models.CharField(max_length=64, verbose_name='ID объекта')),
+                ('field', models.CharField(max_length=100, verbose_name='Поле')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Ссылка на медиа файл',
+                'verbose_name_plural': 'Ссылки на медиа файлы',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='mediareference',
+            constraint=models.UniqueConstraint(fields=('model', 'object_id', 'field'), name='unique_media_reference'),
+        ),
+        migrations.RunPython(populate_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_media_references'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EditorUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=500, unique=True, verbose_name='Файл')),
+                ('original_name', models.CharField(blank=True, max_length=255, verbose_name='Исходное имя')),
+                ('thumbnail', models.CharField(blank=True, max_length=500, verbose_name='Миниатюра')),
+                ('is_image', models.BooleanField(default=False, verbose_name='Изображение')),
+                ('width', models.PositiveIntegerField(blank=True, null=True, verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(blank=True, null=True, verbose_name='Высота')),
+                ('size', models.BigIntegerField(default=0, verbose_name='Размер')),
+                ('uploaded_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Загружено')),
+            ],
+            options={
+                'verbose_name': 'Файл CKEditor',
+                'verbose_name_plural': 'Файлы CKEditor',
+                'ordering': ['-uploaded_at', '-id'],
+                'indexes': [models.Index(fields=['-uploaded_at', '-id'], name='core_editorupload_list_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_editor_uploads'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='achievement',
+            name='certificate_image',
+            field=models.ImageField(blank=True, null=True, upload_to='achievements/', verbose_name='Изображение сертификата'),
+        ),
+        migrations.AlterField(
+            model_name='blogpost',
+            name='featured_image',
+            field=models.ImageField(blank=True, null=True, upload_to='blog/', verbose_name='Изображение'),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='cover_image',
+            field=models.ImageField(upload_to='books/covers/', verbose_name='Обложка'),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='pdf_preview',
+            field=models.ImageField(blank=True, editable=False, upload_to='books/previews/', verbose_name='Превью PDF'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, upload_to='profile/', verbose_name='Фото профиля'),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to='projects/', verbose_name='Изображение'),
+        ),
+        migrations.AlterField(
+            model_name='publication',
+            name='pdf_preview',
+            field=models.ImageField(blank=True, editable=False, upload_to='publications/previews/', verbose_name='Превью PDF'),
+        ),
+        migrations.AlterField(
+            model_name='testimonial',
+            name='client_photo',
+            field=models.ImageField(blank=True, null=True, upload_to='testimonials/', verbose_name='Фото клиента'),
+        ),
+    ]
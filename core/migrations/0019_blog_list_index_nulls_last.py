@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:31
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_image_dimensions_plain_fields'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='blogpost',
+            name='core_blog_list_idx',
+        ),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=core.models.KeysetIndex(models.F('is_published'), models.OrderBy(models.F('published_at'), descending=True, nulls_last=True), models.OrderBy(models.F('created_at'), descending=True), models.OrderBy(models.F('id'), descending=True), name='core_blog_list_idx'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
 from django.urls import reverse
 from django.utils.text import slugify
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.contrib.postgres.search import SearchVectorField
 from ckeditor.fields import RichTextField
 from ckeditor_uploader.fields import RichTextUploadingField
 
@@ -9,7 +11,13 @@ from ckeditor_uploader.fields import RichTextUploadingField
 class Profile(models.Model):
     """Профиль социолога"""
     full_name = models.CharField('ФИО', max_length=255)
-    photo = models.ImageField('Фото профиля', upload_to='profile/', blank=True, null=True)
+    photo = models.ImageField(
+        'Фото профиля', upload_to='profile/', blank=True, null=True,
+    )
+    photo_variants = models.JSONField('Ширины версий изображения', default=list, blank=True, editable=False)
+    photo_width = models.PositiveIntegerField('Ширина изображения', blank=True, null=True, editable=False)
+    photo_height = models.PositiveIntegerField('Высота изображения', blank=True, null=True, editable=False)
+    photo_placeholder = models.TextField('Заглушка изображения (LQIP)', blank=True, editable=False)
     birth_date = models.DateField('Дата рождения', blank=True, null=True)
     education = models.TextField('Образование')
     academic_degree = models.CharField('Ученая степень', max_length=255, blank=True)
@@ -86,9 +94,23 @@ class Publication(models.Model):
     link = models.URLField('Ссылка', blank=True)
     abstract = models.TextField('Аннотация', blank=True)
     keywords = models.CharField('Ключевые слова', max_length=500, blank=True, help_text='Через запятую')
+    # Нормализованные ключевые слова, синхронизируются с keywords сигналами
+    keyword_items = models.ManyToManyField(
+        'Keyword', through='PublicationKeyword', related_name='publications', blank=True, editable=False
+    )
     citation_count = models.IntegerField('Цитирования', default=0)
     pdf_file = models.FileField('PDF файл', upload_to='publications/', blank=True, null=True)
+    # Первая страница PDF, создается при загрузке (см. core/pdf_previews.py)
+    pdf_preview = models.ImageField(
+        'Превью PDF', upload_to='publications/previews/', blank=True, editable=False,
+    )
+    pdf_preview_variants = models.JSONField('Ширины версий изображения', default=list, blank=True, editable=False)
+    pdf_preview_width = models.PositiveIntegerField('Ширина изображения', blank=True, null=True, editable=False)
+    pdf_preview_height = models.PositiveIntegerField('Высота изображения', blank=True, null=True, editable=False)
+    pdf_preview_placeholder = models.TextField('Заглушка изображения (LQIP)', blank=True, editable=False)
     is_featured = models.BooleanField('Избранная', default=False)
+    # Поддерживается сигналами, см. core/search.py (только PostgreSQL)
+    search_vector = SearchVectorField('Поисковый вектор', null=True, editable=False)
     created_at = models.DateTimeField('Создано', auto_now_add=True)
     updated_at = models.DateTimeField('Обновлено', auto_now=True)
     
@@ -96,6 +118,10 @@ class Publication(models.Model):
         verbose_name = 'Публикация'
         verbose_name_plural = 'Публикации'
         ordering = ['-year', 'title']
+        indexes = [
+            # Keyset-пагинация списка публикаций
+            models.Index(fields=['-year', 'title', 'id'], name='core_pub_list_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.year})"
@@ -114,7 +140,13 @@ class Project(models.Model):
     organization = models.CharField('Организация', max_length=255)
     funding = models.CharField('Финансирование', max_length=255, blank=True)
     results = models.TextField('Результаты', blank=True)
-    image = models.ImageField('Изображение', upload_to='projects/', blank=True, null=True)
+    image = models.ImageField(
+        'Изображение', upload_to='projects/', blank=True, null=True,
+    )
+    image_variants = models.JSONField('Ширины версий изображения', default=list, blank=True, editable=False)
+    image_width = models.PositiveIntegerField('Ширина изображения', blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField('Высота изображения', blank=True, null=True, editable=False)
+    image_placeholder = models.TextField('Заглушка изображения (LQIP)', blank=True, editable=False)
     is_active = models.BooleanField('Активный', default=True)
     order = models.IntegerField('Порядок', default=0)
     created_at = models.DateTimeField('Создано', auto_now_add=True)
@@ -134,15 +166,50 @@ class Project(models.Model):
         return self.end_date is None
 
 
+class KeysetIndex(models.Index):
+    """
+    Индекс для keyset-пагинации с NULLS LAST/FIRST в выражениях сортировки
+
+    PostgreSQL получает индекс как есть. SQLite не поддерживает NULLS LAST
+    в индексах, но и так ставит NULL в конец DESC (и в начало ASC), поэтому
+    там такие модификаторы опускаются.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor == 'postgresql' or not self.expressions:
+            return super().create_sql(model, schema_editor, using=using, **kwargs)
+        index = self.clone()
+        index.expressions = tuple(
+            models.OrderBy(expression.expression, descending=expression.descending)
+            if isinstance(expression, models.OrderBy) and (
+                (expression.descending and expression.nulls_last)
+                or (not expression.descending and expression.nulls_first)
+            )
+            else expression
+            for expression in self.expressions
+        )
+        return models.Index.create_sql(index, model, schema_editor, using=using, **kwargs)
+
+
 class BlogPost(models.Model):
     """Блог/Статьи"""
     title = models.CharField('Заголовок', max_length=500)
     slug = models.SlugField('URL slug', max_length=500, unique=True, blank=True)
     content = RichTextUploadingField('Содержание', config_name='default')
     excerpt = models.TextField('Краткое описание', max_length=500, blank=True)
-    featured_image = models.ImageField('Изображение', upload_to='blog/', blank=True, null=True)
+    featured_image = models.ImageField(
+        'Изображение', upload_to='blog/', blank=True, null=True,
+    )
+    featured_image_variants = models.JSONField('Ширины версий изображения', default=list, blank=True, editable=False)
+    featured_image_width = models.PositiveIntegerField('Ширина изображения', blank=True, null=True, editable=False)
+    featured_image_height = models.PositiveIntegerField('Высота изображения', blank=True, null=True, editable=False)
+    featured_image_placeholder = models.TextField('Заглушка изображения (LQIP)', blank=True, editable=False)
     category = models.CharField('Категория', max_length=100, blank=True)
     tags = models.CharField('Теги', max_length=500, blank=True, help_text='Через запятую')
+    # Нормализованные теги, синхронизируются с tags сигналами
+    tag_items = models.ManyToManyField(
+        'Tag', through='BlogPostTag', related_name='posts', blank=True, editable=False
+    )
     views_count = models.IntegerField('Просмотры', default=0)
     is_published = models.BooleanField('Опубликовано', default=True)
     published_at = models.DateTimeField('Дата публикации', blank=True, null=True)
@@ -153,6 +220,17 @@ class BlogPost(models.Model):
         verbose_name = 'Статья блога'
         verbose_name_plural = 'Статьи блога'
         ordering = ['-published_at', '-created_at']
+        indexes = [
+            # Keyset-пагинация блога: NULL в published_at идут в конце, как в
+            # KeysetPaginator (по умолчанию PostgreSQL ставит их в начало DESC)
+            KeysetIndex(
+                models.F('is_published'),
+                models.F('published_at').desc(nulls_last=True),
+                models.F('created_at').desc(),
+                models.F('id').desc(),
+                name='core_blog_list_idx',
+            ),
+        ]
     
     def __str__(self):
         return self.title
@@ -166,9 +244,10 @@ class BlogPost(models.Model):
         return reverse('blog_detail', kwargs={'slug': self.slug})
     
     def increment_views(self):
-        """Увеличить счетчик просмотров"""
+        """Увеличить счетчик просмотров (запись в БД буферизуется)"""
+        from .counters import record_view
+        record_view(type(self), self.slug)
         self.views_count += 1
-        self.save(update_fields=['views_count'])
 
 
 class ServiceOrder(models.Model):
@@ -207,7 +286,13 @@ class Achievement(models.Model):
     description = models.TextField('Описание')
     date = models.DateField('Дата')
     organization = models.CharField('Организация', max_length=255)
-    certificate_image = models.ImageField('Изображение сертификата', upload_to='achievements/', blank=True, null=True)
+    certificate_image = models.ImageField(
+        'Изображение сертификата', upload_to='achievements/', blank=True, null=True,
+    )
+    certificate_image_variants = models.JSONField('Ширины версий изображения', default=list, blank=True, editable=False)
+    certificate_image_width = models.PositiveIntegerField('Ширина изображения', blank=True, null=True, editable=False)
+    certificate_image_height = models.PositiveIntegerField('Высота изображения', blank=True, null=True, editable=False)
+    certificate_image_placeholder = models.TextField('Заглушка изображения (LQIP)', blank=True, editable=False)
     order = models.IntegerField('Порядок', default=0)
     created_at = models.DateTimeField('Создано', auto_now_add=True)
     updated_at = models.DateTimeField('Обновлено', auto_now=True)
@@ -226,7 +311,13 @@ class Testimonial(models.Model):
     client_name = models.CharField('Имя клиента', max_length=255)
     client_position = models.CharField('Должность', max_length=255)
     client_organization = models.CharField('Организация', max_length=255)
-    client_photo = models.ImageField('Фото клиента', upload_to='testimonials/', blank=True, null=True)
+    client_photo = models.ImageField(
+        'Фото клиента', upload_to='testimonials/', blank=True, null=True,
+    )
+    client_photo_variants = models.JSONField('Ширины версий изображения', default=list, blank=True, editable=False)
+    client_photo_width = models.PositiveIntegerField('Ширина изображения', blank=True, null=True, editable=False)
+    client_photo_height = models.PositiveIntegerField('Высота изображения', blank=True, null=True, editable=False)
+    client_photo_placeholder = models.TextField('Заглушка изображения (LQIP)', blank=True, editable=False)
     text = models.TextField('Текст отзыва')
     rating = models.IntegerField('Рейтинг', validators=[MinValueValidator(1), MaxValueValidator(5)], default=5)
     is_approved = models.BooleanField('Одобрен', default=False)
@@ -266,8 +357,22 @@ class Book(models.Model):
     author = models.CharField('Автор(ы)', max_length=500, default='Ахмедова Ф.М.')
     description = RichTextUploadingField('Описание', config_name='default')
     short_description = models.TextField('Краткое описание', max_length=500, blank=True)
-    cover_image = models.ImageField('Обложка', upload_to='books/covers/')
+    cover_image = models.ImageField(
+        'Обложка', upload_to='books/covers/',
+    )
+    cover_image_variants = models.JSONField('Ширины версий изображения', default=list, blank=True, editable=False)
+    cover_image_width = models.PositiveIntegerField('Ширина изображения', blank=True, null=True, editable=False)
+    cover_image_height = models.PositiveIntegerField('Высота изображения', blank=True, null=True, editable=False)
+    cover_image_placeholder = models.TextField('Заглушка изображения (LQIP)', blank=True, editable=False)
     pdf_file = models.FileField('PDF файл', upload_to='books/pdfs/', help_text='PDF файл книги для просмотра')
+    # Первая страница PDF, создается при загрузке (см. core/pdf_previews.py)
+    pdf_preview = models.ImageField(
+        'Превью PDF', upload_to='books/previews/', blank=True, editable=False,
+    )
+    pdf_preview_variants = models.JSONField('Ширины версий изображения', default=list, blank=True, editable=False)
+    pdf_preview_width = models.PositiveIntegerField('Ширина изображения', blank=True, null=True, editable=False)
+    pdf_preview_height = models.PositiveIntegerField('Высота изображения', blank=True, null=True, editable=False)
+    pdf_preview_placeholder = models.TextField('Заглушка изображения (LQIP)', blank=True, editable=False)
     
     # Издательская информация
     publisher = models.CharField('Издательство', max_length=255, blank=True)
@@ -297,6 +402,10 @@ class Book(models.Model):
         verbose_name = 'Книга'
         verbose_name_plural = 'Книги'
         ordering = ['-is_featured', 'order', '-publication_year']
+        indexes = [
+            # Keyset-пагинация каталога книг
+            models.Index(fields=['is_available', '-is_featured', 'order', '-publication_year', 'id'], name='core_book_list_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.publication_year})"
@@ -310,9 +419,10 @@ class Book(models.Model):
         return reverse('book_detail', kwargs={'slug': self.slug})
     
     def increment_views(self):
-        """Увеличить счетчик просмотров"""
+        """Увеличить счетчик просмотров (запись в БД буферизуется)"""
+        from .counters import record_view
+        record_view(type(self), self.slug)
         self.views_count += 1
-        self.save(update_fields=['views_count'])
 
 
 class BookOrder(models.Model):
@@ -351,3 +461,202 @@ class BookOrder(models.Model):
             return int(self.book.price) * self.quantity
         return None
 
+
+
+class Facet(models.Model):
+    """Количество объектов для значений фильтров (обновляется сигналами)"""
+    KIND_CHOICES = [
+        ('publication_year', 'Год публикации'),
+        ('publication_type', 'Тип публикации'),
+        ('book_year', 'Год издания книги'),
+        ('blog_category', 'Категория блога'),
+    ]
+    
+    kind = models.CharField('Фильтр', max_length=30, choices=KIND_CHOICES)
+    value = models.CharField('Значение', max_length=255)
+    count = models.IntegerField('Количество', default=0)
+    
+    class Meta:
+        verbose_name = 'Фасет'
+        verbose_name_plural = 'Фасеты'
+        ordering = ['kind', 'value']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'value'], name='core_facet_kind_value_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.value} ({self.count})"
+
+
+class Tag(models.Model):
+    """Тег статьи блога"""
+    name = models.CharField('Название', max_length=100)
+    normalized = models.CharField('Нормализованное название', max_length=100, unique=True, editable=False)
+    
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
+class BlogPostTag(models.Model):
+    """Связь статьи блога и тега"""
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='tag_links', verbose_name='Статья')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='post_links', verbose_name='Тег')
+    position = models.PositiveSmallIntegerField('Порядок', default=0)
+    
+    class Meta:
+        verbose_name = 'Тег статьи'
+        verbose_name_plural = 'Теги статей'
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'tag'], name='core_blogposttag_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', 'post'], name='core_blogposttag_tag_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.post} — {self.tag}"
+
+
+class Keyword(models.Model):
+    """Ключевое слово публикации"""
+    name = models.CharField('Название', max_length=100)
+    normalized = models.CharField('Нормализованное название', max_length=100, unique=True, editable=False)
+    
+    class Meta:
+        verbose_name = 'Ключевое слово'
+        verbose_name_plural = 'Ключевые слова'
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
+class PublicationKeyword(models.Model):
+    """Связь публикации и ключевого слова"""
+    publication = models.ForeignKey(Publication, on_delete=models.CASCADE, related_name='keyword_links', verbose_name='Публикация')
+    keyword = models.ForeignKey(Keyword, on_delete=models.CASCADE, related_name='publication_links', verbose_name='Ключевое слово')
+    position = models.PositiveSmallIntegerField('Порядок', default=0)
+    
+    class Meta:
+        verbose_name = 'Ключевое слово публикации'
+        verbose_name_plural = 'Ключевые слова публикаций'
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['publication', 'keyword'], name='core_publicationkeyword_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['keyword', 'publication'], name='core_pubkeyword_keyword_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.publication} — {self.keyword}"
+
+
+class OutboxMessage(models.Model):
+    """Исходящее уведомление (outbox), доставляется воркером после коммита заказа"""
+    CHANNEL_CHOICES = [
+        ('telegram', 'Telegram'),
+        ('email', 'Email'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает отправки'),
+        ('sent', 'Отправлено'),
+        ('dead', 'Не доставлено'),
+    ]
+    
+    channel = models.CharField('Канал', max_length=20, choices=CHANNEL_CHOICES)
+    payload = models.JSONField('Данные сообщения')
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    next_attempt_at = models.DateTimeField('Следующая попытка', default=timezone.now)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    sent_at = models.DateTimeField('Отправлено', blank=True, null=True)
+    
+    class Meta:
+        verbose_name = 'Исходящее уведомление'
+        verbose_name_plural = 'Исходящие уведомления'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='core_outbox_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_channel_display()} #{self.pk} ({self.get_status_display()})"
+
+
+class MediaCompression(models.Model):
+    """Решение о сжатии файла, загруженного в MediaStorage (см. core/compression.py)"""
+    REASON_CHOICES = [
+        ('compressed', 'Сжат gzip'),
+        ('precompressed', 'Формат уже сжат'),
+        ('low_ratio', 'Сжатие неэффективно'),
+        ('not_text', 'Тип не сжимается'),
+    ]
+    
+    name = models.CharField('Файл', max_length=500, db_index=True)
+    content_type = models.CharField('Тип содержимого', max_length=100)
+    reason = models.CharField('Решение', max_length=20, choices=REASON_CHOICES)
+    encoding = models.CharField('Content-Encoding', max_length=20, blank=True)
+    original_size = models.BigIntegerField('Исходный размер')
+    stored_size = models.BigIntegerField('Размер в хранилище')
+    sample_ratio = models.FloatField('Степень сжатия образца', blank=True, null=True,
+                                     help_text='Размер gzip / исходный размер для первых байт файла')
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Сжатие медиа файла'
+        verbose_name_plural = 'Сжатие медиа файлов'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.name} ({self.get_reason_display()})"
+
+
+class MediaReference(models.Model):
+    """Ссылка поля модели на файл в медиа хранилище (см. core/uploads.py)"""
+    name = models.CharField('Файл', max_length=500, db_index=True)
+    model = models.CharField('Модель', max_length=100)
+    object_id = models.CharField('ID объекта', max_length=64)
+    field = models.CharField('Поле', max_length=100)
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Ссылка на медиа файл'
+        verbose_name_plural = 'Ссылки на медиа файлы'
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id', 'field'], name='unique_media_reference'),
+        ]
+    
+    def __str__(self):
+        return f"{self.model} #{self.object_id}.{self.field} -> {self.name}"
+
+
+class EditorUpload(models.Model):
+    """Файл, загруженный через CKEditor (реестр для браузера файлов, см. core/editor_uploads.py)"""
+    name = models.CharField('Файл', max_length=500, unique=True)
+    original_name = models.CharField('Исходное имя', max_length=255, blank=True)
+    thumbnail = models.CharField('Миниатюра', max_length=500, blank=True)
+    is_image = models.BooleanField('Изображение', default=False)
+    width = models.PositiveIntegerField('Ширина', blank=True, null=True)
+    height = models.PositiveIntegerField('Высота', blank=True, null=True)
+    size = models.BigIntegerField('Размер', default=0)
+    uploaded_at = models.DateTimeField('Загружено', default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Файл CKEditor'
+        verbose_name_plural = 'Файлы CKEditor'
+        ordering = ['-uploaded_at', '-id']
+        indexes = [
+            # Страницы браузера файлов (keyset по дате загрузки)
+            models.Index(fields=['-uploaded_at', '-id'], name='core_editorupload_list_idx'),
+        ]
+    
+    def __str__(self):
+        return self.original_name or self.name
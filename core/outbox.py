@@ -0,0 +1,286 @@
+"""
+Outbox для исходящих уведомлений
+
+Уведомление записывается в таблицу OutboxMessage в той же транзакции,
+что и заказ, поэтому запрос клиента не ждет внешний API, а уведомление не
+теряется при сбое. Воркер (manage.py process_outbox) забирает готовые к
+отправке сообщения после коммита, повторяет неудачные попытки с
+экспоненциальной задержкой и после OUTBOX_MAX_ATTEMPTS (или сразу при
+постоянной ошибке) переводит сообщение в статус 'dead'.
+
+Каналы с соединением (email) открывают его один раз на весь запуск
+воркера, а не на каждое сообщение.
+
+Режим сводки (TELEGRAM_DIGEST_WINDOW > 0): уведомления о заказах ждут
+окончания окна (или TELEGRAM_DIGEST_MAX_ORDERS заказов) и уходят одним
+сообщением со сводной таблицей.
+"""
+
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .telegram_notifications import TelegramError, get_client, format_order_digest
+
+
+class PermanentError(Exception):
+    """Ошибка, которую бессмысленно повторять (сообщение сразу уходит в 'dead')"""
+
+
+def _send_telegram(payload, connection=None):
+    client = get_client()
+    chat_id = getattr(settings, 'TELEGRAM_CHAT_ID', '')
+    if client is None or not chat_id:
+        raise RuntimeError('TELEGRAM_BOT_TOKEN или TELEGRAM_CHAT_ID не настроены')
+    try:
+        client.send_message(chat_id, payload['text'], payload.get('parse_mode', 'HTML'))
+    except TelegramError as e:
+        if e.permanent:
+            raise PermanentError(str(e)) from e
+        raise
+
+
+# Коды SMTP, при которых повтор не поможет: ящик не существует (550),
+# пользователь не здесь (551), недопустимое имя ящика (553)
+PERMANENT_SMTP_CODES = frozenset({550, 551, 553})
+
+
+def _open_email_connection():
+    connection = get_connection(fail_silently=False)
+    connection.open()
+    return connection
+
+
+def _send_email(payload, connection=None):
+    message = EmailMultiAlternatives(
+        subject=payload['subject'],
+        body=payload['body'],
+        from_email=payload.get('from_email') or settings.DEFAULT_FROM_EMAIL,
+        to=payload['to'],
+        reply_to=payload.get('reply_to'),
+        connection=connection,
+    )
+    if payload.get('html'):
+        message.attach_alternative(payload['html'], 'text/html')
+    try:
+        message.send()
+    except smtplib.SMTPRecipientsRefused as e:
+        raise PermanentError(f'Адрес отклонен: {", ".join(e.recipients)}') from e
+    except smtplib.SMTPResponseException as e:
+        # Постоянные только отказы по адресу; остальное (4xx, ошибки
+        # авторизации 530/535, сбои сервера) повторяется с задержкой
+        if e.smtp_code in PERMANENT_SMTP_CODES:
+            raise PermanentError(f'SMTP {e.smtp_code}: {e.smtp_error!r}') from e
+        raise
+
+
+# Канал -> функция доставки; исключение означает неудачную попытку
+DISPATCHERS = {
+    'telegram': _send_telegram,
+    'email': _send_email,
+}
+
+# Канал -> фабрика соединения, общего для всех сообщений канала за запуск
+CONNECTIONS = {
+    'email': _open_email_connection,
+}
+
+
+def enqueue(channel, payload):
+    """
+    Поставить сообщение в очередь
+
+    Вызывается внутри транзакции, создающей заказ: воркер увидит
+    сообщение только после коммита.
+
+    Args:
+        channel: Канал доставки ('telegram', 'email')
+        payload: JSON-совместимые данные для функции доставки
+
+    Returns:
+        OutboxMessage
+    """
+    return OutboxMessage.objects.create(channel=channel, payload=payload)
+
+
+def enqueue_order_notification(text, summary):
+    """
+    Поставить в очередь уведомление о заказе в Telegram
+
+    В режиме сводки сообщение откладывается до конца окна; когда набирается
+    TELEGRAM_DIGEST_MAX_ORDERS заказов, все ожидающие уходят сразу.
+
+    Args:
+        text: Полный текст уведомления об одном заказе
+        summary: Данные для сводки (order_summary)
+    """
+    window = getattr(settings, 'TELEGRAM_DIGEST_WINDOW', 0)
+    if not window:
+        return enqueue('telegram', {'text': text})
+
+    now = timezone.now()
+    message = OutboxMessage.objects.create(
+        channel='telegram',
+        payload={'text': text, 'order': summary},
+        next_attempt_at=now + timedelta(seconds=window),
+    )
+    waiting = OutboxMessage.objects.filter(
+        channel='telegram', status='pending', attempts=0,
+        next_attempt_at__gt=now, payload__has_key='order',
+    )
+    if waiting.count() >= getattr(settings, 'TELEGRAM_DIGEST_MAX_ORDERS', 20):
+        waiting.update(next_attempt_at=now)
+    return message
+
+
+def retry_delay(attempts):
+    """Задержка перед следующей попыткой (секунды): base * 2^(n-1), не больше max"""
+    base = getattr(settings, 'OUTBOX_RETRY_BASE', 30)
+    limit = getattr(settings, 'OUTBOX_RETRY_MAX', 3600)
+    return min(base * 2 ** (attempts - 1), limit)
+
+
+def claim_due(limit):
+    """
+    Забрать готовые к отправке сообщения
+
+    Сообщения резервируются сдвигом next_attempt_at на OUTBOX_LEASE секунд,
+    поэтому параллельные воркеры не отправят одно сообщение дважды, а
+    сообщения упавшего воркера вернутся в очередь после истечения аренды.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'OUTBOX_LEASE', 300))
+    queryset = OutboxMessage.objects.filter(status='pending', next_attempt_at__lte=now)
+    with transaction.atomic():
+        ids = list(
+            queryset.select_for_update(skip_locked=True)
+            .order_by('next_attempt_at', 'pk')
+            .values_list('pk', flat=True)[:limit]
+        )
+        OutboxMessage.objects.filter(pk__in=ids).update(next_attempt_at=now + lease)
+    return list(OutboxMessage.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def deliver(message, connection=None):
+    """
+    Одна попытка доставки сообщения
+
+    Args:
+        message: OutboxMessage
+        connection: Открытое соединение канала (см. CONNECTIONS)
+
+    Returns:
+        bool: True если сообщение доставлено
+    """
+    error, permanent = _attempt(message.channel, [message.payload], connection)
+    return _record(message, error, permanent)
+
+
+def deliver_digest(messages):
+    """
+    Доставить уведомления о заказах одной сводкой
+
+    Сводка делится на части по лимиту Telegram; при ошибке все сообщения
+    группы повторяются вместе.
+
+    Returns:
+        bool: True если сводка доставлена
+    """
+    parts = format_order_digest([message.payload['order'] for message in messages])
+    error, permanent = _attempt('telegram', [{'text': part} for part in parts])
+    results = [_record(message, error, permanent) for message in messages]
+    return all(results)
+
+
+def _attempt(channel, payloads, connection=None):
+    """Отправить payloads по каналу; возвращает (ошибка или None, постоянная ли)"""
+    try:
+        for payload in payloads:
+            DISPATCHERS[channel](payload, connection)
+    except PermanentError as e:
+        return str(e), True
+    except Exception as e:
+        return str(e) or e.__class__.__name__, False
+    return None, False
+
+
+def _record(message, error, permanent):
+    """Сохранить результат попытки"""
+    now = timezone.now()
+    message.attempts += 1
+    if error is None:
+        message.status = 'sent'
+        message.sent_at = now
+        message.last_error = ''
+    else:
+        message.last_error = error
+        if permanent or message.attempts >= getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 8):
+            message.status = 'dead'
+            print(f"❌ Уведомление #{message.pk} не доставлено после {message.attempts} попыток: {error}")
+        else:
+            message.next_attempt_at = now + timedelta(seconds=retry_delay(message.attempts))
+    message.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+    return error is None
+
+
+def process_outbox(batch_size=None):
+    """
+    Отправить все сообщения, готовые к отправке
+
+    Returns:
+        tuple[int, int]: (доставлено, неудачных попыток)
+    """
+    batch_size = batch_size or getattr(settings, 'OUTBOX_BATCH_SIZE', 50)
+    sent = failed = 0
+    connections = {}
+    try:
+        while True:
+            claimed = messages = claim_due(batch_size)
+            if getattr(settings, 'TELEGRAM_DIGEST_WINDOW', 0):
+                digest = [m for m in messages if m.channel == 'telegram' and 'order' in m.payload]
+                if len(digest) > 1:
+                    if deliver_digest(digest):
+                        sent += len(digest)
+                    else:
+                        failed += len(digest)
+                    messages = [m for m in messages if m not in digest]
+            for message in messages:
+                channel = message.channel
+                if channel in CONNECTIONS and channel not in connections:
+                    try:
+                        connections[channel] = CONNECTIONS[channel]()
+                    except Exception as e:
+                        print(f"❌ Не удалось открыть соединение для канала {channel}: {e}")
+                        connections[channel] = None
+
+                if deliver(message, connections.get(channel)):
+                    sent += 1
+                else:
+                    failed += 1
+                    # После ошибки соединение могло оборваться — откроем новое
+                    _close(connections.pop(channel, None))
+            if len(claimed) < batch_size:
+                return sent, failed
+    finally:
+        for connection in connections.values():
+            _close(connection)
+
+
+def _close(connection):
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def requeue(queryset):
+    """Вернуть сообщения (например, из 'dead') в очередь с обнулением попыток"""
+    return queryset.exclude(status='sent').update(
+        status='pending', attempts=0, next_attempt_at=timezone.now(), last_error=''
+    )
@@ -0,0 +1,236 @@
+"""
+Keyset (cursor) пагинация для списков публикаций, статей и книг
+
+Кнопки "Пред./След." используют курсор — значения ключей сортировки
+последней (первой) строки страницы, поэтому глубокие страницы выбираются
+по индексу без OFFSET и без COUNT(*). Ссылки с номерами страниц
+продолжают работать через OFFSET, а общее количество берется из кеша.
+"""
+
+import base64
+import hashlib
+import json
+from collections.abc import Sequence
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+
+COUNT_KEY = 'core:page-count:{digest}'
+COUNT_TIMEOUT = 300
+
+
+class InvalidCursor(Exception):
+    """Курсор поврежден или не соответствует сортировке"""
+
+
+class KeysetPage(Sequence):
+    """Страница результатов, совместимая с django.core.paginator.Page в шаблонах"""
+
+    def __init__(self, object_list, number, paginator, has_next, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_next = has_next
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<Page {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.number > 1
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class KeysetPaginator:
+    """
+    Пагинатор по ключам сортировки
+
+    Args:
+        queryset: QuerySet без сортировки (сортировка задается ordering)
+        per_page: Количество объектов на странице
+        ordering: Поля сортировки, как в Meta.ordering; последним должно
+            идти уникальное поле (обычно 'pk' / '-pk'). Без ordering
+            сохраняется сортировка queryset и работают только номера страниц
+            (например, для результатов поиска по релевантности).
+    """
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = [self._parse_field(name) for name in ordering] if ordering else None
+
+    def _parse_field(self, name):
+        descending = name.startswith('-')
+        field_name = name.lstrip('-')
+        model = self.queryset.model
+        field = model._meta.pk if field_name == 'pk' else model._meta.get_field(field_name)
+        return field_name, field, descending
+
+    # --- Количество ---
+
+    @property
+    def count(self):
+        """Приблизительное количество объектов (кешируется на COUNT_TIMEOUT секунд)"""
+        if not hasattr(self, '_count'):
+            sql, params = self.queryset.query.sql_with_params()
+            raw = f'{self.queryset.db}|{sql}|{params!r}'
+            key = COUNT_KEY.format(digest=hashlib.md5(raw.encode('utf-8')).hexdigest())
+            self._count = cache.get_or_set(key, self.queryset.count, COUNT_TIMEOUT)
+        return self._count
+
+    @property
+    def num_pages(self):
+        if not self.count:
+            return 1
+        return (self.count + self.per_page - 1) // self.per_page
+
+    @property
+    def page_range(self):
+        return range(1, self.num_pages + 1)
+
+    # --- Сортировка и курсоры ---
+
+    def _order_by(self, reverse=False):
+        """
+        Сортировка с NULL в конце (в обратном порядке — в начале)
+
+        NULLS LAST/FIRST задается только для полей с null=True: порядок NULL
+        входит в сопоставление с индексом, и для остальных полей сортировка
+        должна совпадать с индексом как есть (см. core_blog_list_idx).
+        """
+        expressions = []
+        for field_name, field, descending in self.ordering:
+            if not field.null:
+                nulls = {}
+            elif reverse:
+                nulls = {'nulls_first': True}
+            else:
+                nulls = {'nulls_last': True}
+            if descending != reverse:
+                expressions.append(F(field_name).desc(**nulls))
+            else:
+                expressions.append(F(field_name).asc(**nulls))
+        return expressions
+
+    def _after(self, values, reverse=False):
+        """
+        Условие "строка идет после ключа values" для заданной сортировки
+
+        NULL всегда идут в конце прямой сортировки (nulls_last).
+        """
+        condition = Q()
+        prefix = Q()
+        for (field_name, field, descending), value in zip(self.ordering, values):
+            if value is None:
+                # После NULL (в прямом порядке) идут только NULL
+                step = Q(pk__in=[]) if not reverse else Q(**{f'{field_name}__isnull': False})
+                equal = Q(**{f'{field_name}__isnull': True})
+            else:
+                lookup = 'lt' if descending != reverse else 'gt'
+                step = Q(**{f'{field_name}__{lookup}': value})
+                if field.null and not reverse:
+                    step |= Q(**{f'{field_name}__isnull': True})
+                equal = Q(**{field_name: value})
+            condition |= prefix & step
+            prefix &= equal
+        return condition
+
+    def _key(self, obj):
+        return [getattr(obj, field.attname) for _, field, _ in self.ordering]
+
+    def encode_cursor(self, obj, number, direction):
+        values = [
+            None if value is None else field.value_to_string(obj)
+            for value, (_, field, _) in zip(self._key(obj), self.ordering)
+        ]
+        raw = json.dumps({'v': values, 'n': number, 'd': direction}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            data = json.loads(raw)
+            values = [
+                None if value is None else field.to_python(value)
+                for value, (_, field, _) in zip(data['v'], self.ordering)
+            ]
+            number = int(data['n'])
+            direction = data['d']
+        except (ValueError, TypeError, KeyError, ValidationError) as e:
+            raise InvalidCursor(str(e))
+        if len(values) != len(self.ordering) or direction not in ('next', 'prev') or number < 1:
+            raise InvalidCursor('cursor does not match ordering')
+        return values, number, direction
+
+    # --- Страницы ---
+
+    def _build_page(self, rows, number, has_next):
+        next_cursor = previous_cursor = None
+        if self.ordering and rows:
+            if has_next:
+                next_cursor = self.encode_cursor(rows[-1], number + 1, 'next')
+            if number > 1:
+                previous_cursor = self.encode_cursor(rows[0], number - 1, 'prev')
+        return KeysetPage(rows, number, self, has_next, next_cursor, previous_cursor)
+
+    def get_page(self, number=None, cursor=None):
+        """
+        Страница по курсору или по номеру
+
+        Неверный курсор или номер страницы приводит к первой странице.
+        """
+        if cursor and self.ordering:
+            try:
+                values, target, direction = self.decode_cursor(cursor)
+            except InvalidCursor:
+                return self.get_page(1)
+
+            if direction == 'next':
+                rows = list(
+                    self.queryset.filter(self._after(values)).order_by(*self._order_by())[:self.per_page + 1]
+                )
+                has_more = len(rows) > self.per_page
+                return self._build_page(rows[:self.per_page], target, has_more)
+
+            rows = list(
+                self.queryset.filter(self._after(values, reverse=True))
+                .order_by(*self._order_by(reverse=True))[:self.per_page]
+            )
+            rows.reverse()
+            if len(rows) < self.per_page:
+                # Дошли до начала списка
+                return self.get_page(1)
+            return self._build_page(rows, target, True)
+
+        try:
+            number = max(int(number or 1), 1)
+        except (TypeError, ValueError):
+            number = 1
+        offset = (number - 1) * self.per_page
+        queryset = self.queryset.order_by(*self._order_by()) if self.ordering else self.queryset
+        rows = list(queryset[offset:offset + self.per_page + 1])
+        if not rows and number > 1:
+            # Как Paginator.get_page: за пределами списка — последняя страница
+            return self.get_page(self.num_pages if number > self.num_pages else 1)
+        has_more = len(rows) > self.per_page
+        return self._build_page(rows[:self.per_page], number, has_more)
@@ -0,0 +1,94 @@
+"""
+Превью PDF файлов книг и публикаций
+
+При загрузке PDF первая страница рендерится (pypdfium2) в JPEG и
+сохраняется в поле pdf_preview. Дальше превью обрабатывается как обычное
+изображение (core/images.py): WebP/JPEG версии, размеры и заглушка LQIP.
+Страница книги показывает превью, а сам PDF загружается только по клику.
+"""
+
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from .images import FORMATS, process_instance, release_image, variants_field
+from .uploads import sync_references
+
+
+# Модель -> {поле PDF: поле превью}
+PDF_PREVIEWS = {
+    'core.book': {'pdf_file': 'pdf_preview'},
+    'core.publication': {'pdf_file': 'pdf_preview'},
+}
+
+
+def render_first_page(source, width=None):
+    """
+    Отрендерить первую страницу PDF
+
+    Args:
+        source: Файл (или путь) с PDF
+        width: Ширина изображения в пикселях (по умолчанию PDF_PREVIEW_WIDTH)
+
+    Returns:
+        PIL.Image.Image: Страница в RGB
+    """
+    import pypdfium2 as pdfium
+
+    width = width or getattr(settings, 'PDF_PREVIEW_WIDTH', 960)
+    pdf = pdfium.PdfDocument(source)
+    try:
+        page = pdf[0]
+        bitmap = page.render(scale=width / page.get_width())
+        return bitmap.to_pil().convert('RGB')
+    finally:
+        pdf.close()
+
+
+def preview_name(pdf_name):
+    """Имя файла превью: <имя PDF без расширения>.jpg"""
+    stem, _ = os.path.splitext(os.path.basename(pdf_name))
+    return f'{stem}.jpg'
+
+
+def generate_pdf_preview(instance, pdf_field='pdf_file'):
+    """
+    Создать (или удалить, если PDF убран) превью PDF объекта
+
+    Старое превью и его версии удаляются из storage, если их не использует
+    другая запись (одинаковые PDF дают одно превью, см. core/uploads.py).
+
+    Returns:
+        dict: Обновленные поля модели
+    """
+    model = type(instance)
+    preview_field = PDF_PREVIEWS[model._meta.label_lower][pdf_field]
+    pdf_file = getattr(instance, pdf_field)
+    preview = getattr(instance, preview_field)
+
+    if preview:
+        widths = getattr(instance, variants_field(preview_field)) or ()
+        release_image(preview.storage, preview.name, instance, preview_field, widths)
+
+    if not pdf_file:
+        # Размеры, версии и заглушку очищает process_instance
+        updates = {preview_field: ''}
+        model.objects.filter(pk=instance.pk).update(**updates)
+        for name, value in updates.items():
+            setattr(instance, name, value)
+        sync_references(instance)
+        updates.update(process_instance(instance, [preview_field]))
+        return updates
+
+    with pdf_file.open('rb') as source:
+        image = render_first_page(source)
+    buffer = io.BytesIO()
+    image.save(buffer, FORMATS['jpg'][0], quality=getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 80), optimize=True)
+
+    preview.save(preview_name(pdf_file.name), ContentFile(buffer.getvalue()), save=False)
+    model.objects.filter(pk=instance.pk).update(**{preview_field: preview.name})
+    sync_references(instance)
+    updates = process_instance(instance, [preview_field])
+    return {preview_field: preview.name, **updates}
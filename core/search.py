@@ -0,0 +1,196 @@
+"""
+Полнотекстовый поиск по публикациям
+
+PostgreSQL: поле search_vector (tsvector, русская морфология) с GIN индексом.
+SQLite (DEBUG): FTS5 таблица core_publication_fts, синхронизируемая сигналами.
+Оба варианта возвращают результаты по релевантности и фрагменты с подсветкой.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import Q, F, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Concat
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'core_publication_fts'
+
+# Маркеры подсветки; заменяются на <mark> после экранирования HTML
+START_SEL = '\x02'
+STOP_SEL = '\x03'
+
+
+def _vendor(using=None):
+    return (using or connection).vendor
+
+
+def publication_search_vector():
+    """Взвешенный поисковый вектор публикации (PostgreSQL)"""
+    from django.contrib.postgres.search import SearchVector
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('keywords', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('authors', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('abstract', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def _snippet_source():
+    return Concat(
+        'authors', Value('. '), 'keywords', Value('. '), 'abstract',
+    )
+
+
+# Окончания, отбрасываемые перед префиксным поиском (от длинных к коротким)
+RUSSIAN_ENDINGS = (
+    'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ией',
+    'ия', 'ие', 'ий', 'ый', 'ой', 'ая', 'яя', 'ое', 'ее', 'ов', 'ев',
+    'ах', 'ях', 'ом', 'ем', 'ам', 'ям',
+    'ы', 'и', 'а', 'я', 'о', 'е', 'у', 'ю', 'ь',
+)
+
+
+def _stem(word):
+    """Упрощенный русский стемминг: отбросить окончание, оставив >= 4 букв"""
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 4:
+            return word[:-len(ending)]
+    return word
+
+
+def _fts_query(query):
+    """
+    Строка запроса FTS5: каждое слово ищется по префиксу основы
+
+    FTS5 не умеет русскую морфологию, поэтому окончание отбрасывается
+    ("образование" -> "образован*" находит "образования", "образованию").
+    """
+    words = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{_stem(word)}"*' for word in words)
+
+
+# --- Индексация ---
+
+def index_publication(publication):
+    """Обновить поисковый индекс для одной публикации"""
+    from .models import Publication
+
+    vendor = _vendor()
+    if vendor == 'postgresql':
+        Publication.objects.filter(pk=publication.pk).update(
+            search_vector=publication_search_vector()
+        )
+    elif vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [publication.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, authors, keywords, abstract) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                [publication.pk, publication.title, publication.authors,
+                 publication.keywords, publication.abstract],
+            )
+
+
+def unindex_publication(publication):
+    """Удалить публикацию из поискового индекса"""
+    if _vendor() == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [publication.pk])
+
+
+def rebuild_index(using=None):
+    """
+    Полностью перестроить поисковый индекс
+
+    Returns:
+        int: Количество проиндексированных публикаций
+    """
+    from .models import Publication
+
+    using = using or connection
+    vendor = _vendor(using)
+    if vendor == 'postgresql':
+        return Publication.objects.using(using.alias).update(
+            search_vector=publication_search_vector()
+        )
+    if vendor == 'sqlite':
+        with using.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, authors, keywords, abstract) '
+                'SELECT id, title, authors, keywords, abstract FROM core_publication'
+            )
+            return cursor.rowcount
+    return 0
+
+
+# --- Поиск ---
+
+def search_publications(queryset, query):
+    """
+    Отфильтровать публикации по поисковому запросу
+
+    Результат отсортирован по релевантности и аннотирован полями
+    search_rank и search_snippet (см. highlight_snippet).
+
+    Args:
+        queryset: QuerySet публикаций
+        query: Поисковый запрос пользователя
+
+    Returns:
+        QuerySet
+    """
+    vendor = _vendor()
+
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchHeadline
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query),
+            search_snippet=SearchHeadline(
+                _snippet_source(),
+                search_query,
+                config=SEARCH_CONFIG,
+                start_sel=START_SEL,
+                stop_sel=STOP_SEL,
+                max_words=25,
+                min_words=10,
+            ),
+        ).order_by('-search_rank', '-year', 'title')
+
+    if vendor == 'sqlite':
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return queryset.none()
+        # bm25: меньше = релевантнее; веса колонок title, authors, keywords, abstract
+        match = f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = core_publication.id'
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [fts_query])
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}, 10.0, 5.0, 5.0, 1.0) {match}', [fts_query]
+            ),
+            search_snippet=RawSQL(
+                f"SELECT snippet({FTS_TABLE}, -1, '{START_SEL}', '{STOP_SEL}', '…', 16) {match}",
+                [fts_query],
+            ),
+        ).order_by('-search_rank', '-year', 'title')
+
+    # Прочие СУБД: простой поиск без ранжирования
+    return queryset.filter(
+        Q(title__icontains=query) |
+        Q(authors__icontains=query) |
+        Q(keywords__icontains=query)
+    ).annotate(search_snippet=Value(''))
+
+
+def highlight_snippet(snippet):
+    """Экранировать фрагмент и заменить маркеры подсветки на <mark>"""
+    if not snippet:
+        return ''
+    html = escape(snippet).replace(START_SEL, '<mark>').replace(STOP_SEL, '</mark>')
+    return mark_safe(html)
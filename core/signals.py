@@ -2,34 +2,251 @@
 Django signals для автоматических действий
 """
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import ServiceOrder, BookOrder
-from .telegram_notifications import notify_service_order, notify_book_order
+from .models import Profile, Publication, Book, BlogPost, ServiceOrder, BookOrder
+from .telegram_notifications import format_service_order_message, format_book_order_message, order_summary
+from .outbox import enqueue_order_notification
+from .caching import invalidate_profile, invalidate_pages, is_page_dependency
+from .search import index_publication, unindex_publication
+from .facets import facet_values, apply_change
+from .tags import sync_post_tags, sync_publication_keywords, invalidate_clouds
+from .images import IMAGE_FIELDS, process_instance, release_image, variants_field
+from .pdf_previews import PDF_PREVIEWS, generate_pdf_preview
+from .uploads import file_fields, sync_references, delete_references
 
 
-@receiver(post_save, sender=ServiceOrder)
-def service_order_created(sender, instance, created, **kwargs):
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def profile_changed(sender, instance, **kwargs):
     """
-    Signal handler для создания заказа услуги
-    Отправляет уведомление в Telegram при создании нового заказа
+    Signal handler для изменения профиля
+    Сбрасывает закешированный профиль во всех процессах
+    """
+    invalidate_profile()
+
+
+@receiver(post_save, sender=Publication)
+def publication_saved(sender, instance, raw=False, **kwargs):
+    """
+    Signal handler для сохранения публикации
+    Обновляет полнотекстовый поисковый индекс
+    """
+    if not raw:
+        index_publication(instance)
+        sync_publication_keywords(instance)
+
+
+@receiver(post_save, sender=BlogPost)
+def blog_post_saved(sender, instance, raw=False, **kwargs):
+    """
+    Signal handler для сохранения статьи блога
+    Синхронизирует нормализованные теги со строкой tags
+    """
+    if not raw:
+        sync_post_tags(instance)
+
+
+@receiver(post_delete, sender=Publication)
+def publication_deleted(sender, instance, **kwargs):
+    """
+    Signal handler для удаления публикации
+    Удаляет публикацию из поискового индекса
+    """
+    unindex_publication(instance)
+    invalidate_clouds()
+
+
+@receiver(post_delete, sender=BlogPost)
+def blog_post_deleted(sender, instance, **kwargs):
+    """
+    Signal handler для удаления статьи блога
+    Сбрасывает облако тегов
+    """
+    invalidate_clouds()
+
+
+@receiver(pre_save, sender=Publication)
+@receiver(pre_save, sender=Book)
+@receiver(pre_save, sender=BlogPost)
+def remember_facet_values(sender, instance, **kwargs):
+    """
+    Signal handler перед сохранением
+    Запоминает значения фасетов до изменения объекта
+    """
+    old = sender._base_manager.filter(pk=instance.pk).first() if instance.pk else None
+    instance._facet_values = facet_values(old) if old else {}
+
+
+@receiver(post_save, sender=Publication)
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=BlogPost)
+def update_facets_on_save(sender, instance, **kwargs):
+    """
+    Signal handler для сохранения публикации, книги или статьи
+    Обновляет счетчики фильтров
+    """
+    apply_change(getattr(instance, '_facet_values', {}), facet_values(instance))
+    instance._facet_values = facet_values(instance)
+
+
+@receiver(post_delete, sender=Publication)
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=BlogPost)
+def update_facets_on_delete(sender, instance, **kwargs):
+    """
+    Signal handler для удаления публикации, книги или статьи
+    Обновляет счетчики фильтров
+    """
+    apply_change(facet_values(instance), {})
+
+
+@receiver(pre_save)
+def remember_image_names(sender, instance, raw=False, **kwargs):
+    """
+    Signal handler перед сохранением
+    Запоминает имена файлов изображений и ширины их версий до изменения объекта
     """
-    if created:  # Только для новых заказов
+    field_names = IMAGE_FIELDS.get(sender._meta.label_lower)
+    if not field_names or raw:
+        return
+    columns = [*field_names, *(variants_field(name) for name in field_names)]
+    old = sender._base_manager.filter(pk=instance.pk).values(*columns).first() if instance.pk else None
+    instance._image_names = old or {}
+
+
+@receiver(post_save)
+def image_uploaded(sender, instance, raw=False, **kwargs):
+    """
+    Signal handler для сохранения объекта с изображениями
+    Создает адаптивные версии новых изображений после коммита и удаляет
+    замененные изображения с их версиями, если они больше никому не нужны
+    """
+    field_names = IMAGE_FIELDS.get(sender._meta.label_lower)
+    if not field_names or raw:
+        return
+    old_names = getattr(instance, '_image_names', {})
+    changed = [
+        name for name in field_names
+        if (getattr(instance, name).name or None) != (old_names.get(name) or None)
+    ]
+    if not changed:
+        return
+    
+    def process():
+        for name in changed:
+            old_name = old_names.get(name)
+            if not old_name:
+                continue
+            try:
+                release_image(
+                    getattr(instance, name).storage, old_name, instance, name,
+                    old_names.get(variants_field(name)) or (),
+                )
+            except Exception as e:
+                print(f"❌ Ошибка при удалении старого изображения {old_name}: {e}")
         try:
-            notify_service_order(instance)
+            process_instance(instance, changed)
         except Exception as e:
-            print(f"❌ Ошибка при отправке уведомления о заказе услуги: {e}")
+            print(f"❌ Ошибка при создании версий изображения {sender.__name__} #{instance.pk}: {e}")
+        else:
+            invalidate_pages(sender)
+    
+    transaction.on_commit(process)
+
+
+@receiver(pre_save)
+def remember_pdf_names(sender, instance, raw=False, **kwargs):
+    """
+    Signal handler перед сохранением
+    Запоминает имена PDF файлов до изменения объекта
+    """
+    previews = PDF_PREVIEWS.get(sender._meta.label_lower)
+    if not previews or raw:
+        return
+    old = sender._base_manager.filter(pk=instance.pk).values(*previews).first() if instance.pk else None
+    instance._pdf_names = old or {}
+
+
+@receiver(post_save)
+def pdf_uploaded(sender, instance, raw=False, **kwargs):
+    """
+    Signal handler для сохранения объекта с PDF
+    Создает превью первой страницы нового PDF после коммита
+    """
+    previews = PDF_PREVIEWS.get(sender._meta.label_lower)
+    if not previews or raw:
+        return
+    old_names = getattr(instance, '_pdf_names', {})
+    changed = [
+        name for name in previews
+        if (getattr(instance, name).name or None) != (old_names.get(name) or None)
+    ]
+    if not changed:
+        return
+    
+    def process():
+        for name in changed:
+            try:
+                generate_pdf_preview(instance, name)
+            except Exception as e:
+                print(f"❌ Ошибка при создании превью PDF {sender.__name__} #{instance.pk}: {e}")
+        invalidate_pages(sender)
+    
+    transaction.on_commit(process)
+
+
+@receiver(post_save)
+def file_references_saved(sender, instance, **kwargs):
+    """
+    Signal handler для сохранения объекта с файлами
+    Обновляет ссылки на файлы в MediaReference
+    """
+    if sender._meta.app_label == 'core' and file_fields(sender):
+        sync_references(instance)
+
+
+@receiver(post_delete)
+def file_references_deleted(sender, instance, **kwargs):
+    """
+    Signal handler для удаления объекта с файлами
+    Удаляет его ссылки на файлы (сами файлы остаются для очистки)
+    """
+    if sender._meta.app_label == 'core' and file_fields(sender):
+        delete_references(instance)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def page_dependency_changed(sender, instance, **kwargs):
+    """
+    Signal handler для изменения контента
+    Сбрасывает закешированные страницы, построенные из этой модели
+    """
+    if not is_page_dependency(sender):
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'views_count'}:
+        return  # Счетчик просмотров не влияет на кеш страниц
+    invalidate_pages(sender)
+
+
+@receiver(post_save, sender=ServiceOrder)
+def service_order_created(sender, instance, created, raw=False, **kwargs):
+    """
+    Signal handler для создания заказа услуги
+    Ставит уведомление в Telegram в outbox (в транзакции заказа)
+    """
+    if created and not raw:  # Только для новых заказов
+        enqueue_order_notification(format_service_order_message(instance), order_summary(instance))
 
 
 @receiver(post_save, sender=BookOrder)
-def book_order_created(sender, instance, created, **kwargs):
+def book_order_created(sender, instance, created, raw=False, **kwargs):
     """
     Signal handler для создания заказа книги
-    Отправляет уведомление в Telegram при создании нового заказа
+    Ставит уведомление в Telegram в outbox (в транзакции заказа)
     """
-    if created:  # Только для новых заказов
-        try:
-            notify_book_order(instance)
-        except Exception as e:
-            print(f"❌ Ошибка при отправке уведомления о заказе книги: {e}")
-
+    if created and not raw:  # Только для новых заказов
+        enqueue_order_notification(format_book_order_message(instance), order_summary(instance))
@@ -0,0 +1,163 @@
+"""
+Инкрементальная загрузка собранной статики на Cloudflare R2
+
+collectstatic собирает статику локально в STATIC_ROOT (хешированные имена
++ .gz/.br версии, см. ManifestStaticStorage), а затем загружает на R2
+только изменившиеся файлы. Список загруженных файлов с хешами содержимого
+хранится на R2 (static/staticsync.json), поэтому повторный запуск без
+изменений не делает ни одной записи (class-A операции R2).
+
+Каждый файл загружается под своим именем в сжатом виде (gzip понимают все
+браузеры), а brotli версия — рядом, с суффиксом .br, для правила CDN,
+выбирающего ее по Accept-Encoding. Файлы с хешем в имени кешируются
+навсегда (immutable), остальные (например, плагины CKEditor, которые
+подгружаются по исходным именам) — на STATIC_UNHASHED_MAX_AGE секунд.
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+SYNC_MANIFEST = 'staticsync.json'
+
+# Расширения, которые создает компрессор WhiteNoise
+ENCODINGS = (('.gz', 'gzip'), ('.br', 'br'))
+
+HASHED_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def file_digest(path):
+    """MD5 содержимого файла (читается блоками)"""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def local_files(root):
+    """
+    Файлы собранной статики без сжатых версий
+
+    Returns:
+        dict[str, str]: Имя (через '/') -> MD5 содержимого
+    """
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        names = set(filenames)
+        for filename in filenames:
+            stem, ext = os.path.splitext(filename)
+            if ext in ('.gz', '.br') and stem in names:
+                continue
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            files[name] = file_digest(path)
+    return files
+
+
+def plan_upload(local, remote):
+    """Имена файлов, которых нет на R2 или которые изменились"""
+    return sorted(name for name, digest in local.items() if remote.get(name) != digest)
+
+
+def _object_args(name, hashed_names):
+    content_type, _ = mimetypes.guess_type(name)
+    if name in hashed_names or name == 'staticfiles.json':
+        cache_control = HASHED_CACHE_CONTROL
+    else:
+        cache_control = f"public, max-age={getattr(settings, 'STATIC_UNHASHED_MAX_AGE', 3600)}"
+    return {
+        'ContentType': content_type or 'application/octet-stream',
+        'CacheControl': cache_control,
+    }
+
+
+def upload_file(client, bucket, prefix, root, name, hashed_names):
+    """
+    Загрузить файл и его brotli версию
+
+    Returns:
+        int: Количество созданных объектов
+    """
+    path = os.path.join(root, *name.split('/'))
+    key = f'{prefix}{name}'
+    args = _object_args(name, hashed_names)
+    uploads = 0
+
+    if os.path.exists(path + '.gz'):
+        client.upload_file(path + '.gz', bucket, key, ExtraArgs={**args, 'ContentEncoding': 'gzip'})
+    else:
+        client.upload_file(path, bucket, key, ExtraArgs=args)
+    uploads += 1
+
+    if os.path.exists(path + '.br'):
+        client.upload_file(path + '.br', bucket, key + '.br', ExtraArgs={**args, 'ContentEncoding': 'br'})
+        uploads += 1
+    return uploads
+
+
+def read_remote_manifest(client, bucket, prefix):
+    """Манифест загруженных файлов на R2 ({} если его еще нет)"""
+    try:
+        response = client.get_object(Bucket=bucket, Key=f'{prefix}{SYNC_MANIFEST}')
+    except client.exceptions.NoSuchKey:
+        return {}
+    try:
+        return json.loads(response['Body'].read()).get('files', {})
+    except (ValueError, AttributeError):
+        return {}
+
+
+def sync_static(root, client, bucket, prefix='static/', hashed_names=(), workers=None):
+    """
+    Загрузить на R2 изменившиеся файлы собранной статики
+
+    Args:
+        root: STATIC_ROOT с результатом collectstatic
+        client: boto3 S3 client (потокобезопасен, общий для всех потоков)
+        bucket: Имя bucket
+        prefix: Префикс ключей (location StaticStorage + '/')
+        hashed_names: Имена файлов с хешем в имени (кешируются навсегда)
+        workers: Количество параллельных загрузок (STATIC_UPLOAD_WORKERS)
+
+    Returns:
+        tuple[int, int]: (загружено файлов, без изменений)
+    """
+    workers = workers or getattr(settings, 'STATIC_UPLOAD_WORKERS', 8)
+    hashed_names = set(hashed_names)
+    local = local_files(root)
+    remote = read_remote_manifest(client, bucket, prefix)
+    pending = plan_upload(local, remote)
+
+    uploaded = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(upload_file, client, bucket, prefix, root, name, hashed_names): name
+            for name in pending
+        }
+        for future, name in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(f'{name}: {e}')
+            else:
+                uploaded[name] = local[name]
+
+    # Манифест сохраняется и при ошибках: успешные файлы не загрузятся повторно
+    files = {name: digest for name, digest in remote.items() if name in local}
+    files.update(uploaded)
+    if uploaded or files != remote:
+        client.put_object(
+            Bucket=bucket, Key=f'{prefix}{SYNC_MANIFEST}',
+            Body=json.dumps({'files': files}, sort_keys=True).encode('utf-8'),
+            ContentType='application/json', CacheControl='no-cache',
+        )
+    if errors:
+        raise RuntimeError('Не удалось загрузить на R2: ' + '; '.join(errors[:5]))
+    return len(uploaded), len(local) - len(pending)
@@ -2,13 +2,162 @@
 Custom storage backends for Cloudflare R2 с правильным кешированием
 """
 
+import os
+from functools import lru_cache
+from urllib.parse import quote
+
+from boto3.s3.transfer import TransferConfig
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.utils import validate_file_name
+from django.utils.encoding import filepath_to_uri
+from django.utils.functional import cached_property
 from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import ReadBytesWrapper, clean_name, is_seekable
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from . import compression, uploads
+from .media_cache import DiskCache
 
 
-class StaticStorage(S3Boto3Storage):
+class ManifestStaticStorage(CompressedManifestStaticFilesStorage):
+    """
+    Локальная сборка статики: имена с хешем содержимого (staticfiles.json)
+    и сжатые .gz/.br версии, которые отдает WhiteNoise
+
+    Сжимаются только новые или изменившиеся файлы: файлы с хешем в имени не
+    меняются, поэтому повторный collectstatic их не пересжимает.
+    """
+
+    def compress_files(self, paths):
+        return super().compress_files([path for path in paths if not self._compressed(path)])
+
+    def _compressed(self, path):
+        full_path = self.path(path)
+        try:
+            mtime = os.path.getmtime(full_path)
+        except OSError:
+            return False
+        suffixes = ['.gz']
+        try:
+            import brotli  # noqa: F401
+            suffixes.append('.br')
+        except ImportError:
+            pass
+        for suffix in suffixes:
+            try:
+                if os.path.getmtime(full_path + suffix) < mtime:
+                    return False
+            except OSError:
+                # Файла нет: либо еще не сжат, либо сжатие неэффективно
+                # (WhiteNoise его не сохраняет) — проверит компрессор
+                return False
+        return True
+
+
+class R2ManifestStaticStorage(ManifestStaticStorage):
+    """
+    Статика на Cloudflare R2: собирается локально как ManifestStaticStorage,
+    затем изменившиеся файлы загружаются на R2 (core/static_sync.py)
+
+    URL строятся по локальному манифесту от STATIC_URL на R2.
+    """
+
+    def post_process(self, *args, **kwargs):
+        yield from super().post_process(*args, **kwargs)
+        if kwargs.get('dry_run'):
+            return
+
+        from .static_sync import sync_static
+
+        remote = StaticStorage()
+        uploaded, unchanged = sync_static(
+            self.location,
+            client=remote.connection.meta.client,
+            bucket=remote.bucket_name,
+            prefix=f'{remote.location}/',
+            hashed_names=self.hashed_files.values(),
+        )
+        print(f"✓ R2: загружено {uploaded} файлов статики, без изменений {unchanged}")
+
+
+@lru_cache(maxsize=4096)
+def public_url(base, key, custom_domain):
+    """
+    Публичный URL объекта (без подписи), запоминается для пары (база, ключ)
+
+    Совпадает с тем, что строит S3Boto3Storage.url: для custom domain —
+    filepath_to_uri, для endpoint (path-style) — экранирование как в boto3.
+    """
+    if custom_domain:
+        return f'{base}/{filepath_to_uri(key)}'
+    return f'{base}/{quote(key, safe="/~")}'
+
+
+class PublicUrlMixin:
+    """
+    url() без boto3 для публичных объектов
+
+    S3Boto3Storage.url без custom domain создает boto3 сессию и клиент
+    (первый вызов в процессе — десятки миллисекунд) и строит подписанный
+    URL для каждого файла, а responsive_image вызывает url() для каждой
+    версии изображения. Публичный URL — это просто база + ключ, поэтому
+    он строится строкой и запоминается (public_url); клиент boto3 создается
+    только при записи и других обращениях к R2.
+    """
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        if self.querystring_auth or parameters or expire or http_method:
+            return super().url(name, parameters, expire, http_method)
+        key = self._normalize_name(clean_name(name))
+        if self.custom_domain:
+            return public_url(f'{self.url_protocol}//{self.custom_domain}', key, True)
+        return public_url(f'{self.endpoint_url.rstrip("/")}/{self.bucket_name}', key, False)
+
+
+class ContentAddressedMixin:
+    """
+    Сохранение медиа под именем по содержимому (core/uploads.py)
+
+    Изображения нормализуются (EXIF, размер), одинаковые файлы получают
+    одно имя и загружаются один раз. MEDIA_CONTENT_ADDRESSED = False
+    возвращает обычные имена.
+    """
+    
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if not getattr(settings, 'MEDIA_CONTENT_ADDRESSED', True):
+            return super().save(name, content, max_length)
+        
+        if uploads.is_derivative(name):
+            # Версия файла с именем по содержимому определяется этим именем
+            if uploads.is_content_name(name) and self.exists(name):
+                return name
+            return super().save(name, content, max_length)
+        
+        content = uploads.normalize_image(content) or content
+        name = uploads.content_name(name, content)
+        validate_file_name(name, allow_relative_path=True)
+        if self.exists(name):
+            return name
+        return self._save(name, content)
+
+
+class LocalMediaStorage(ContentAddressedMixin, FileSystemStorage):
+    """Медиа в MEDIA_ROOT (без R2) с именами по содержимому"""
+
+
+class StaticStorage(PublicUrlMixin, S3Boto3Storage):
     """
     Storage for static files on Cloudflare R2
     Статические файлы кешируются на 1 год (они версионируются через collectstatic)
+
+    collectstatic использует R2ManifestStaticStorage; этот класс задает
+    bucket и location для загрузки.
     """
     location = 'static'
     default_acl = None
@@ -32,7 +181,7 @@ class StaticStorage(S3Boto3Storage):
     )
 
 
-class MediaStorage(S3Boto3Storage):
+class MediaStorage(ContentAddressedMixin, PublicUrlMixin, S3Boto3Storage):
     """
     Storage for media files on Cloudflare R2
     Медиа файлы кешируются на 30 дней (могут обновляться)
@@ -41,19 +190,110 @@ class MediaStorage(S3Boto3Storage):
     default_acl = None
     file_overwrite = False
     
+    def __init__(self, **kwargs):
+        # Большие файлы (PDF книг) загружаются частями в несколько потоков
+        kwargs.setdefault('transfer_config', TransferConfig(
+            multipart_threshold=getattr(settings, 'MEDIA_MULTIPART_THRESHOLD', 16 * 1024 * 1024),
+            multipart_chunksize=getattr(settings, 'MEDIA_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024),
+            max_concurrency=getattr(settings, 'MEDIA_UPLOAD_CONCURRENCY', 8),
+            use_threads=True,
+        ))
+        super().__init__(**kwargs)
+    
     # Кеширование на 30 дней для медиа (2592000 секунд)
     object_parameters = {
         'CacheControl': 'public, max-age=2592000',
         'ContentDisposition': 'inline',
     }
     
-    # Gzip для текстовых медиа файлов
+    # Gzip для текстовых медиа файлов; решение принимается по образцу
+    # содержимого (core/compression.py). gzip = True нужен и для чтения
+    # ранее загруженных сжатых объектов.
     gzip = True
     gzip_content_types = (
         'text/css',
         'text/javascript',
         'application/javascript',
-        'application/pdf',
+        'application/json',
+        'text/plain',
+        'text/csv',
         'image/svg+xml',
     )
+    
+    def _save(self, name, content):
+        """Загрузка с политикой сжатия: PDF и изображения хранятся как есть"""
+        cleaned_name = clean_name(name)
+        key = self._normalize_name(cleaned_name)
+        params = self._get_write_parameters(key, content)
+        original_size = getattr(content, 'size', None) or 0
+        if is_seekable(content):
+            content.seek(0, os.SEEK_SET)
+        content = ReadBytesWrapper(content)
+        
+        content_type = params['ContentType']
+        if 'ContentEncoding' in params:
+            decision = compression.Decision('precompressed', '', None)
+        else:
+            decision = compression.decide(content, content_type, self.gzip_content_types)
+        body, stored_size = content, original_size
+        if decision.encoding:
+            body = compression.gzip_content(content)
+            stored_size = body.seek(0, os.SEEK_END)
+            body.seek(0)
+            params['ContentEncoding'] = decision.encoding
+        
+        # Workaround file being closed errantly see: https://github.com/boto/s3transfer/issues/80
+        original_close = body.close
+        body.close = lambda: None
+        try:
+            self.bucket.Object(key).upload_fileobj(body, ExtraArgs=params, Config=self.transfer_config)
+        finally:
+            body.close = original_close
+            if body is not content:
+                body.close()
+        
+        compression.record(cleaned_name, content_type, decision, original_size, stored_size)
+        return cleaned_name
+
+
+
+class CachedMediaStorage(MediaStorage):
+    """
+    MediaStorage с локальным дисковым кешем для чтения (core/media_cache.py)
 
+    Запись и URL — как у MediaStorage; open() на чтение отдает локальную
+    копию объекта. MEDIA_CACHE_SIZE = 0 выключает кеш.
+    """
+    
+    @cached_property
+    def disk_cache(self):
+        max_size = getattr(settings, 'MEDIA_CACHE_SIZE', 512 * 1024 * 1024)
+        if not max_size:
+            return None
+        return DiskCache(
+            getattr(settings, 'MEDIA_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'media')),
+            max_size,
+            getattr(settings, 'MEDIA_CACHE_REVALIDATE', 300),
+        )
+    
+    def _open(self, name, mode='rb'):
+        if self.disk_cache is None or 'r' not in mode or '+' in mode:
+            return super()._open(name, mode)
+        key = self._normalize_name(clean_name(name))
+        path = self.disk_cache.fetch(self.connection.meta.client, self.bucket_name, key)
+        try:
+            return File(open(path, mode), name=name)
+        except FileNotFoundError:
+            # Копию успел вытеснить другой процесс — читаем из R2 напрямую
+            return super()._open(name, mode)
+    
+    def _save(self, name, content):
+        name = super()._save(name, content)
+        if self.disk_cache is not None:
+            self.disk_cache.invalidate(self._normalize_name(clean_name(name)))
+        return name
+    
+    def delete(self, name):
+        super().delete(name)
+        if self.disk_cache is not None:
+            self.disk_cache.invalidate(self._normalize_name(clean_name(name)))
@@ -0,0 +1,136 @@
+"""
+Нормализованные теги статей и ключевые слова публикаций
+
+Администратор по-прежнему вводит теги строкой через запятую (BlogPost.tags,
+Publication.keywords); сигналы раскладывают строку в таблицы Tag/Keyword
+со связующими таблицами. Фильтрация идет по точному совпадению через индекс,
+а облака тегов с количеством кешируются.
+"""
+
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q
+
+from .models import Tag, BlogPostTag, Keyword, PublicationKeyword
+
+
+TAG_CLOUD_KEY = 'core:tag-cloud'
+KEYWORD_CLOUD_KEY = 'core:keyword-cloud'
+CLOUD_SIZE = 30
+
+TermCount = namedtuple('TermCount', ['name', 'count'])
+
+
+def normalize(name):
+    """Нормализованная форма тега: пробелы схлопнуты, нижний регистр"""
+    return ' '.join(name.split()).lower()[:100]
+
+
+def parse_terms(value, delimiter=','):
+    """
+    Разобрать строку тегов в список уникальных названий
+
+    Returns:
+        list[tuple[str, str]]: (название, нормализованное название) в исходном порядке
+    """
+    terms = []
+    seen = set()
+    for raw in (value or '').split(delimiter):
+        name = ' '.join(raw.split())[:100]
+        key = normalize(name)
+        if key and key not in seen:
+            seen.add(key)
+            terms.append((name, key))
+    return terms
+
+
+def _sync_terms(obj, value, term_model, link_model, owner_field, term_field):
+    terms = parse_terms(value)
+    current = list(
+        link_model.objects.filter(**{owner_field: obj})
+        .order_by('position').values_list(f'{term_field}__normalized', flat=True)
+    )
+    if current == [key for _, key in terms]:
+        return
+
+    keys = [key for _, key in terms]
+    existing = {term.normalized: term for term in term_model.objects.filter(normalized__in=keys)}
+    missing = [term_model(name=name, normalized=key) for name, key in terms if key not in existing]
+    if missing:
+        term_model.objects.bulk_create(missing, ignore_conflicts=True)
+        existing = {term.normalized: term for term in term_model.objects.filter(normalized__in=keys)}
+
+    link_model.objects.filter(**{owner_field: obj}).delete()
+    link_model.objects.bulk_create(
+        link_model(**{owner_field: obj, term_field: existing[key], 'position': position})
+        for position, key in enumerate(keys)
+    )
+
+
+def sync_post_tags(post):
+    """Синхронизировать теги статьи со строкой BlogPost.tags"""
+    _sync_terms(post, post.tags, Tag, BlogPostTag, 'post', 'tag')
+    # Облако зависит и от is_published, поэтому сбрасывается при любом сохранении
+    invalidate_clouds(TAG_CLOUD_KEY)
+
+
+def sync_publication_keywords(publication):
+    """Синхронизировать ключевые слова со строкой Publication.keywords"""
+    _sync_terms(publication, publication.keywords, Keyword, PublicationKeyword, 'publication', 'keyword')
+    invalidate_clouds(KEYWORD_CLOUD_KEY)
+
+
+def invalidate_clouds(*keys):
+    """
+    Сбросить закешированные облака тегов и ключевых слов (по умолчанию оба)
+
+    Кеш сбрасывается после коммита транзакции: облака хранятся без срока
+    жизни, и параллельный запрос иначе закешировал бы их по старым данным.
+    """
+    keys = list(keys or (TAG_CLOUD_KEY, KEYWORD_CLOUD_KEY))
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# --- Чтение ---
+
+def with_tags(queryset):
+    """Подгрузить теги статей одним запросом (post.tag_links.all в шаблоне)"""
+    return queryset.prefetch_related(
+        Prefetch('tag_links', queryset=BlogPostTag.objects.select_related('tag'))
+    )
+
+
+def with_keywords(queryset):
+    """Подгрузить ключевые слова публикаций одним запросом"""
+    return queryset.prefetch_related(
+        Prefetch('keyword_links', queryset=PublicationKeyword.objects.select_related('keyword'))
+    )
+
+
+def get_tag_cloud():
+    """Самые частые теги опубликованных статей с количеством"""
+    cloud = cache.get(TAG_CLOUD_KEY)
+    if cloud is None:
+        published = Q(post_links__post__is_published=True)
+        tags = (
+            Tag.objects.annotate(num=Count('post_links', filter=published))
+            .filter(num__gt=0).order_by('-num', 'name')[:CLOUD_SIZE]
+        )
+        cloud = [TermCount(tag.name, tag.num) for tag in tags]
+        cache.set(TAG_CLOUD_KEY, cloud, None)
+    return cloud
+
+
+def get_keyword_cloud():
+    """Самые частые ключевые слова публикаций с количеством"""
+    cloud = cache.get(KEYWORD_CLOUD_KEY)
+    if cloud is None:
+        keywords = (
+            Keyword.objects.annotate(num=Count('publication_links'))
+            .filter(num__gt=0).order_by('-num', 'name')[:CLOUD_SIZE]
+        )
+        cloud = [TermCount(keyword.name, keyword.num) for keyword in keywords]
+        cache.set(KEYWORD_CLOUD_KEY, cloud, None)
+    return cloud
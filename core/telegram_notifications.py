@@ -1,9 +1,278 @@
 """
 Telegram notifications для заказов
+
+Все запросы к Bot API идут через общий TelegramClient: keep-alive сессия
+requests с пулом соединений, ограничение частоты (token bucket на чат) и
+circuit breaker, который перестает обращаться к недоступному API на время
+TELEGRAM_BREAKER_RESET секунд.
 """
 
+import threading
+import time
+from html import unescape
+
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.utils.html import escape, strip_tags
+
+
+# Ответ 400 на сообщение с некорректной разметкой
+PARSE_ERROR = "can't parse entities"
+
+
+class TelegramError(Exception):
+    """
+    Ошибка отправки в Telegram
+
+    Attributes:
+        permanent: Повтор не поможет (неверный chat_id, токен, разметка)
+        retry_after: Пауза, которую запросил API (429), в секундах
+    """
+
+    def __init__(self, message, permanent=False, retry_after=None):
+        super().__init__(message)
+        self.permanent = permanent
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(TelegramError):
+    """API недоступен, запрос не отправлялся"""
+
+
+class TokenBucket:
+    """Потокобезопасный token bucket: rate токенов в секунду, не больше capacity"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, max_wait=None):
+        """
+        Взять токен, при необходимости подождав
+
+        Returns:
+            bool: False если ждать пришлось бы дольше max_wait
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate, 0)
+            if max_wait is not None and wait > max_wait:
+                return False
+            # Токен резервируется сразу, ожидание идет вне блокировки
+            self._tokens -= 1
+        if wait:
+            time.sleep(wait)
+        return True
+
+    def pause(self, seconds):
+        """Не выдавать токены seconds секунд (ответ 429 с retry_after)"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker: после threshold ошибок подряд запросы не выполняются
+    reset_timeout секунд, затем пропускается один пробный запрос
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class TelegramClient:
+    """
+    Клиент Telegram Bot API
+
+    Args:
+        token: Токен бота
+        base_url: Адрес API (для тестов — локальный сервер)
+        timeout: Таймаут запроса, секунды (или кортеж connect/read)
+        rate: Сообщений в секунду на чат
+        burst: Максимум сообщений подряд без ожидания
+        max_wait: Максимальное ожидание токена, секунды
+        breaker_threshold: Ошибок подряд до размыкания
+        breaker_reset: Время до пробного запроса, секунды
+    """
+
+    def __init__(self, token, base_url='https://api.telegram.org', timeout=(3.05, 10),
+                 rate=1.0, burst=3, max_wait=30, breaker_threshold=5, breaker_reset=60):
+        self.token = token
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _bucket(self, chat_id):
+        with self._buckets_lock:
+            bucket = self._buckets.get(chat_id)
+            if bucket is None:
+                bucket = self._buckets[chat_id] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def call(self, method, payload, chat_id=None):
+        """
+        Вызвать метод Bot API
+
+        Returns:
+            Поле result ответа
+
+        Raises:
+            CircuitOpenError: API помечен недоступным
+            TelegramError: Ошибка запроса или ответ ok=false
+        """
+        if self.breaker.state == 'open':
+            raise CircuitOpenError('Telegram API недоступен, запрос пропущен')
+
+        bucket = self._bucket(chat_id) if chat_id is not None else None
+        if bucket is not None and not bucket.acquire(self.max_wait):
+            raise TelegramError('Превышен лимит сообщений в чат')
+
+        if not self.breaker.allow():
+            raise CircuitOpenError('Telegram API недоступен, запрос пропущен')
+
+        url = f"{self.base_url}/bot{self.token}/{method}"
+        try:
+            response = self.session.post(url, json=payload, timeout=self.timeout)
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.breaker.record_failure()
+            raise TelegramError(f'Ошибка соединения с Telegram: {e}') from e
+
+        if data.get('ok'):
+            self.breaker.record_success()
+            return data.get('result')
+
+        description = data.get('description') or f'HTTP {response.status_code}'
+        if response.status_code == 429:
+            retry_after = (data.get('parameters') or {}).get('retry_after', 1)
+            if bucket is not None:
+                bucket.pause(retry_after)
+            self.breaker.record_success()
+            raise TelegramError(f'Ошибка Telegram API: {description}', retry_after=retry_after)
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise TelegramError(f'Ошибка Telegram API: {description}')
+
+        # 4xx: запрос некорректен, API при этом работает
+        self.breaker.record_success()
+        raise TelegramError(f'Ошибка Telegram API: {description}', permanent=True)
+
+    def send_message(self, chat_id, text, parse_mode='HTML'):
+        """
+        Отправить сообщение в чат
+
+        Если API не смог разобрать разметку, сообщение отправляется еще раз
+        простым текстом (без parse_mode), а не теряется.
+        """
+        payload = {'chat_id': chat_id, 'text': text}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        try:
+            return self.call('sendMessage', payload, chat_id=chat_id)
+        except TelegramError as e:
+            if not parse_mode or not e.permanent or PARSE_ERROR not in str(e):
+                raise
+            print(f"⚠️  Telegram не разобрал разметку ({e}), отправка простым текстом")
+        plain = {'chat_id': chat_id, 'text': unescape(strip_tags(text)) if parse_mode == 'HTML' else text}
+        return self.call('sendMessage', plain, chat_id=chat_id)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_config = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Общий TelegramClient процесса (пересоздается при изменении настроек)
+
+    Returns:
+        TelegramClient или None, если TELEGRAM_BOT_TOKEN не задан
+    """
+    global _client, _client_config
+
+    token = getattr(settings, 'TELEGRAM_BOT_TOKEN', '')
+    if not token:
+        return None
+    config = (
+        token,
+        getattr(settings, 'TELEGRAM_API_URL', 'https://api.telegram.org'),
+        getattr(settings, 'TELEGRAM_TIMEOUT', 10),
+        getattr(settings, 'TELEGRAM_RATE_LIMIT', 1.0),
+        getattr(settings, 'TELEGRAM_RATE_BURST', 3),
+        getattr(settings, 'TELEGRAM_BREAKER_THRESHOLD', 5),
+        getattr(settings, 'TELEGRAM_BREAKER_RESET', 60),
+    )
+    with _client_lock:
+        if _client is None or _client_config != config:
+            if _client is not None:
+                _client.close()
+            token, base_url, timeout, rate, burst, threshold, reset = config
+            _client = TelegramClient(
+                token, base_url=base_url, timeout=(3.05, timeout), rate=rate, burst=burst,
+                breaker_threshold=threshold, breaker_reset=reset,
+            )
+            _client_config = config
+        return _client
 
 
 def send_telegram_message(message: str, parse_mode: str = 'HTML') -> bool:
@@ -19,38 +288,23 @@ def send_telegram_message(message: str, parse_mode: str = 'HTML') -> bool:
     """
     
     # Проверяем настройки
-    if not hasattr(settings, 'TELEGRAM_BOT_TOKEN') or not settings.TELEGRAM_BOT_TOKEN:
+    client = get_client()
+    if client is None:
         print("⚠️  TELEGRAM_BOT_TOKEN не настроен в settings.py")
         return False
     
-    if not hasattr(settings, 'TELEGRAM_CHAT_ID') or not settings.TELEGRAM_CHAT_ID:
+    if not getattr(settings, 'TELEGRAM_CHAT_ID', ''):
         print("⚠️  TELEGRAM_CHAT_ID не настроен в settings.py")
         return False
     
-    # URL Telegram Bot API
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
-    
-    # Параметры запроса
-    payload = {
-        'chat_id': settings.TELEGRAM_CHAT_ID,
-        'text': message,
-        'parse_mode': parse_mode,
-    }
-    
     try:
-        response = requests.post(url, json=payload, timeout=10)
-        response.raise_for_status()
-        
-        if response.json().get('ok'):
-            print(f"✅ Telegram уведомление отправлено в chat_id: {settings.TELEGRAM_CHAT_ID}")
-            return True
-        else:
-            print(f"❌ Ошибка Telegram API: {response.json()}")
-            return False
-            
-    except requests.exceptions.RequestException as e:
+        client.send_message(settings.TELEGRAM_CHAT_ID, message, parse_mode)
+    except TelegramError as e:
         print(f"❌ Ошибка при отправке в Telegram: {e}")
         return False
+    
+    print(f"✅ Telegram уведомление отправлено в chat_id: {settings.TELEGRAM_CHAT_ID}")
+    return True
 
 
 def format_service_order_message(order) -> str:
@@ -67,18 +321,18 @@ def format_service_order_message(order) -> str:
     message = f"""
 🔔 <b>Новый заказ услуги!</b>
 
-📋 <b>Услуга:</b> {order.service.title}
+📋 <b>Услуга:</b> {escape(order.service.title)}
 
 👤 <b>Клиент:</b>
-   • Имя: {order.full_name}
-   • Email: {order.email}
-   • Телефон: {order.phone}
+   • Имя: {escape(order.full_name)}
+   • Email: {escape(order.email)}
+   • Телефон: {escape(order.phone)}
 """
     
     if order.organization:
-        message += f"   • Организация: {order.organization}\n"
+        message += f"   • Организация: {escape(order.organization)}\n"
     
-    message += f"\n💬 <b>Описание запроса:</b>\n{order.message}\n"
+    message += f"\n💬 <b>Описание запроса:</b>\n{escape(order.message)}\n"
     
     if order.preferred_date:
         message += f"\n📅 <b>Предпочтительная дата:</b> {order.preferred_date.strftime('%d.%m.%Y')}\n"
@@ -103,8 +357,8 @@ def format_book_order_message(order) -> str:
     message = f"""
 📚 <b>Новый заказ книги!</b>
 
-📖 <b>Книга:</b> {order.book.title}
-   • Автор: {order.book.author}
+📖 <b>Книга:</b> {escape(order.book.title)}
+   • Автор: {escape(order.book.author)}
    • Год: {order.book.publication_year}
 """
     
@@ -112,7 +366,7 @@ def format_book_order_message(order) -> str:
         if order.book.price.isdigit():
             message += f"   • Цена: {order.book.price} сум\n"
         else:
-            message += f"   • Цена: {order.book.price}\n"
+            message += f"   • Цена: {escape(order.book.price)}\n"
     
     message += f"   • Количество: {order.quantity} шт.\n"
     
@@ -123,16 +377,16 @@ def format_book_order_message(order) -> str:
     
     message += f"""
 👤 <b>Клиент:</b>
-   • Имя: {order.full_name}
-   • Email: {order.email}
-   • Телефон: {order.phone}
+   • Имя: {escape(order.full_name)}
+   • Email: {escape(order.email)}
+   • Телефон: {escape(order.phone)}
 
 📍 <b>Адрес доставки:</b>
-{order.address}
+{escape(order.address)}
 """
     
     if order.message:
-        message += f"\n💬 <b>Дополнительно:</b>\n{order.message}\n"
+        message += f"\n💬 <b>Дополнительно:</b>\n{escape(order.message)}\n"
     
     message += f"\n⏰ <b>Дата заказа:</b> {order.created_at.strftime('%d.%m.%Y %H:%M')}"
     message += f"\n\n<i>ID заказа: #{order.id}</i>"
@@ -140,6 +394,111 @@ def format_book_order_message(order) -> str:
     return message
 
 
+# --- Сводка (digest) ---
+
+# Лимит длины сообщения Telegram
+MESSAGE_LIMIT = 4096
+
+
+def order_summary(order) -> dict:
+    """
+    Краткие данные заказа для сводки (JSON-совместимые)
+    
+    Args:
+        order: Объект ServiceOrder или BookOrder
+    """
+    if hasattr(order, 'book'):
+        return {
+            'kind': 'book',
+            'id': order.id,
+            'title': order.book.title,
+            'client': order.full_name,
+            'phone': order.phone,
+            'quantity': order.quantity,
+            'total': order.get_total_price(),
+        }
+    return {
+        'kind': 'service',
+        'id': order.id,
+        'title': order.service.title,
+        'client': order.full_name,
+        'phone': order.phone,
+        'quantity': None,
+        'total': None,
+    }
+
+
+def _cell(value, width):
+    value = str(value)
+    if len(value) > width:
+        value = value[:width - 1] + '…'
+    return value.ljust(width)
+
+
+def format_order_digest(summaries, limit: int = MESSAGE_LIMIT) -> list:
+    """
+    Форматирование сводки по нескольким заказам
+    
+    Сводка содержит таблицу (ID, тип, клиент, количество, сумма) и строки
+    с контактами по каждому заказу. Если текст длиннее limit, он делится на
+    несколько сообщений; таблица при делении не рвется посреди строки.
+    
+    Args:
+        summaries: Список словарей order_summary
+        limit: Максимальная длина одного сообщения
+    
+    Returns:
+        list[str]: Тексты сообщений
+    """
+    services = sum(1 for item in summaries if item['kind'] == 'service')
+    books = len(summaries) - services
+    total = sum(item['total'] or 0 for item in summaries)
+    
+    header = f"📦 <b>Новые заказы: {len(summaries)}</b>\n"
+    header += f"Услуги: {services} · Книги: {books}"
+    if total:
+        header += f" · Итого по книгам: {total:,} сум".replace(',', ' ')
+    
+    rows = [escape(f"{_cell('ID', 7)} {_cell('Тип', 6)} {_cell('Клиент', 18)} {_cell('Кол.', 4)} Сумма")]
+    for item in summaries:
+        kind = 'Книга' if item['kind'] == 'book' else 'Услуга'
+        quantity = item['quantity'] or ''
+        amount = f"{item['total']:,}".replace(',', ' ') if item['total'] else '—'
+        rows.append(escape(
+            f"{_cell('#' + str(item['id']), 7)} {_cell(kind, 6)} {_cell(item['client'], 18)} {_cell(quantity, 4)} {amount}"
+        ))
+    
+    details = [
+        f"<b>#{item['id']}</b> {escape(item['title'])} — {escape(item['client'])}, {escape(item['phone'])}"
+        for item in summaries
+    ]
+    
+    # Блоки, которые нельзя разрывать: заголовок, куски таблицы, строки заказов
+    blocks = [header]
+    table_rows = []
+    for row in rows[1:]:
+        candidate = table_rows + [row]
+        if len(f"<pre>{rows[0]}\n" + '\n'.join(candidate) + "</pre>") > limit - 100 and table_rows:
+            blocks.append(f"<pre>{rows[0]}\n" + '\n'.join(table_rows) + "</pre>")
+            table_rows = [row]
+        else:
+            table_rows = candidate
+    blocks.append(f"<pre>{rows[0]}\n" + '\n'.join(table_rows) + "</pre>")
+    blocks.extend(details)
+    
+    messages = []
+    current = ''
+    for block in blocks:
+        block = block[:limit]
+        if current and len(current) + 1 + len(block) > limit:
+            messages.append(current)
+            current = block
+        else:
+            current = f"{current}\n{block}" if current else block
+    messages.append(current)
+    return messages
+
+
 def notify_service_order(order):
     """
     Отправка уведомления о заказе услуги
@@ -1,5 +1,9 @@
 """Custom template filters"""
 from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from core.images import FORMATS, derivative_name, dimension_fields, variants_field, placeholder_field
+from core.search import highlight_snippet as _highlight_snippet
 
 register = template.Library()
 
@@ -33,3 +37,100 @@ def format_price(price):
         # Возвращаем как есть (например, "Договорная")
         return price_str
 
+
+
+@register.filter
+def highlight_snippet(snippet):
+    """Фрагмент результата поиска с подсветкой найденных слов"""
+    return _highlight_snippet(snippet)
+
+
+@register.simple_tag(takes_context=True)
+def query_string(context, **kwargs):
+    """
+    Текущие GET-параметры с заменой указанных
+    Пустое значение удаляет параметр: {% query_string page=None cursor=page_obj.next_cursor %}
+    """
+    params = context['request'].GET.copy()
+    for key, value in kwargs.items():
+        if value in (None, ''):
+            params.pop(key, None)
+        else:
+            params[key] = value
+    return '?' + params.urlencode()
+
+
+# Ширина версии для src (браузеры без srcset)
+FALLBACK_WIDTH = 960
+
+
+def _picture(url, widths, alt, sizes, attrs):
+    """<picture> с WebP и JPEG srcset; url(width, ext) строит адрес версии"""
+    attrs = {'loading': 'lazy', 'decoding': 'async', **attrs}
+    fallback = max([width for width in widths if width <= FALLBACK_WIDTH] or [widths[0]])
+    sources = format_html_join('', '<source type="{}" srcset="{}" sizes="{}">', (
+        (mime, ', '.join(f'{url(width, ext)} {width}w' for width in widths), sizes)
+        for ext, (_, mime) in FORMATS.items() if ext != 'jpg'
+    ))
+    img_attrs = format_html_join('', ' {}="{}"', attrs.items())
+    return format_html(
+        '<picture class="responsive">{}<img src="{}" srcset="{}" sizes="{}" alt="{}"{}></picture>',
+        sources,
+        url(fallback, 'jpg'),
+        ', '.join(f'{url(width, "jpg")} {width}w' for width in widths),
+        sizes,
+        alt,
+        img_attrs,
+    )
+
+
+def _image_attrs(instance, field, attrs):
+    """width/height и фон-заглушка из полей модели (без чтения файла)"""
+    attrs = dict(attrs)
+    width_field, height_field = dimension_fields(field.name)
+    width = getattr(instance, width_field, None)
+    height = getattr(instance, height_field, None)
+    if width and height:
+        attrs.setdefault('width', width)
+        attrs.setdefault('height', height)
+    placeholder = getattr(instance, placeholder_field(field.name), '')
+    if placeholder:
+        background = f'background:center/cover no-repeat url({placeholder});'
+        attrs['style'] = background + attrs.get('style', '')
+    return attrs
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='100vw', **attrs):
+    """
+    Изображение с адаптивными версиями (WebP/JPEG, srcset и sizes)
+    {% responsive_image book.cover_image alt=book.title sizes="(max-width: 640px) 50vw, 240px" class="cover" %}
+    Пока версии не созданы, выводится оригинал.
+    Сохраненные размеры выводятся в width/height, заглушка LQIP — фоном.
+    """
+    if not image:
+        return ''
+    instance, field = image.instance, image.field
+    attrs = _image_attrs(instance, field, attrs)
+    widths = getattr(instance, variants_field(field.name), None)
+    if not widths:
+        attrs = {'loading': 'lazy', 'decoding': 'async', **attrs}
+        return format_html('<img src="{}" alt="{}"{}>', image.url, alt, format_html_join('', ' {}="{}"', attrs.items()))
+    storage = image.storage
+    return _picture(
+        lambda width, ext: storage.url(derivative_name(image.name, width, ext)),
+        sorted(widths), alt, sizes, attrs,
+    )
+
+
+@register.simple_tag
+def responsive_static(path, widths, alt='', sizes='100vw', **attrs):
+    """
+    Статическое изображение с версиями, созданными командой
+    generate_image_derivatives --static: {% responsive_static 'images/a.jpg' '480,810' alt="..." %}
+    """
+    widths = sorted(int(width) for width in str(widths).split(','))
+    return _picture(
+        lambda width, ext: static(derivative_name(path, width, ext)),
+        widths, alt, sizes, attrs,
+    )
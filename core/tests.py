@@ -154,9 +154,15 @@ class BlogPostModelTest(TestCase):
     
     def test_increment_views(self):
         """Test views counter increment"""
+        from .counters import flush_view_counters
+        
         initial_views = self.post.views_count
         self.post.increment_views()
         self.assertEqual(self.post.views_count, initial_views + 1)
+        
+        flush_view_counters()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, initial_views + 1)
 
 
 class PublicationModelTest(TestCase):
@@ -243,3 +249,2033 @@ class FormTests(TestCase):
         form = ServiceOrderForm(data=data)
         self.assertTrue(form.is_valid())
 
+
+
+class ProfileCacheTest(TestCase):
+    """Tests for cached profile accessor"""
+    
+    def setUp(self):
+        self.profile = Profile.objects.create(
+            full_name='Test Sociologist',
+            email='test@example.com',
+            phone='+123456789',
+            bio='Test bio',
+            education='Test education',
+            specialization='Test specialization',
+            experience_years=10
+        )
+    
+    def test_profile_is_memoized(self):
+        """Test profile is loaded from DB only once"""
+        from .caching import get_profile
+        
+        self.assertEqual(get_profile(), self.profile)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_profile(), self.profile)
+    
+    def test_profile_invalidated_on_save(self):
+        """Test cached profile is refreshed after save"""
+        from .caching import get_profile
+        
+        get_profile()
+        self.profile.full_name = 'Updated Name'
+        self.profile.save()
+        self.assertEqual(get_profile().full_name, 'Updated Name')
+    
+    def test_profile_invalidated_on_delete(self):
+        """Test cached profile is dropped after delete"""
+        from .caching import get_profile
+        
+        get_profile()
+        self.profile.delete()
+        self.assertIsNone(get_profile())
+    
+    def test_index_view_queries_profile_once(self):
+        """Test index page does not query profile again after warmup"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        self.client.get(reverse('index'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('index'))
+        profile_queries = [q for q in ctx.captured_queries if 'core_profile' in q['sql']]
+        self.assertEqual(profile_queries, [])
+
+
+class PageCacheTest(TestCase):
+    """Tests for dependency-tracked page cache"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.service = Service.objects.create(
+            title='Cached Service',
+            description='Test description'
+        )
+    
+    def test_cached_page_runs_no_queries(self):
+        """Test second anonymous GET is served from cache"""
+        self.client.get(reverse('services'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('services'))
+        self.assertContains(response, 'Cached Service')
+    
+    def test_dependency_save_evicts_page(self):
+        """Test saving a dependency model evicts the page"""
+        self.client.get(reverse('services'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.title = 'Renamed Service'
+            self.service.save()
+        response = self.client.get(reverse('services'))
+        self.assertContains(response, 'Renamed Service')
+    
+    def test_eviction_waits_for_commit(self):
+        """Test the page version is bumped only after the transaction commits"""
+        self.client.get(reverse('services'))
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.service.title = 'Renamed Service'
+            self.service.save()
+            # Запрос до коммита не кеширует старую страницу под новой версией
+            with self.assertNumQueries(0):
+                self.client.get(reverse('services'))
+        for callback in callbacks:
+            callback()
+        self.assertContains(self.client.get(reverse('services')), 'Renamed Service')
+    
+    def test_unrelated_model_keeps_page(self):
+        """Test saving an unrelated model keeps the page cached"""
+        self.client.get(reverse('services'))
+        Achievement.objects.create(
+            title='Award',
+            description='Test',
+            date=date(2024, 1, 1),
+            organization='Org'
+        )
+        with self.assertNumQueries(0):
+            self.client.get(reverse('services'))
+    
+    def test_get_params_are_part_of_key(self):
+        """Test filter parameters produce separate cache entries"""
+        Publication.objects.create(title='Old Paper', authors='A', year=2001)
+        Publication.objects.create(title='New Paper', authors='B', year=2024)
+        self.client.get(reverse('publications'))
+        response = self.client.get(reverse('publications'), {'year': 2001})
+        self.assertContains(response, 'Old Paper')
+        self.assertNotContains(response, 'New Paper')
+    
+    def test_detail_view_counts_cached_hits(self):
+        """Test views counter increments when page comes from cache"""
+        post = BlogPost.objects.create(
+            title='Cached Post',
+            content='Test content',
+            is_published=True,
+            published_at=timezone.now()
+        )
+        url = reverse('blog_detail', kwargs={'slug': post.slug})
+        from .counters import flush_view_counters
+        
+        self.client.get(url)
+        self.client.get(url)
+        flush_view_counters()
+        post.refresh_from_db()
+        self.assertEqual(post.views_count, 2)
+
+
+class ConditionalGetTest(TestCase):
+    """Tests for ETag / Last-Modified validators"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.publication = Publication.objects.create(
+            title='Conditional Paper',
+            authors='Test Author',
+            year=2024
+        )
+        self.url = reverse('publication_detail', kwargs={'pk': self.publication.pk})
+    
+    def test_detail_sends_validators(self):
+        """Test detail page sends ETag and Last-Modified"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+    
+    def test_detail_not_modified(self):
+        """Test matching ETag returns 304 with a single query"""
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+    
+    def test_detail_modified_after_save(self):
+        """Test ETag changes after the object is updated"""
+        etag = self.client.get(self.url)['ETag']
+        self.publication.title = 'Changed Paper'
+        self.publication.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_list_etag_changes_on_delete(self):
+        """Test list ETag changes when an object is deleted"""
+        Publication.objects.create(title='Second Paper', authors='B', year=2020)
+        etag = self.client.get(reverse('publications'))['ETag']
+        self.publication.delete()
+        response = self.client.get(reverse('publications'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_missing_detail_returns_404(self):
+        """Test unknown object still returns 404"""
+        response = self.client.get(reverse('publication_detail', kwargs={'pk': 999}))
+        self.assertEqual(response.status_code, 404)
+    
+    def test_detail_etag_follows_related_posts(self):
+        """Test post ETag changes when a related post is added or edited"""
+        post = BlogPost.objects.create(title='Main Post', content='Test', category='Наука', is_published=True)
+        url = reverse('blog_detail', kwargs={'slug': post.slug})
+        etag = self.client.get(url)['ETag']
+        related = BlogPost.objects.create(title='Related Post', content='Test', category='Наука', is_published=True)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        
+        etag = response['ETag']
+        BlogPost.objects.create(title='Other Post', content='Test', category='Другое', is_published=True)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        
+        related.is_published = False
+        related.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+    
+    def test_detail_etag_follows_related_books(self):
+        """Test book ETag changes when a related book is removed"""
+        from .models import Book
+        
+        book = Book.objects.create(title='Main Book', author='Author', publication_year=2020)
+        related = Book.objects.create(title='Same Author', author='Author', publication_year=2010)
+        url = reverse('book_detail', kwargs={'slug': book.slug})
+        etag = self.client.get(url)['ETag']
+        related.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ViewCounterTest(TestCase):
+    """Tests for buffered view counters"""
+    
+    def setUp(self):
+        from .counters import flush_view_counters
+        flush_view_counters()
+        self.post = BlogPost.objects.create(
+            title='Counted Post',
+            content='Test content',
+            is_published=True,
+            published_at=timezone.now()
+        )
+    
+    def tearDown(self):
+        from .counters import flush_view_counters
+        flush_view_counters()
+    
+    def test_views_are_buffered(self):
+        """Test views are not written on every hit"""
+        from .counters import record_view
+        
+        with self.assertNumQueries(0):
+            record_view(BlogPost, self.post.slug)
+            record_view(BlogPost, self.post.slug)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 0)
+    
+    def test_flush_writes_batched_increments(self):
+        """Test flush applies all pending views in one update"""
+        from .counters import record_view, flush_view_counters
+        
+        for _ in range(3):
+            record_view(BlogPost, self.post.slug)
+        with self.assertNumQueries(1):
+            self.assertEqual(flush_view_counters(), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 3)
+    
+    def test_flush_command(self):
+        """Test management command flushes pending views"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        self.post.increment_views()
+        call_command('flush_view_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 1)
+    
+    def test_flush_command_warns_in_memory_mode(self):
+        """Test the command warns that per-worker buffers are out of its reach"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        stderr = StringIO()
+        with self.settings(VIEW_COUNTER_BACKEND='memory'):
+            call_command('flush_view_counters', stdout=StringIO(), stderr=stderr)
+        self.assertIn("VIEW_COUNTER_BACKEND = 'memory'", stderr.getvalue())
+        
+        stderr = StringIO()
+        with self.settings(VIEW_COUNTER_BACKEND='cache'):
+            call_command('flush_view_counters', stdout=StringIO(), stderr=stderr)
+        self.assertEqual(stderr.getvalue(), '')
+
+
+class PublicationSearchTest(TestCase):
+    """Tests for publication full-text search"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.exact = Publication.objects.create(
+            title='Социология образования',
+            authors='Ахмедова Ф.М.',
+            year=2020,
+            keywords='образование, молодежь',
+            abstract='Исследование доступа молодежи к высшему образованию.'
+        )
+        self.partial = Publication.objects.create(
+            title='Городские сообщества',
+            authors='Иванов И.И.',
+            year=2022,
+            abstract='Роль образования в городской среде.'
+        )
+        Publication.objects.create(title='Демография', authors='Петров П.П.', year=2021)
+    
+    def test_search_ranks_title_matches_first(self):
+        """Test results are ordered by relevance"""
+        from .search import search_publications
+        
+        results = list(search_publications(Publication.objects.all(), 'образование'))
+        self.assertEqual(results, [self.exact, self.partial])
+    
+    def test_search_prefix_matches_word_forms(self):
+        """Test word forms are matched"""
+        from .search import search_publications
+        
+        results = search_publications(Publication.objects.all(), 'социолог')
+        self.assertEqual(list(results), [self.exact])
+    
+    def test_search_index_follows_updates(self):
+        """Test index is kept in sync on save and delete"""
+        from .search import search_publications
+        
+        self.partial.abstract = 'Миграция'
+        self.partial.save()
+        self.exact.delete()
+        results = search_publications(Publication.objects.all(), 'образование')
+        self.assertEqual(list(results), [])
+    
+    def test_snippet_is_highlighted_and_escaped(self):
+        """Test snippet highlights terms and escapes HTML"""
+        from .search import search_publications, highlight_snippet
+        
+        Publication.objects.create(title='Тест', authors='Автор', year=2019, abstract='<b>маркер</b>')
+        result = search_publications(Publication.objects.all(), 'маркер').get()
+        html = highlight_snippet(result.search_snippet)
+        self.assertIn('<mark>маркер</mark>', html)
+        self.assertIn('&lt;b&gt;', html)
+    
+    def test_publications_view_search(self):
+        """Test publications page uses full-text search"""
+        response = self.client.get(reverse('publications'), {'search': 'молодежь'})
+        self.assertContains(response, 'Социология образования')
+        self.assertNotContains(response, 'Демография')
+        self.assertContains(response, '<mark>')
+
+
+class KeysetPaginationTest(TestCase):
+    """Tests for cursor pagination"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        for i in range(25):
+            Publication.objects.create(title=f'Paper {i:02d}', authors='A', year=2000 + i % 4)
+    
+    def _paginator(self, queryset=None, per_page=10):
+        from .pagination import KeysetPaginator
+        from .views import PUBLICATION_ORDERING
+        return KeysetPaginator(queryset or Publication.objects.all(), per_page, PUBLICATION_ORDERING)
+    
+    def test_nulls_modifier_only_on_nullable_keys(self):
+        """Test ORDER BY matches core_blog_list_idx: NULLS LAST only for published_at"""
+        from .pagination import KeysetPaginator
+        from .views import BLOG_ORDERING
+        
+        paginator = KeysetPaginator(BlogPost.objects.all(), 10, BLOG_ORDERING)
+        published_at, created_at, pk = paginator._order_by()
+        self.assertTrue(published_at.nulls_last)
+        self.assertFalse(created_at.nulls_last or created_at.nulls_first)
+        self.assertFalse(pk.nulls_last or pk.nulls_first)
+    
+    def test_cursor_walk_matches_ordering(self):
+        """Test walking next cursors returns every object once in order"""
+        paginator = self._paginator()
+        page = paginator.get_page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.get_page(cursor=page.next_cursor)
+            seen.extend(page)
+        self.assertEqual(seen, list(Publication.objects.order_by('-year', 'title', 'pk')))
+        self.assertEqual(page.number, 3)
+    
+    def test_previous_cursor(self):
+        """Test previous cursor returns the preceding page"""
+        paginator = self._paginator()
+        first = paginator.get_page()
+        second = paginator.get_page(cursor=first.next_cursor)
+        back = paginator.get_page(cursor=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertEqual(back.number, 1)
+    
+    def test_page_number_matches_cursor(self):
+        """Test numbered pages and cursor pages agree"""
+        paginator = self._paginator()
+        first = paginator.get_page()
+        self.assertEqual(list(paginator.get_page(2)), list(paginator.get_page(cursor=first.next_cursor)))
+    
+    def test_nullable_ordering_field(self):
+        """Test cursors over rows with NULL published_at"""
+        from .pagination import KeysetPaginator
+        from .views import BLOG_ORDERING
+        
+        for i in range(5):
+            BlogPost.objects.create(
+                title=f'Post {i}',
+                content='Test',
+                published_at=timezone.now() if i % 2 else None
+            )
+        paginator = KeysetPaginator(BlogPost.objects.all(), 2, BLOG_ORDERING)
+        page = paginator.get_page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.get_page(cursor=page.next_cursor)
+            seen.extend(page)
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(p.pk for p in seen)), 5)
+        self.assertIsNone(seen[-1].published_at)
+    
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        """Test broken cursor returns first page"""
+        paginator = self._paginator()
+        self.assertEqual(paginator.get_page(cursor='garbage').number, 1)
+    
+    def test_count_is_cached(self):
+        """Test total count is not recomputed on every request"""
+        self.assertEqual(self._paginator().count, 25)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._paginator().count, 25)
+    
+    def test_view_next_link_uses_cursor(self):
+        """Test listing renders cursor links"""
+        response = self.client.get(reverse('publications'))
+        self.assertContains(response, 'cursor=')
+        cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(reverse('publications'), {'cursor': cursor})
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+
+class FacetTest(TestCase):
+    """Tests for materialized filter facets"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.pub = Publication.objects.create(title='P1', authors='A', year=2020, publication_type='article')
+        Publication.objects.create(title='P2', authors='A', year=2020, publication_type='book')
+        Publication.objects.create(title='P3', authors='A', year=2018, publication_type='article')
+    
+    def test_counts_follow_creates(self):
+        """Test facet counts are maintained on create"""
+        from .facets import get_facets
+        
+        self.assertEqual(get_facets('publication_year'), [('2020', 2), ('2018', 1)])
+        self.assertEqual(dict(get_facets('publication_type')), {'article': 2, 'book': 1})
+    
+    def test_counts_follow_updates_and_deletes(self):
+        """Test facet counts move between values on update and delete"""
+        from .facets import get_facets
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pub.year = 2018
+            self.pub.save()
+        self.assertEqual(get_facets('publication_year'), [('2020', 1), ('2018', 2)])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pub.delete()
+        self.assertEqual(get_facets('publication_year'), [('2020', 1), ('2018', 1)])
+    
+    def test_blog_category_counts_published_only(self):
+        """Test unpublished posts are not counted"""
+        from .facets import get_facets
+        
+        post = BlogPost.objects.create(title='Draft', content='Test', category='Наука', is_published=False)
+        self.assertEqual(get_facets('blog_category'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            post.is_published = True
+            post.save()
+        self.assertEqual(get_facets('blog_category'), [('Наука', 1)])
+    
+    def test_cache_cleared_after_commit(self):
+        """Test cached facets are dropped only once the change is committed"""
+        from .facets import get_facets
+        
+        get_facets('publication_year')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pub.year = 2018
+            self.pub.save()
+            # До коммита остаются закешированные значения
+            self.assertEqual(get_facets('publication_year'), [('2020', 2), ('2018', 1)])
+        self.assertEqual(get_facets('publication_year'), [('2020', 1), ('2018', 2)])
+    
+    def test_facets_are_cached(self):
+        """Test facets are read without queries once cached"""
+        from .facets import get_facets
+        
+        get_facets('publication_year')
+        with self.assertNumQueries(0):
+            get_facets('publication_year')
+    
+    def test_rebuild_matches_incremental(self):
+        """Test full rebuild gives the same counts"""
+        from .facets import get_facets, rebuild_facets
+        
+        before = get_facets('publication_year')
+        rebuild_facets()
+        self.assertEqual(get_facets('publication_year'), before)
+    
+    def test_publications_view_shows_counts(self):
+        """Test publication filters show counts"""
+        response = self.client.get(reverse('publications'))
+        self.assertContains(response, '2020 (2)')
+
+
+class NormalizedTagTest(TestCase):
+    """Tests for normalized blog tags and publication keywords"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.post = BlogPost.objects.create(
+            title='Art Post', content='Test', tags='Art, Социология,  art ', is_published=True
+        )
+        BlogPost.objects.create(title='Smart Post', content='Test', tags='smart', is_published=True)
+        self.pub = Publication.objects.create(
+            title='Paper', authors='A', year=2020, keywords='Гендер, Образование'
+        )
+    
+    def test_tags_synced_on_save(self):
+        """Test tag string is split into unique ordered links"""
+        names = [link.tag.name for link in self.post.tag_links.all()]
+        self.assertEqual(names, ['Art', 'Социология'])
+        
+        self.post.tags = 'Социология'
+        self.post.save()
+        names = [link.tag.name for link in self.post.tag_links.all()]
+        self.assertEqual(names, ['Социология'])
+    
+    def test_tag_filter_is_exact(self):
+        """Test ?tag=art does not match 'smart'"""
+        response = self.client.get(reverse('blog') + '?tag=ART')
+        self.assertContains(response, 'Art Post')
+        self.assertNotContains(response, 'Smart Post')
+    
+    def test_keyword_filter(self):
+        """Test publications are filtered by keyword"""
+        Publication.objects.create(title='Other', authors='B', year=2021, keywords='Гендерные исследования')
+        response = self.client.get(reverse('publications') + '?keyword=гендер')
+        self.assertContains(response, 'Paper')
+        self.assertNotContains(response, 'Other')
+    
+    def test_tag_cloud_counts_and_cache(self):
+        """Test tag cloud counts published posts and is cached"""
+        from .tags import get_tag_cloud
+        
+        BlogPost.objects.create(title='Draft', content='Test', tags='art', is_published=False)
+        self.assertEqual(dict(get_tag_cloud()), {'Art': 1, 'Социология': 1, 'smart': 1})
+        with self.assertNumQueries(0):
+            get_tag_cloud()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.delete()
+            # До коммита облако не сбрасывается
+            self.assertIn('Art', dict(get_tag_cloud()))
+        self.assertNotIn('Art', dict(get_tag_cloud()))
+    
+    def test_keyword_cloud(self):
+        """Test keyword cloud lists publication keywords"""
+        from .tags import get_keyword_cloud
+        
+        self.assertEqual(dict(get_keyword_cloud()), {'Гендер': 1, 'Образование': 1})
+
+
+class OutboxTest(TestCase):
+    """Tests for the notification outbox"""
+    
+    def setUp(self):
+        self.service = Service.objects.create(title='Консультация', description='Test')
+    
+    def create_order(self):
+        return ServiceOrder.objects.create(
+            service=self.service, full_name='Client', email='c@example.com',
+            phone='123', message='Test'
+        )
+    
+    def test_order_enqueues_without_sending(self):
+        """Test creating an order only writes an outbox row"""
+        from unittest import mock
+        from .models import OutboxMessage
+        
+        with mock.patch('core.outbox.get_client') as get_client:
+            order = self.create_order()
+        get_client.assert_not_called()
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.status, 'pending')
+        self.assertIn(f'#{order.id}', message.payload['text'])
+    
+    def test_worker_delivers(self):
+        """Test the worker sends pending messages and marks them sent"""
+        from unittest import mock
+        from .models import OutboxMessage
+        from .outbox import process_outbox
+        
+        self.create_order()
+        with self.settings(TELEGRAM_CHAT_ID='42'), mock.patch('core.outbox.get_client') as get_client:
+            self.assertEqual(process_outbox(), (1, 0))
+            self.assertEqual(process_outbox(), (0, 0))
+        get_client.return_value.send_message.assert_called_once()
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.status, 'sent')
+        self.assertIsNotNone(message.sent_at)
+    
+    def test_backoff_and_dead_letter(self):
+        """Test failures are retried with growing delay and then dead-lettered"""
+        from datetime import timedelta
+        from unittest import mock
+        from .models import OutboxMessage
+        from .outbox import deliver, retry_delay
+        from .telegram_notifications import TelegramError
+        
+        self.assertEqual([retry_delay(n) for n in (1, 2, 3)], [30, 60, 120])
+        self.assertEqual(retry_delay(20), 3600)
+        
+        self.create_order()
+        message = OutboxMessage.objects.get()
+        with self.settings(OUTBOX_MAX_ATTEMPTS=2, TELEGRAM_CHAT_ID='42'), \
+                mock.patch('core.outbox.get_client') as get_client:
+            get_client.return_value.send_message.side_effect = TelegramError('down')
+            before = timezone.now()
+            self.assertFalse(deliver(message))
+            self.assertEqual(message.status, 'pending')
+            self.assertGreaterEqual(message.next_attempt_at, before + timedelta(seconds=30))
+            self.assertEqual(message.last_error, 'down')
+            self.assertFalse(deliver(message))
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'dead')
+        self.assertEqual(message.attempts, 2)
+    
+    def test_requeue(self):
+        """Test dead messages can be requeued"""
+        from .models import OutboxMessage
+        from .outbox import requeue
+        
+        self.create_order()
+        OutboxMessage.objects.update(status='dead', attempts=8)
+        self.assertEqual(requeue(OutboxMessage.objects.all()), 1)
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('pending', 0))
+
+
+class EmailQueueTest(TestCase):
+    """Tests for queued email delivery"""
+    
+    def post_contact(self):
+        return self.client.post(reverse('contact'), {
+            'name': 'Client', 'email': 'client@example.com',
+            'subject': 'Вопрос', 'message': 'Текст <b>сообщения</b>',
+        })
+    
+    def test_contact_queues_email(self):
+        """Test the contact view queues mail instead of sending it"""
+        from django.core import mail
+        from .models import OutboxMessage
+        
+        response = self.post_contact()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        message = OutboxMessage.objects.get(channel='email')
+        self.assertEqual(message.payload['subject'], 'Новое сообщение: Вопрос')
+        self.assertIn('От: Client (client@example.com)', message.payload['body'])
+        self.assertIn('&lt;b&gt;', message.payload['html'])
+    
+    def test_worker_reuses_connection(self):
+        """Test the worker sends multipart mail over a single connection"""
+        from unittest import mock
+        from django.core import mail
+        from .outbox import process_outbox, get_connection
+        
+        self.post_contact()
+        self.post_contact()
+        with mock.patch('core.outbox.get_connection', wraps=get_connection) as connect:
+            self.assertEqual(process_outbox(batch_size=1), (2, 0))
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].reply_to, ['client@example.com'])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+    
+    def test_transient_and_permanent_smtp_errors(self):
+        """Test 4xx and server/auth 5xx SMTP errors are retried, address rejections are dead-lettered"""
+        import smtplib
+        from unittest import mock
+        from .models import OutboxMessage
+        from .outbox import deliver
+        
+        self.post_contact()
+        message = OutboxMessage.objects.get(channel='email')
+        send = 'django.core.mail.EmailMultiAlternatives.send'
+        with mock.patch(send, side_effect=smtplib.SMTPResponseException(451, b'try later')):
+            self.assertFalse(deliver(message))
+        self.assertEqual(message.status, 'pending')
+        for error in (
+            smtplib.SMTPAuthenticationError(535, b'bad credentials'),
+            smtplib.SMTPResponseException(530, b'authentication required'),
+            smtplib.SMTPResponseException(554, b'transaction failed'),
+        ):
+            with mock.patch(send, side_effect=error):
+                self.assertFalse(deliver(message))
+            self.assertEqual(message.status, 'pending')
+        with mock.patch(send, side_effect=smtplib.SMTPResponseException(550, b'no such user')):
+            self.assertFalse(deliver(message))
+        self.assertEqual(message.status, 'dead')
+
+
+class FakeTelegramServer:
+    """Local Bot API stand-in: answers sendMessage with queued responses"""
+    
+    def __init__(self):
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        server = self
+        self.responses = []
+        self.requests = []
+        self.connections = 0
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def setup(self):
+                super().setup()
+                server.connections += 1
+            
+            def do_POST(self):
+                length = int(self.headers['Content-Length'])
+                server.requests.append((self.path, json.loads(self.rfile.read(length))))
+                status, data = server.responses.pop(0) if server.responses else (200, {'ok': True, 'result': {}})
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TelegramClientTest(TestCase):
+    """Tests for the pooled Telegram client"""
+    
+    def setUp(self):
+        from .telegram_notifications import TelegramClient
+        self.server = FakeTelegramServer()
+        self.client = TelegramClient(
+            'TOKEN', base_url=self.server.url, rate=100, burst=100,
+            breaker_threshold=2, breaker_reset=60,
+        )
+    
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+    
+    def test_session_reuses_connection(self):
+        """Test several messages share one keep-alive connection"""
+        for i in range(3):
+            self.client.send_message('42', f'msg {i}')
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.requests[0][0], '/botTOKEN/sendMessage')
+        self.assertEqual(self.server.requests[2][1]['text'], 'msg 2')
+    
+    def test_circuit_breaker_fails_fast(self):
+        """Test the breaker opens after repeated server errors"""
+        from .telegram_notifications import TelegramError, CircuitOpenError
+        
+        self.server.responses = [(502, {'ok': False, 'description': 'Bad Gateway'})] * 2
+        for _ in range(2):
+            with self.assertRaises(TelegramError):
+                self.client.send_message('42', 'x')
+        with self.assertRaises(CircuitOpenError):
+            self.client.send_message('42', 'x')
+        self.assertEqual(len(self.server.requests), 2)
+        
+        # После паузы пробный запрос закрывает breaker
+        self.client.breaker._opened_at -= 60
+        self.client.send_message('42', 'x')
+        self.assertEqual(self.client.breaker.state, 'closed')
+    
+    def test_client_errors_are_permanent(self):
+        """Test 4xx answers are permanent and do not trip the breaker"""
+        from .telegram_notifications import TelegramError
+        
+        self.server.responses = [(400, {'ok': False, 'description': 'chat not found'})] * 3
+        for _ in range(3):
+            with self.assertRaises(TelegramError) as raised:
+                self.client.send_message('42', 'x')
+            self.assertTrue(raised.exception.permanent)
+        self.assertEqual(self.client.breaker.state, 'closed')
+    
+    def test_markup_error_resends_as_plain_text(self):
+        """Test a message with broken markup is resent without parse_mode"""
+        self.server.responses = [(400, {
+            'ok': False, 'description': "Bad Request: can't parse entities: unsupported start tag",
+        })]
+        self.client.send_message('42', '<b>Заказ</b> от <x> &amp; Co')
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[1][1], {'chat_id': '42', 'text': 'Заказ от  & Co'})
+    
+    def test_rate_limit(self):
+        """Test the token bucket and 429 retry_after"""
+        from .telegram_notifications import TokenBucket, TelegramError
+        
+        bucket = TokenBucket(rate=1, capacity=2)
+        self.assertTrue(bucket.acquire(max_wait=0))
+        self.assertTrue(bucket.acquire(max_wait=0))
+        self.assertFalse(bucket.acquire(max_wait=0))
+        
+        self.server.responses = [(429, {'ok': False, 'description': 'Too Many Requests',
+                                        'parameters': {'retry_after': 30}})]
+        with self.assertRaises(TelegramError) as raised:
+            self.client.send_message('42', 'x')
+        self.assertEqual(raised.exception.retry_after, 30)
+        self.client.max_wait = 1
+        with self.assertRaises(TelegramError):
+            self.client.send_message('42', 'x')
+        self.assertEqual(len(self.server.requests), 1)
+    
+    def test_send_telegram_message_uses_base_url(self):
+        """Test the module-level helper goes through the configured API URL"""
+        from .telegram_notifications import send_telegram_message
+        
+        with self.settings(TELEGRAM_BOT_TOKEN='T2', TELEGRAM_CHAT_ID='7', TELEGRAM_API_URL=self.server.url):
+            self.assertTrue(send_telegram_message('hello'))
+        self.assertEqual(self.server.requests[-1], ('/botT2/sendMessage', {'chat_id': '7', 'text': 'hello', 'parse_mode': 'HTML'}))
+
+
+class TelegramDigestTest(TestCase):
+    """Tests for batching order notifications into a digest"""
+    
+    def setUp(self):
+        self.service = Service.objects.create(title='Консультация', description='Test')
+    
+    def create_orders(self, count):
+        return [
+            ServiceOrder.objects.create(
+                service=self.service, full_name=f'Client {i}', email='c@example.com',
+                phone='123', message='Test'
+            )
+            for i in range(count)
+        ]
+    
+    def test_order_message_escapes_user_fields(self):
+        """Test user-entered fields cannot break the HTML parse mode"""
+        from .telegram_notifications import format_service_order_message
+        
+        order = ServiceOrder.objects.create(
+            service=self.service, full_name='<b>Иван & Co', email='c@example.com',
+            phone='123', organization='A<B', message='x < y'
+        )
+        message = format_service_order_message(order)
+        self.assertIn('Имя: &lt;b&gt;Иван &amp; Co', message)
+        self.assertIn('Организация: A&lt;B', message)
+        self.assertIn('x &lt; y', message)
+    
+    def test_orders_wait_for_window(self):
+        """Test orders are held until the window ends"""
+        from unittest import mock
+        from .outbox import process_outbox
+        
+        with self.settings(TELEGRAM_DIGEST_WINDOW=60, TELEGRAM_DIGEST_MAX_ORDERS=10):
+            self.create_orders(2)
+            with mock.patch('core.outbox.get_client') as get_client:
+                self.assertEqual(process_outbox(), (0, 0))
+            get_client.assert_not_called()
+    
+    def test_max_orders_sends_one_digest(self):
+        """Test reaching the order limit sends a single combined message"""
+        from unittest import mock
+        from .models import OutboxMessage
+        from .outbox import process_outbox
+        
+        with self.settings(TELEGRAM_DIGEST_WINDOW=60, TELEGRAM_DIGEST_MAX_ORDERS=3, TELEGRAM_CHAT_ID='42'):
+            orders = self.create_orders(3)
+            with mock.patch('core.outbox.get_client') as get_client:
+                self.assertEqual(process_outbox(), (3, 0))
+        send = get_client.return_value.send_message
+        self.assertEqual(send.call_count, 1)
+        text = send.call_args[0][1]
+        self.assertIn('Новые заказы: 3', text)
+        for order in orders:
+            self.assertIn(f'#{order.id}', text)
+        self.assertFalse(OutboxMessage.objects.exclude(status='sent').exists())
+    
+    def test_digest_is_split_at_limit(self):
+        """Test long digests are split into messages under 4096 characters"""
+        from .telegram_notifications import format_order_digest
+        
+        summaries = [
+            {'kind': 'book', 'id': i, 'title': 'Книга ' * 20, 'client': f'Client <{i}>',
+             'phone': '+998 90 000 00 00', 'quantity': 2, 'total': 150000}
+            for i in range(200)
+        ]
+        parts = format_order_digest(summaries)
+        self.assertGreater(len(parts), 1)
+        for part in parts:
+            self.assertLessEqual(len(part), 4096)
+            self.assertEqual(part.count('<pre>'), part.count('</pre>'))
+            self.assertNotIn('<0>', part)
+        text = '\n'.join(parts)
+        for i in range(200):
+            self.assertIn(f'<b>#{i}</b>', text)
+
+
+class AsyncOrderViewTest(TestCase):
+    """Tests for the async order and contact views"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.service = Service.objects.create(title='Консультация', description='Test')
+        self.data = {
+            'service': self.service.pk, 'full_name': 'Client', 'email': 'c@example.com',
+            'phone': '123', 'message': 'Test',
+        }
+    
+    async def test_asgi_leaves_delivery_to_worker(self):
+        """Test an ASGI order submission only enqueues notifications"""
+        from unittest import mock
+        from django.test import AsyncClient
+        from .models import OutboxMessage
+        
+        with self.settings(TELEGRAM_CHAT_ID='42'), mock.patch('core.outbox.get_client') as get_client:
+            response = await AsyncClient().post(reverse('order_service'), self.data)
+        self.assertEqual(response.status_code, 302)
+        get_client.assert_not_called()
+        self.assertEqual(await OutboxMessage.objects.filter(status='pending').acount(), 3)
+    
+    def test_wsgi_leaves_delivery_to_worker(self):
+        """Test WSGI submissions only enqueue notifications"""
+        from unittest import mock
+        from .models import OutboxMessage
+        
+        with mock.patch('core.outbox.get_client') as get_client:
+            response = self.client.post(reverse('order_service'), self.data)
+        self.assertEqual(response.status_code, 302)
+        get_client.assert_not_called()
+        self.assertEqual(OutboxMessage.objects.filter(status='pending').count(), 3)
+    
+    async def test_unknown_book_is_404(self):
+        """Test ordering a missing book returns 404"""
+        from django.test import AsyncClient
+        
+        response = await AsyncClient().get(reverse('order_book_direct', args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+
+def make_image(size=(1500, 1000), fmt='PNG', name='photo.png', mode='RGB'):
+    """Uploaded in-memory test image"""
+    import io
+    from PIL import Image
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    
+    buffer = io.BytesIO()
+    Image.new(mode, size, 'red').save(buffer, fmt)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{fmt.lower()}')
+
+
+class ResponsiveImageTest(TestCase):
+    """Tests for responsive image variants"""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.core.cache import cache
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = self.settings(MEDIA_ROOT=media_root, IMAGE_DERIVATIVE_WIDTHS=(320, 640, 960, 1280))
+        override.enable()
+        self.addCleanup(override.disable)
+    
+    def create_post(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return BlogPost.objects.create(title='Post', content='Test', featured_image=image, is_published=True)
+    
+    def test_variants_generated_on_upload(self):
+        """Test WebP and JPEG variants are stored next to the original"""
+        from django.core.files.storage import default_storage
+        from .images import derivative_name
+        
+        post = self.create_post(make_image())
+        post.refresh_from_db()
+        self.assertEqual(post.featured_image_variants, [320, 640, 960, 1280])
+        for width in post.featured_image_variants:
+            for ext in ('webp', 'jpg'):
+                self.assertTrue(default_storage.exists(derivative_name(post.featured_image.name, width, ext)))
+    
+    def test_small_images_are_not_upscaled(self):
+        """Test images narrower than the widths keep their own size"""
+        from .images import plan_widths
+        
+        post = self.create_post(make_image(size=(200, 100), mode='RGBA'))
+        post.refresh_from_db()
+        self.assertEqual(post.featured_image_variants, [200])
+        self.assertEqual(plan_widths(1280, [320, 640, 1280]), [320, 640, 1280])
+        self.assertEqual(plan_widths(3000, [320, 640, 1280]), [320, 640, 1280])
+    
+    def test_unchanged_image_not_regenerated(self):
+        """Test saving without a new upload does not rebuild variants"""
+        from unittest import mock
+        
+        post = self.create_post(make_image())
+        with mock.patch('core.signals.process_instance') as process, self.captureOnCommitCallbacks(execute=True):
+            post.title = 'Renamed'
+            post.save()
+        process.assert_not_called()
+    
+    def test_replaced_image_released(self):
+        """Test replacing an image deletes the old original and its variants unless shared"""
+        from django.core.files.storage import default_storage
+        from .images import derivative_name
+        
+        post = self.create_post(make_image(size=(400, 300)))
+        with self.captureOnCommitCallbacks(execute=True):
+            other = BlogPost.objects.create(title='Other', content='Test', featured_image=make_image(size=(400, 300)))
+        shared = post.featured_image.name
+        self.assertEqual(other.featured_image.name, shared)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.featured_image = make_image(size=(500, 300))
+            post.save()
+        # Тот же файл использует другая статья
+        self.assertTrue(default_storage.exists(derivative_name(shared, 320, 'webp')))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            other.featured_image = make_image(size=(600, 300))
+            other.save()
+        self.assertFalse(default_storage.exists(shared))
+        for ext in ('webp', 'jpg'):
+            self.assertFalse(default_storage.exists(derivative_name(shared, 320, ext)))
+        self.assertTrue(default_storage.exists(derivative_name(other.featured_image.name, 320, 'webp')))
+    
+    def test_missing_file_does_not_break_loading(self):
+        """Test loading rows never opens image files (no width_field/height_field)"""
+        from .models import Project
+        
+        Project.objects.create(title='Lost', description='Test', start_date=date(2024, 1, 1), image='projects/missing.png')
+        self.assertEqual(Project.objects.get().image_width, None)
+        response = self.client.get(reverse('portfolio'))
+        self.assertEqual(response.status_code, 200)
+    
+    def test_profile_cache_refreshed_after_processing(self):
+        """Test the cached profile picks up variants written by update()"""
+        from .caching import get_profile
+        
+        with self.captureOnCommitCallbacks() as callbacks:
+            Profile.objects.create(full_name='Photo Profile', email='p@example.com', photo=make_image())
+        self.assertEqual(get_profile().photo_variants, [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_profile().photo_variants, [320, 640, 960, 1280])
+    
+    def test_template_tag_srcset(self):
+        """Test the tag emits a picture with srcset and falls back to the original"""
+        from django.template import Context, Template
+        
+        template = Template('{% load custom_filters %}{% responsive_image post.featured_image alt=title sizes="50vw" class="x" %}')
+        post = self.create_post(make_image())
+        post.refresh_from_db()
+        html = template.render(Context({'post': post, 'title': 'A&B'}))
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('__w640.webp 640w', html)
+        self.assertIn('__w960.jpg"', html)
+        self.assertIn('alt="A&amp;B"', html)
+        self.assertIn('class="x"', html)
+        self.assertIn('loading="lazy"', html)
+        
+        post.featured_image_variants = []
+        html = template.render(Context({'post': post, 'title': 'A&B'}))
+        self.assertNotIn('<picture', html)
+        self.assertIn(f'src="{post.featured_image.url}"', html)
+    
+    def test_backfill_command(self):
+        """Test the backfill command processes images without variants"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        post = self.create_post(make_image())
+        BlogPost.objects.filter(pk=post.pk).update(featured_image_variants=[])
+        call_command('generate_image_derivatives', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.featured_image_variants, [320, 640, 960, 1280])
+    
+    def test_dimensions_and_placeholder_stored(self):
+        """Test width, height and LQIP placeholder are stored on the model"""
+        from unittest import mock
+        from django.template import Context, Template
+        
+        post = self.create_post(make_image(size=(1500, 1000)))
+        post = BlogPost.objects.get(pk=post.pk)
+        self.assertEqual((post.featured_image_width, post.featured_image_height), (1500, 1000))
+        self.assertTrue(post.featured_image_placeholder.startswith('data:image/webp;base64,'))
+        self.assertLess(len(post.featured_image_placeholder), 1000)
+        
+        template = Template('{% load custom_filters %}{% responsive_image post.featured_image %}')
+        with mock.patch('django.core.files.storage.FileSystemStorage.open', side_effect=AssertionError('storage read')):
+            post = BlogPost.objects.get(pk=post.pk)
+            html = template.render(Context({'post': post}))
+        self.assertIn('width="1500" height="1000"', html)
+        self.assertIn('url(data:image/webp;base64,', html)
+    
+    def test_transparent_images_have_no_placeholder(self):
+        """Test transparent images get no placeholder background"""
+        post = self.create_post(make_image(size=(400, 400), mode='RGBA'))
+        post.refresh_from_db()
+        self.assertEqual(post.featured_image_placeholder, '')
+
+
+
+def make_pdf(size=(600, 900), name='paper.pdf'):
+    """Uploaded in-memory single-page test PDF"""
+    import io
+    from PIL import Image
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'white').save(buffer, 'PDF')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='application/pdf')
+
+
+class PdfPreviewTest(TestCase):
+    """Tests for PDF first-page previews"""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.core.cache import cache
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = self.settings(
+            MEDIA_ROOT=media_root, IMAGE_DERIVATIVE_WIDTHS=(320, 640), PDF_PREVIEW_WIDTH=640,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+    
+    def create_publication(self, pdf):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Publication.objects.create(
+                title='Paper', authors='Author', year=2024, publication_type='article', pdf_file=pdf,
+            )
+    
+    def test_preview_rendered_on_upload(self):
+        """Test the first page is rendered with variants and dimensions"""
+        from django.core.files.storage import default_storage
+        
+        publication = self.create_publication(make_pdf())
+        publication.refresh_from_db()
+        self.assertRegex(publication.pdf_preview.name, r'^publications/previews/[0-9a-f]{32}\.jpg$')
+        self.assertEqual((publication.pdf_preview_width, publication.pdf_preview_height), (640, 960))
+        self.assertEqual(publication.pdf_preview_variants, [320, 640])
+        self.assertTrue(default_storage.exists(publication.pdf_preview.name))
+    
+    def test_removing_pdf_removes_preview(self):
+        """Test clearing the PDF deletes the preview file"""
+        from django.core.files.storage import default_storage
+        
+        publication = self.create_publication(make_pdf())
+        publication.refresh_from_db()
+        name = publication.pdf_preview.name
+        with self.captureOnCommitCallbacks(execute=True):
+            publication.pdf_file = None
+            publication.save()
+        publication.refresh_from_db()
+        self.assertFalse(publication.pdf_preview)
+        self.assertEqual(publication.pdf_preview_variants, [])
+        self.assertFalse(default_storage.exists(name))
+    
+    def test_book_page_loads_pdf_on_click(self):
+        """Test the book page shows the preview instead of embedding the PDF"""
+        from .images import derivative_name
+        from .models import Book
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.create(
+                title='Book', description='Text', publication_year=2024,
+                cover_image=make_image(size=(300, 400)), pdf_file=make_pdf(name='book.pdf'),
+            )
+        book.refresh_from_db()
+        response = self.client.get(reverse('book_detail', args=[book.slug]))
+        self.assertContains(response, f'data-pdf-src="/media/{book.pdf_file.name}"')
+        self.assertContains(response, derivative_name(book.pdf_preview.name, 640, 'webp'))
+        self.assertNotContains(response, '<embed')
+    
+    def test_backfill_command(self):
+        """Test generate_pdf_previews fills in missing previews"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        publication = self.create_publication(make_pdf())
+        Publication.objects.filter(pk=publication.pk).update(pdf_preview='', pdf_preview_variants=[])
+        call_command('generate_pdf_previews', stdout=StringIO())
+        publication.refresh_from_db()
+        self.assertTrue(publication.pdf_preview)
+        self.assertEqual(publication.pdf_preview_variants, [320, 640])
+
+
+class MediaServingTest(TestCase):
+    """Tests for local media serving with Range support"""
+    
+    def setUp(self):
+        import os
+        import shutil
+        import tempfile
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = self.settings(MEDIA_ROOT=media_root, MEDIA_SENDFILE='')
+        override.enable()
+        self.addCleanup(override.disable)
+        os.makedirs(os.path.join(media_root, 'books', 'pdfs'))
+        self.data = bytes(range(256)) * 40
+        with open(os.path.join(media_root, 'books', 'pdfs', 'book.pdf'), 'wb') as f:
+            f.write(self.data)
+        self.url = '/media/books/pdfs/book.pdf'
+    
+    def test_full_response(self):
+        """Test the whole file is streamed with validators"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['X-Frame-Options'], 'SAMEORIGIN')
+        self.assertTrue(response.has_header('ETag'))
+    
+    def test_range_request(self):
+        """Test a byte range returns 206 with only the requested bytes"""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.data)}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(b''.join(response.streaming_content), self.data[100:200])
+        
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.data[-10:])
+    
+    def test_unsatisfiable_and_stale_ranges(self):
+        """Test out-of-file ranges get 416 and a stale If-Range gets the full file"""
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.data)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.data)}')
+        
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+    
+    def test_not_modified(self):
+        """Test If-None-Match returns 304 without a body"""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+    
+    def test_sendfile_offload(self):
+        """Test X-Accel-Redirect hands the file to the web server"""
+        with self.settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected-media/'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/books/pdfs/book.pdf')
+        self.assertEqual(response.content, b'')
+    
+    def test_path_traversal_rejected(self):
+        """Test paths outside MEDIA_ROOT are not served"""
+        response = self.client.get('/media/../settings.py')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/media/%2E%2E/%2E%2E/etc/passwd')
+        self.assertEqual(response.status_code, 404)
+
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 S3 client calls used by static sync"""
+    
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+    
+    def __init__(self):
+        self.objects = {}
+        self.uploads = []
+    
+    def upload_file(self, filename, bucket, key, ExtraArgs=None):
+        with open(filename, 'rb') as f:
+            self.objects[key] = (f.read(), ExtraArgs or {})
+        self.uploads.append(key)
+    
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = (Body, kwargs)
+    
+    def get_object(self, Bucket, Key):
+        import io
+        if Key not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        return {'Body': io.BytesIO(self.objects[Key][0])}
+
+
+class StaticSyncTest(TestCase):
+    """Tests for incremental static upload to R2"""
+    
+    def setUp(self):
+        import os
+        import shutil
+        import tempfile
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.root, 'css'))
+        self.write('css/site.abc123.css', b'body{}')
+        self.write('css/site.abc123.css.gz', b'gz')
+        self.write('css/site.abc123.css.br', b'br')
+        self.write('plugin.js', b'var a;')
+        self.client_s3 = FakeS3Client()
+    
+    def write(self, name, data):
+        import os
+        with open(os.path.join(self.root, name), 'wb') as f:
+            f.write(data)
+    
+    def sync(self):
+        from .static_sync import sync_static
+        return sync_static(self.root, self.client_s3, 'bucket', 'static/', hashed_names=['css/site.abc123.css'], workers=2)
+    
+    def test_uploads_compressed_variants(self):
+        """Test gzip goes under the original key and brotli next to it"""
+        self.assertEqual(self.sync(), (2, 0))
+        body, args = self.client_s3.objects['static/css/site.abc123.css']
+        self.assertEqual(body, b'gz')
+        self.assertEqual(args['ContentEncoding'], 'gzip')
+        self.assertEqual(args['ContentType'], 'text/css')
+        self.assertIn('immutable', args['CacheControl'])
+        self.assertEqual(self.client_s3.objects['static/css/site.abc123.css.br'][1]['ContentEncoding'], 'br')
+        self.assertNotIn('immutable', self.client_s3.objects['static/plugin.js'][1]['CacheControl'])
+    
+    def test_only_changed_files_uploaded(self):
+        """Test a second sync skips unchanged files and uploads edits"""
+        self.sync()
+        self.client_s3.uploads.clear()
+        self.assertEqual(self.sync(), (0, 2))
+        self.assertEqual(self.client_s3.uploads, [])
+        
+        self.write('plugin.js', b'var b;')
+        self.assertEqual(self.sync(), (1, 1))
+        self.assertEqual(self.client_s3.uploads, ['static/plugin.js'])
+
+
+class FakeBucket:
+    """In-memory stand-in for a boto3 Bucket resource"""
+    
+    def __init__(self):
+        self.objects = {}
+    
+    def Object(self, key):
+        bucket = self
+        
+        class FakeObject:
+            def upload_fileobj(self, body, ExtraArgs=None, Config=None):
+                bucket.objects[key] = (body.read(), ExtraArgs or {})
+        
+        return FakeObject()
+
+
+class MediaCompressionTest(TestCase):
+    """Tests for the media compression policy"""
+    
+    def save(self, name, data):
+        from unittest import mock
+        from django.core.files.base import ContentFile
+        from .storage_backends import MediaStorage
+        
+        bucket = FakeBucket()
+        with mock.patch.object(MediaStorage, 'bucket', new_callable=mock.PropertyMock, return_value=bucket), \
+                self.settings(MEDIA_CONTENT_ADDRESSED=False):
+            MediaStorage(file_overwrite=True).save(name, ContentFile(data))
+        return bucket.objects[f'media/{name}']
+    
+    def test_failed_record_keeps_transaction_usable(self):
+        """Test a failed decision write is rolled back to its own savepoint"""
+        from django.db import transaction
+        from .compression import Decision, record
+        from .models import MediaCompression
+        
+        with transaction.atomic():
+            # NOT NULL нарушен: запись падает с IntegrityError
+            record('broken.txt', 'text/plain', Decision('compressed', 'gzip', 0.2), None, 10)
+            self.assertFalse(transaction.get_connection().needs_rollback)
+            record('ok.txt', 'text/plain', Decision('compressed', 'gzip', 0.2), 100, 10)
+        self.assertEqual(list(MediaCompression.objects.values_list('name', flat=True)), ['ok.txt'])
+    
+    def test_pdf_stored_uncompressed(self):
+        """Test PDFs are uploaded as is and the decision is recorded"""
+        from .models import MediaCompression
+        
+        data = b'%PDF-1.7\n' + bytes(range(256)) * 100
+        body, params = self.save('books/pdfs/book.pdf', data)
+        self.assertEqual(body, data)
+        self.assertNotIn('ContentEncoding', params)
+        record = MediaCompression.objects.get(name='books/pdfs/book.pdf')
+        self.assertEqual(record.reason, 'precompressed')
+        self.assertEqual(record.stored_size, len(data))
+    
+    def test_text_compressed_when_effective(self):
+        """Test compressible text is gzipped and incompressible text is not"""
+        import gzip
+        import os
+        from .models import MediaCompression
+        
+        svg = b'<svg>' + b'<rect width="1" height="1"/>' * 500 + b'</svg>'
+        body, params = self.save('uploads/logo.svg', svg)
+        self.assertEqual(params['ContentEncoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), svg)
+        
+        noise = os.urandom(20000)
+        body, params = self.save('uploads/noise.txt', noise)
+        self.assertNotIn('ContentEncoding', params)
+        self.assertEqual(MediaCompression.objects.get(name='uploads/noise.txt').reason, 'low_ratio')
+    
+    def test_savings_report(self):
+        """Test the report sums bytes saved by compression and by skipping"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .compression import savings
+        from .models import MediaCompression
+        
+        MediaCompression.objects.create(name='a.svg', content_type='image/svg+xml', reason='compressed',
+                                        encoding='gzip', original_size=1000, stored_size=200, sample_ratio=0.2)
+        MediaCompression.objects.create(name='b.pdf', content_type='application/pdf', reason='precompressed',
+                                        original_size=1000, stored_size=1000, sample_ratio=1.05)
+        report = savings(MediaCompression.objects.all())
+        self.assertEqual(report['compressed']['saved'], 800)
+        self.assertEqual(report['precompressed']['saved'], 50)
+        
+        out = StringIO()
+        call_command('media_compression_report', stdout=out)
+        self.assertIn('850 B', out.getvalue())
+
+
+class FakeS3Server:
+    """Local S3-compatible stand-in: objects and multipart uploads in memory (path-style)"""
+    
+    def __init__(self):
+        import hashlib
+        import re
+        import threading
+        import uuid
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs, unquote, urlsplit
+        
+        server = self
+        self.objects = {}
+        self.uploads = {}
+        self.gets = 0
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def parse(self):
+                url = urlsplit(self.path)
+                key = unquote(url.path).split('/', 2)[2]
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                return key, {name: values[0] for name, values in parse_qs(url.query, keep_blank_values=True).items()}, body
+            
+            def reply(self, status=200, body=b'', headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+            
+            def do_PUT(self):
+                key, query, body = self.parse()
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if 'uploadId' in query:
+                    server.uploads[query['uploadId']]['parts'][int(query['partNumber'])] = (etag, body)
+                else:
+                    server.objects[key] = body
+                self.reply(headers={'ETag': etag})
+            
+            def do_POST(self):
+                key, query, body = self.parse()
+                if 'uploads' in query:
+                    upload_id = uuid.uuid4().hex
+                    server.uploads[upload_id] = {'key': key, 'parts': {}}
+                    xml = f'<InitiateMultipartUploadResult><Bucket>b</Bucket><Key>{key}</Key><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>'
+                    return self.reply(body=xml.encode())
+                upload = server.uploads.pop(query['uploadId'])
+                numbers = [int(n) for n in re.findall(rb'<PartNumber>(\d+)</PartNumber>', body)]
+                server.objects[upload['key']] = b''.join(upload['parts'][n][1] for n in numbers)
+                xml = f'<CompleteMultipartUploadResult><Bucket>b</Bucket><Key>{key}</Key><ETag>"done"</ETag></CompleteMultipartUploadResult>'
+                self.reply(body=xml.encode())
+            
+            def do_HEAD(self):
+                key, _, _ = self.parse()
+                if key not in server.objects:
+                    return self.reply(404)
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(server.objects[key])))
+                self.send_header('ETag', server.etag(key))
+                self.end_headers()
+            
+            def do_GET(self):
+                key, _, _ = self.parse()
+                if key not in server.objects:
+                    return self.reply(404, b'<Error><Code>NoSuchKey</Code></Error>')
+                server.gets += 1
+                etag = server.etag(key)
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.reply(body=server.objects[key], headers={'ETag': etag})
+            
+            def do_DELETE(self):
+                key, query, _ = self.parse()
+                if 'uploadId' in query:
+                    server.uploads.pop(query['uploadId'], None)
+                else:
+                    server.objects.pop(key, None)
+                self.reply(204)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+    
+    def etag(self, key):
+        import hashlib
+        return '"%s"' % hashlib.md5(self.objects[key]).hexdigest()
+    
+    def storage(self, storage_class=None):
+        from botocore.config import Config
+        from .storage_backends import MediaStorage
+        return (storage_class or MediaStorage)(
+            bucket_name='media-test', endpoint_url=self.url, access_key='test', secret_key='test',
+            region_name='auto', file_overwrite=True,
+            client_config=Config(
+                s3={'addressing_style': 'path'}, signature_version='s3v4',
+                request_checksum_calculation='when_required', response_checksum_validation='when_required',
+            ),
+        )
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class DirectUploadTest(TestCase):
+    """Tests for presigned multipart uploads straight to R2"""
+    
+    def setUp(self):
+        from .models import Book
+        self.server = FakeS3Server()
+        self.addCleanup(self.server.stop)
+        self.storage = self.server.storage()
+        self.field = Book._meta.get_field('pdf_file')
+    
+    def upload(self, data, filename='book.pdf'):
+        import requests
+        from .direct_uploads import create_upload, complete_upload
+        
+        plan = create_upload(self.field, filename, len(data), 'application/pdf', storage=self.storage)
+        parts = []
+        for number, url in enumerate(plan['urls'], 1):
+            chunk = data[(number - 1) * plan['part_size']:number * plan['part_size']]
+            response = requests.put(url, data=chunk)
+            parts.append({'PartNumber': number, 'ETag': response.headers['ETag']})
+        return plan, complete_upload(self.field, plan['upload'], parts, storage=self.storage)
+    
+    def test_multipart_upload_roundtrip(self):
+        """Test parts uploaded to presigned URLs are assembled into the object"""
+        from .direct_uploads import confirmed_name
+        
+        data = bytes(range(256)) * (40 * 1024)  # 10 МБ -> две части по 8 МБ
+        with self.settings(DIRECT_UPLOAD_PART_SIZE=8 * 1024 * 1024):
+            plan, token = self.upload(data)
+        self.assertEqual(len(plan['urls']), 2)
+        name = confirmed_name(token, 'core.book.pdf_file', self.storage)
+        self.assertTrue(name.startswith('books/pdfs/book'))
+        self.assertEqual(self.server.objects[f'media/{name}'], data)
+    
+    def test_form_field_accepts_signed_token_only(self):
+        """Test the admin form field stores the uploaded key and rejects forged tokens"""
+        from django.core.exceptions import ValidationError
+        from .direct_uploads import UploadToken, direct_formfield
+        
+        _, token = self.upload(b'%PDF-1.7 small')
+        with mock_storage(self.field, self.storage):
+            formfield = direct_formfield(self.field, '/admin/core/book/direct-upload/')
+            name = formfield.clean(UploadToken(token))
+            self.assertEqual(self.server.objects[f'media/{name}'], b'%PDF-1.7 small')
+            with self.assertRaises(ValidationError):
+                formfield.clean(UploadToken(token + 'x'))
+            self.assertIn('data-direct-upload-url="/admin/core/book/direct-upload/"', formfield.widget.render('pdf_file', None))
+    
+    def test_admin_endpoint_creates_upload(self):
+        """Test the admin endpoint returns presigned part URLs for staff users"""
+        import json
+        from django.contrib.auth.models import User
+        
+        User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        url = reverse('admin:core_book_direct_upload')
+        payload = {'action': 'create', 'field': 'core.book.pdf_file', 'filename': 'x.pdf', 'size': 100}
+        with mock_storage(self.field, self.storage):
+            response = self.client.post(url, json.dumps(payload), content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['urls']), 1)
+            payload['field'] = 'core.book.title'
+            response = self.client.post(url, json.dumps(payload), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            
+            response = self.client.get(reverse('admin:core_book_add'))
+            self.assertContains(response, 'data-direct-upload-field="core.book.pdf_file"')
+            self.assertContains(response, 'js/admin_direct_upload.js')
+
+
+def mock_storage(model_field, storage):
+    """Point a model field at another storage for the duration of a test"""
+    from unittest import mock
+    return mock.patch.object(model_field, 'storage', storage)
+
+
+class MediaUrlTest(TestCase):
+    """Tests for memoized public URLs of R2 storages"""
+    
+    def storage(self, **kwargs):
+        from .storage_backends import MediaStorage
+        return MediaStorage(
+            bucket_name='media-test', endpoint_url='https://account.r2.cloudflarestorage.com',
+            access_key='test', secret_key='test', region_name='auto', querystring_auth=False,
+            addressing_style='path', **kwargs,
+        )
+    
+    def test_url_matches_boto3_without_client(self):
+        """Test public URLs match S3Boto3Storage.url and do not create a boto3 client"""
+        from storages.backends.s3boto3 import S3Boto3Storage
+        
+        storage = self.storage()
+        names = ['books/covers/a b.jpg', 'books/covers/книга~1.w480.webp', 'publications/x+y(1).pdf']
+        urls = [storage.url(name) for name in names]
+        self.assertFalse(hasattr(storage._connections, 'connection'))
+        self.assertFalse(hasattr(storage._unsigned_connections, 'connection'))
+        self.assertEqual(urls, [S3Boto3Storage.url(storage, name) for name in names])
+    
+    def test_custom_domain_and_memo(self):
+        """Test custom domain URLs and that repeated names hit the memo"""
+        from .storage_backends import public_url
+        
+        storage = self.storage(custom_domain='cdn.example.com')
+        self.assertEqual(storage.url('books/a b.jpg'), 'https://cdn.example.com/media/books/a%20b.jpg')
+        hits = public_url.cache_info().hits
+        storage.url('books/a b.jpg')
+        self.assertEqual(public_url.cache_info().hits, hits + 1)
+
+
+class MediaDiskCacheTest(TestCase):
+    """Tests for the local disk cache in front of R2 media"""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from .storage_backends import CachedMediaStorage
+        self.server = FakeS3Server()
+        self.addCleanup(self.server.stop)
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        settings = self.settings(MEDIA_CACHE_DIR=self.root, MEDIA_CACHE_SIZE=1000, MEDIA_CACHE_REVALIDATE=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.storage = self.server.storage(CachedMediaStorage)
+    
+    def read(self, name):
+        with self.storage.open(name) as f:
+            return f.read()
+    
+    def test_read_through_and_etag_revalidation(self):
+        """Test repeated reads revalidate by ETag and changed objects are refetched"""
+        self.server.objects['media/a.txt'] = b'first'
+        self.assertEqual(self.read('a.txt'), b'first')
+        self.assertEqual(self.read('a.txt'), b'first')
+        self.assertEqual(self.server.gets, 2)
+        
+        self.server.objects['media/a.txt'] = b'second'
+        self.assertEqual(self.read('a.txt'), b'second')
+        with self.assertRaises(FileNotFoundError):
+            self.storage.open('missing.txt')
+    
+    def test_save_and_delete_invalidate(self):
+        """Test uploads and deletes drop the cached copy"""
+        import os
+        from unittest import mock
+        from django.core.files.base import ContentFile
+        
+        with mock.patch('core.compression.record'), self.settings(MEDIA_CONTENT_ADDRESSED=False):
+            self.storage.save('b.txt', ContentFile(b'v1'))
+        self.assertEqual(self.read('b.txt'), b'v1')
+        path = self.storage.disk_cache.path('media/b.txt')
+        self.assertTrue(os.path.exists(path))
+        self.storage.delete('b.txt')
+        self.assertFalse(os.path.exists(path))
+    
+    def test_lru_eviction(self):
+        """Test the least recently read copies are evicted over the size budget"""
+        import os
+        
+        for name in ('one', 'two', 'three'):
+            self.server.objects[f'media/{name}'] = name.encode() * 100
+        self.read('one')
+        self.read('two')
+        cache = self.storage.disk_cache
+        os.utime(cache.path('media/two'), (1, 1))
+        self.read('one')
+        self.read('three')
+        self.assertTrue(os.path.exists(cache.path('media/one')))
+        self.assertFalse(os.path.exists(cache.path('media/two')))
+        self.assertTrue(os.path.exists(cache.path('media/three')))
+
+
+    def test_eviction_runs_only_over_budget(self):
+        """Test misses under the size budget do not walk the cache directory"""
+        from unittest import mock
+        
+        for name in ('one', 'two', 'three'):
+            self.server.objects[f'media/{name}'] = name.encode() * 100
+        cache = self.storage.disk_cache
+        with mock.patch.object(cache, 'entries', wraps=cache.entries) as entries:
+            self.read('one')
+            self.read('two')
+            self.assertEqual(entries.call_count, 1)  # первый подсчет объема
+            self.read('three')
+            self.assertEqual(entries.call_count, 2)
+    
+    def test_oversized_object_kept_for_reader(self):
+        """Test an object larger than the budget is not evicted right after it is fetched"""
+        import os
+        
+        self.server.objects['media/big'] = b'x' * 2000
+        self.assertEqual(self.read('big'), b'x' * 2000)
+        self.assertTrue(os.path.exists(self.storage.disk_cache.path('media/big')))
+    
+    def test_open_falls_back_to_r2_when_copy_vanishes(self):
+        """Test a copy evicted by another process between fetch and open is streamed from R2"""
+        import os
+        from unittest import mock
+        
+        self.server.objects['media/c.txt'] = b'direct'
+        with mock.patch.object(self.storage.disk_cache, 'fetch', return_value=os.path.join(self.root, 'gone')):
+            self.assertEqual(self.read('c.txt'), b'direct')
+
+
+class ContentAddressedUploadTest(TestCase):
+    """Tests for upload normalization and content-hash file names"""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.core.cache import cache
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = self.settings(
+            MEDIA_ROOT=media_root, MEDIA_MAX_IMAGE_SIZE=800, IMAGE_DERIVATIVE_WIDTHS=(320,), PDF_PREVIEW_WIDTH=320,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+    
+    def test_exif_stripped_and_size_limited(self):
+        """Test originals are rotated by EXIF, downscaled and saved without EXIF"""
+        import io
+        from PIL import Image
+        from django.core.files.storage import default_storage
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90°
+        exif[0x010F] = 'Camera'
+        buffer = io.BytesIO()
+        Image.new('RGB', (1600, 1200), 'red').save(buffer, 'JPEG', exif=exif)
+        
+        name = default_storage.save('blog/IMG_0001.JPG', SimpleUploadedFile('IMG_0001.JPG', buffer.getvalue()))
+        self.assertRegex(name, r'^blog/[0-9a-f]{32}\.jpg$')
+        with default_storage.open(name) as f, Image.open(f) as image:
+            self.assertEqual(image.size, (600, 800))
+            self.assertFalse(image.getexif())
+    
+    def test_identical_uploads_share_one_file(self):
+        """Test re-uploading the same file reuses the stored object"""
+        import os
+        from django.conf import settings
+        
+        first = BlogPost.objects.create(title='One', content='Text', featured_image=make_image(name='a.png'))
+        second = BlogPost.objects.create(title='Two', content='Text', featured_image=make_image(name='b.png'))
+        self.assertEqual(first.featured_image.name, second.featured_image.name)
+        self.assertEqual(len(os.listdir(os.path.join(settings.MEDIA_ROOT, 'blog'))), 1)
+    
+    def test_shared_preview_kept_while_referenced(self):
+        """Test a preview shared by two records survives removing one PDF"""
+        from django.core.files.storage import default_storage
+        from .models import MediaReference
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Publication.objects.create(title='A', authors='X', year=2024, publication_type='article', pdf_file=make_pdf())
+            second = Publication.objects.create(title='B', authors='X', year=2024, publication_type='article', pdf_file=make_pdf())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        preview = first.pdf_preview.name
+        self.assertEqual(preview, second.pdf_preview.name)
+        self.assertEqual(MediaReference.objects.filter(name=preview).count(), 2)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            first.pdf_file = None
+            first.save()
+        self.assertTrue(default_storage.exists(preview))
+        self.assertEqual(list(MediaReference.objects.filter(name=preview).values_list('object_id', flat=True)), [str(second.pk)])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            second.pdf_file = None
+            second.save()
+        self.assertFalse(default_storage.exists(preview))
+
+
+class OrphanedMediaTest(TestCase):
+    """Tests for the orphaned media garbage collector"""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.core.cache import cache
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = self.settings(MEDIA_ROOT=self.media_root, IMAGE_DERIVATIVE_WIDTHS=(320,))
+        override.enable()
+        self.addCleanup(override.disable)
+    
+    def age_files(self):
+        import os
+        for directory, _, filenames in os.walk(self.media_root):
+            for filename in filenames:
+                os.utime(os.path.join(directory, filename), (1, 1))
+    
+    def test_replaced_files_collected(self):
+        """Test unused uploads are deleted, referenced ones kept"""
+        from io import StringIO
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from django.core.management import call_command
+        from .images import derivative_name
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            post = BlogPost.objects.create(title='Post', content='Text', featured_image=make_image(size=(400, 300)))
+        old = post.featured_image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            post.featured_image = make_image(size=(500, 300))
+            post.save()
+        used = default_storage.save('uploads/used.txt', ContentFile(b'used'))
+        unused = default_storage.save('uploads/unused.txt', ContentFile(b'unused'))
+        post.content = f'<p><img src="/media/{used}"></p>'
+        post.save()
+        
+        # Замененное изображение удалено сразу при сохранении, без сборщика
+        self.assertFalse(default_storage.exists(old))
+        default_storage.save('blog/images/lost.png', ContentFile(b'lost'))
+        self.age_files()
+        
+        out = StringIO()
+        call_command('collect_orphaned_media', '--dry-run', stdout=out)
+        self.assertIn('2 of 6 files are orphaned', out.getvalue())
+        self.assertTrue(default_storage.exists(unused))
+        
+        call_command('collect_orphaned_media', stdout=StringIO())
+        self.assertFalse(default_storage.exists('blog/images/lost.png'))
+        self.assertFalse(default_storage.exists(unused))
+        post.refresh_from_db()
+        self.assertTrue(default_storage.exists(post.featured_image.name))
+        self.assertTrue(default_storage.exists(derivative_name(post.featured_image.name, 320, 'webp')))
+        self.assertTrue(default_storage.exists(used))
+    
+    def test_recent_files_kept(self):
+        """Test files newer than the minimum age are not deleted"""
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from .media_gc import collect_orphans
+        
+        name = default_storage.save('uploads/new.txt', ContentFile(b'new'))
+        stats = collect_orphans(default_storage, dry_run=False)
+        self.assertEqual(stats['deleted'], 0)
+        self.assertTrue(default_storage.exists(name))
+    
+    def test_r2_listing_deleted_in_batches(self):
+        """Test R2 keys are listed page by page and deleted 1000 per request"""
+        from datetime import datetime, timezone
+        from unittest import mock
+        from .media_gc import collect_orphans
+        from .models import EditorUpload
+        from .storage_backends import MediaStorage
+        
+        keys = [f'media/uploads/{i:04d}.jpg' for i in range(2500)]
+        
+        class Client:
+            deletes = []
+            
+            def get_paginator(self, operation):
+                paginator = mock.Mock()
+                modified = datetime(2020, 1, 1, tzinfo=timezone.utc)
+                paginator.paginate.return_value = (
+                    {'Contents': [{'Key': key, 'LastModified': modified} for key in keys[start:start + 1000]]}
+                    for start in range(0, len(keys), 1000)
+                )
+                return paginator
+            
+            def delete_objects(self, Bucket, Delete):
+                self.deletes.append(len(Delete['Objects']))
+                locked = 'media/uploads/0007.jpg'
+                return {
+                    'Deleted': [{'Key': item['Key']} for item in Delete['Objects'] if item['Key'] != locked],
+                    'Errors': [{'Key': locked, 'Code': 'AccessDenied'}] if any(
+                        item['Key'] == locked for item in Delete['Objects']
+                    ) else [],
+                }
+        
+        for name in ('uploads/0006.jpg', 'uploads/0007.jpg'):
+            EditorUpload.objects.create(name=name, is_image=True, uploaded_at=datetime(2020, 1, 1, tzinfo=timezone.utc))
+        storage = MediaStorage(bucket_name='media-test')
+        connection = mock.Mock()
+        connection.meta.client = Client()
+        with mock.patch.object(MediaStorage, 'connection', new_callable=mock.PropertyMock, return_value=connection):
+            stats = collect_orphans(storage, dry_run=False)
+        self.assertEqual(stats['deleted'], 2499)
+        self.assertEqual(stats['errors'], ['media/uploads/0007.jpg: AccessDenied'])
+        self.assertEqual(Client.deletes, [1000, 1000, 500])
+        # Файл, который R2 не удалил, остается в реестре загрузок
+        self.assertEqual(list(EditorUpload.objects.values_list('name', flat=True)), ['uploads/0007.jpg'])
+
+
+class EditorUploadRegistryTest(TestCase):
+    """Tests for the CKEditor upload registry and paged browser"""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.contrib.auth.models import User
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = self.settings(MEDIA_ROOT=media_root, EDITOR_BROWSE_PER_PAGE=2)
+        override.enable()
+        self.addCleanup(override.disable)
+        User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.login(username='admin', password='pass')
+    
+    def test_upload_registered(self):
+        """Test CKEditor uploads are recorded with dimensions and thumbnail"""
+        from .models import EditorUpload
+        
+        response = self.client.post(reverse('ckeditor_upload'), {'upload': make_image(size=(300, 200), name='Фото.png')})
+        self.assertEqual(response.json()['uploaded'], '1')
+        upload = EditorUpload.objects.get()
+        self.assertEqual(upload.original_name, 'Фото.png')
+        self.assertEqual((upload.width, upload.height), (300, 200))
+        self.assertTrue(upload.is_image)
+        self.assertTrue(upload.thumbnail.endswith('_thumb.png'))
+        self.assertTrue(response.json()['url'].endswith(upload.name))
+    
+    def test_upload_measured_in_memory(self):
+        """Test registry dimensions and size come from the normalized upload, not from storage"""
+        from unittest import mock
+        from django.core.files.storage import default_storage
+        from .models import EditorUpload
+        
+        with self.settings(MEDIA_MAX_IMAGE_SIZE=150), \
+                mock.patch('core.editor_uploads.image_size') as image_size, \
+                mock.patch('core.storage_backends.LocalMediaStorage.size') as size:
+            self.client.post(reverse('ckeditor_upload'), {'upload': make_image(size=(300, 200))})
+        image_size.assert_not_called()
+        size.assert_not_called()
+        upload = EditorUpload.objects.get()
+        self.assertEqual((upload.width, upload.height), (150, 100))
+        with default_storage.open(upload.name) as f:
+            self.assertEqual(upload.size, len(f.read()))
+    
+    def test_browse_pages_through_registry(self):
+        """Test the browser pages by upload date and searches by original name"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import EditorUpload
+        
+        now = timezone.now()
+        for i in range(3):
+            EditorUpload.objects.create(name=f'uploads/{i}.png', original_name=f'photo{i}.png', is_image=True,
+                                        uploaded_at=now - timedelta(days=i))
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('ckeditor_browse'), {'CKEditorFuncNum': '1'})
+        registry_queries = [q['sql'] for q in queries.captured_queries if 'core_editorupload' in q['sql']]
+        self.assertEqual(len(registry_queries), 1)  # одна страница, без COUNT(*)
+        self.assertNotIn('COUNT(', registry_queries[0])
+        self.assertContains(response, 'photo0.png')
+        self.assertContains(response, 'photo1.png')
+        self.assertNotContains(response, 'photo2.png')
+        cursor = response.context['page_obj'].next_cursor
+        self.assertContains(response, 'CKEditorFuncNum=1')
+        
+        response = self.client.get(reverse('ckeditor_browse'), {'CKEditorFuncNum': '1', 'cursor': cursor})
+        self.assertContains(response, 'photo2.png')
+        response = self.client.get(reverse('ckeditor_browse'), {'q': 'photo1'})
+        self.assertEqual([f['name'] for f in response.context['files']], ['photo1.png'])
+    
+    def test_import_command(self):
+        """Test import_editor_uploads registers existing files once"""
+        from io import StringIO
+        from django.core.files.storage import default_storage
+        from django.core.management import call_command
+        from .models import EditorUpload
+        
+        name = default_storage.save('uploads/old.png', make_image(size=(120, 80)))
+        default_storage.save(name.replace('.png', '_thumb.png'), make_image(size=(75, 50)))
+        out = StringIO()
+        call_command('import_editor_uploads', stdout=out)
+        self.assertIn('1 uploads imported', out.getvalue())
+        upload = EditorUpload.objects.get()
+        self.assertEqual((upload.name, upload.width, upload.thumbnail), (name, 120, name.replace('.png', '_thumb.png')))
+        
+        call_command('import_editor_uploads', stdout=out)
+        self.assertIn('0 uploads imported, 1 already registered', out.getvalue())
@@ -0,0 +1,166 @@
+"""
+Нормализация загружаемых медиа файлов и имена по содержимому
+
+Раньше каждая повторная загрузка той же обложки или картинки CKEditor
+создавала новый объект со случайным суффиксом (file_overwrite = False), а
+оригиналы хранились в разрешении камеры вместе с EXIF (включая GPS).
+
+Теперь при сохранении через медиа хранилище (ContentAddressedMixin):
+    1. Изображения JPEG/PNG/WebP поворачиваются по EXIF и уменьшаются до
+       MEDIA_MAX_IMAGE_SIZE пикселей по большей стороне; EXIF удаляется.
+       Изображение без EXIF и в пределах размера сохраняется как есть
+       (без повторного сжатия).
+    2. Имя файла заменяется хешем содержимого в том же каталоге:
+       books/covers/photo.jpg -> books/covers/<sha256[:32]>.jpg. Одинаковые
+       загрузки получают одно имя, и объект загружается один раз.
+    3. Версии изображений (__w640.webp, _thumb CKEditor) строятся из имени
+       оригинала и тоже общие: существующая версия не загружается повторно.
+
+Один объект может использоваться несколькими записями, поэтому ссылки полей
+моделей на файлы хранятся в MediaReference. Файл удаляется, только когда
+на него не осталось других ссылок (release).
+"""
+
+import hashlib
+import io
+import os
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import models
+
+
+# Версии, имена которых строятся из имени оригинала (images.derivative_name, CKEditor)
+DERIVATIVE_RE = re.compile(r'(__w\d+|_thumb)$')
+CONTENT_NAME_RE = re.compile(r'^[0-9a-f]{32}$')
+
+# Форматы, которые нормализуются: PIL формат -> параметры сохранения
+NORMALIZED_FORMATS = {
+    'JPEG': {'quality': 90, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90, 'method': 6},
+}
+
+
+def is_derivative(name):
+    stem, _ = os.path.splitext(os.path.basename(name))
+    return bool(DERIVATIVE_RE.search(stem))
+
+
+def is_content_name(name):
+    """Имя по содержимому (или версия такого файла)"""
+    stem, _ = os.path.splitext(os.path.basename(name))
+    return bool(CONTENT_NAME_RE.match(DERIVATIVE_RE.sub('', stem)))
+
+
+def content_digest(content):
+    """SHA-256 содержимого файла (читается блоками, позиция — начало)"""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in iter(lambda: content.read(64 * 1024), b''):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def content_name(name, content):
+    """Имя файла по содержимому: <каталог>/<sha256[:32]><расширение>"""
+    directory, filename = os.path.split(name)
+    _, ext = os.path.splitext(filename)
+    return os.path.join(directory, content_digest(content)[:32] + ext.lower()).replace(os.sep, '/')
+
+
+def normalize_image(content):
+    """
+    Удалить EXIF и ограничить размер изображения
+
+    Args:
+        content: Файл (seekable)
+
+    Returns:
+        ContentFile | None: Нормализованное изображение или None, если файл
+        не изображение поддерживаемого формата или менять его не нужно
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    max_size = getattr(settings, 'MEDIA_MAX_IMAGE_SIZE', 2560)
+    content.seek(0)
+    try:
+        image = Image.open(content)
+        image_format = image.format
+        if image_format not in NORMALIZED_FORMATS or getattr(image, 'is_animated', False):
+            return None
+        exif = image.getexif()
+        if not exif and max(image.size) <= max_size:
+            return None
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+    finally:
+        content.seek(0)
+
+    if max(image.size) > max_size:
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L', 'CMYK'):
+        image = image.convert('RGB')
+
+    options = dict(NORMALIZED_FORMATS[image_format])
+    if image.info.get('icc_profile'):
+        options['icc_profile'] = image.info['icc_profile']
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+# --- Ссылки на файлы ---
+
+@lru_cache(maxsize=None)
+def file_fields(model):
+    """Имена FileField/ImageField модели"""
+    return tuple(field.name for field in model._meta.concrete_fields if isinstance(field, models.FileField))
+
+
+def sync_references(instance):
+    """Записать в MediaReference текущие файлы полей объекта"""
+    from .models import MediaReference
+
+    label = instance._meta.label_lower
+    for field_name in file_fields(type(instance)):
+        name = getattr(instance, field_name).name
+        lookup = {'model': label, 'object_id': str(instance.pk), 'field': field_name}
+        if name:
+            MediaReference.objects.update_or_create(**lookup, defaults={'name': name})
+        else:
+            MediaReference.objects.filter(**lookup).delete()
+
+
+def delete_references(instance):
+    from .models import MediaReference
+
+    MediaReference.objects.filter(model=instance._meta.label_lower, object_id=str(instance.pk)).delete()
+
+
+def is_shared(name, instance, field_name):
+    """Используется ли файл name другими записями (кроме поля field_name объекта)"""
+    from .models import MediaReference
+
+    return MediaReference.objects.filter(name=name).exclude(
+        model=instance._meta.label_lower, object_id=str(instance.pk), field=field_name,
+    ).exists()
+
+
+def release(storage, name, instance, field_name, derivatives=()):
+    """
+    Удалить файл поля объекта и его версии, если они больше никому не нужны
+
+    Returns:
+        bool: Файл удален
+    """
+    if is_shared(name, instance, field_name):
+        return False
+    for derivative in derivatives:
+        storage.delete(derivative)
+    storage.delete(name)
+    return True
@@ -1,21 +1,57 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from django.core.mail import send_mail
-from django.conf import settings
-from django.db import models
-from django.db.models import Q
-from django.core.paginator import Paginator
-from django.http import HttpResponseNotFound, HttpResponseServerError
+from django.db import models, transaction
+from django.http import Http404, HttpResponseNotFound, HttpResponseServerError
 from .models import (
-    Profile, Service, Publication, Project, BlogPost,
+    Service, Publication, Project, BlogPost,
     Achievement, Testimonial, Book, BookOrder
 )
 from .forms import ServiceOrderForm, ContactForm, BookOrderForm
+from .caching import get_profile, cached_page, conditional_page, latest_change
+from .counters import record_view
+from .search import search_publications
+from .pagination import KeysetPaginator
+from .facets import get_facets
+from .emails import queue_contact_emails, queue_service_order_emails, queue_book_order_emails
+from .tags import normalize, with_tags, with_keywords, get_tag_cloud, get_keyword_cloud
 
 
+# Сортировка списков для keyset-пагинации (Meta.ordering + pk для уникальности)
+PUBLICATION_ORDERING = ('-year', 'title', 'pk')
+BLOG_ORDERING = ('-published_at', '-created_at', '-pk')
+BOOK_ORDERING = ('-is_featured', 'order', '-publication_year', 'pk')
+
+
+def _object_change(queryset, **lookup):
+    """Время изменения одного объекта для условных запросов"""
+    updated_at = queryset.filter(**lookup).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    return updated_at, 1
+
+
+def _detail_change(queryset, related, **lookup):
+    """
+    Время изменения объекта и связанных объектов, показанных на его странице
+
+    Args:
+        queryset: Опубликованные объекты
+        related: Функция (объект) -> queryset связанных объектов (похожие статьи, книги)
+    """
+    obj = queryset.filter(**lookup).first()
+    if obj is None:
+        return None
+    state = latest_change(related(obj))
+    if state is None:
+        return obj.updated_at, 1
+    return max(obj.updated_at, state[0]), state[1] + 1
+
+
+@cached_page(Service, Publication, Testimonial, BlogPost, Book)
 def index(request):
     """Главная страница"""
-    profile = Profile.objects.first()
+    profile = get_profile(request)
     services = Service.objects.filter(is_active=True)[:6]
     publications = Publication.objects.filter(is_featured=True)[:3]
     testimonials = Testimonial.objects.filter(is_approved=True)[:3]
@@ -33,9 +69,10 @@ def index(request):
     return render(request, 'index.html', context)
 
 
+@cached_page(Achievement)
 def about(request):
     """О социологе"""
-    profile = Profile.objects.first()
+    profile = get_profile(request)
     achievements = Achievement.objects.all()[:10]
     
     context = {
@@ -45,6 +82,7 @@ def about(request):
     return render(request, 'about.html', context)
 
 
+@cached_page(Service)
 def services(request):
     """Услуги"""
     services_list = Service.objects.filter(is_active=True)
@@ -55,6 +93,7 @@ def services(request):
     return render(request, 'services.html', context)
 
 
+@cached_page(Project, params=('status',))
 def portfolio(request):
     """Портфолио - проекты"""
     projects_list = Project.objects.filter(is_active=True)
@@ -72,6 +111,8 @@ def portfolio(request):
     return render(request, 'portfolio.html', context)
 
 
+@conditional_page(lambda request: latest_change(Publication.objects.all()))
+@cached_page(Publication, params=('type', 'year', 'keyword', 'search', 'page', 'cursor'))
 def publications(request):
     """Публикации"""
     publications_list = Publication.objects.all()
@@ -85,26 +126,34 @@ def publications(request):
     if year:
         publications_list = publications_list.filter(year=year)
     
+    # Фильтрация по ключевому слову (точное совпадение)
+    keyword = request.GET.get('keyword')
+    if keyword:
+        publications_list = publications_list.filter(keyword_links__keyword__normalized=normalize(keyword))
+    
     # Поиск
     search = request.GET.get('search')
     if search:
-        publications_list = publications_list.filter(
-            Q(title__icontains=search) |
-            Q(authors__icontains=search) |
-            Q(keywords__icontains=search)
-        )
+        publications_list = search_publications(publications_list, search)
     
-    # Пагинация
-    paginator = Paginator(publications_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Пагинация (результаты поиска сортируются по релевантности, без курсора)
+    ordering = None if search else PUBLICATION_ORDERING
+    paginator = KeysetPaginator(with_keywords(publications_list), 10, ordering)
+    page_obj = paginator.get_page(request.GET.get('page'), request.GET.get('cursor'))
     
-    # Получаем уникальные годы для фильтра
-    years = Publication.objects.values_list('year', flat=True).distinct().order_by('-year')
+    # Значения фильтров с количеством публикаций
+    years = get_facets('publication_year')
+    type_counts = dict(get_facets('publication_type'))
+    publication_types = [
+        (value, label, type_counts.get(value, 0)) for value, label in Publication.PUBLICATION_TYPES
+    ]
     
     context = {
         'page_obj': page_obj,
         'years': years,
+        'publication_types': publication_types,
+        'keyword_cloud': get_keyword_cloud(),
+        'current_keyword': keyword,
         'current_type': pub_type,
         'current_year': year,
         'search_query': search,
@@ -112,9 +161,11 @@ def publications(request):
     return render(request, 'publications.html', context)
 
 
+@conditional_page(lambda request, pk: _object_change(Publication.objects.all(), pk=pk))
+@cached_page(Publication)
 def publication_detail(request, pk):
     """Детальная страница публикации"""
-    publication = get_object_or_404(Publication, pk=pk)
+    publication = get_object_or_404(with_keywords(Publication.objects.all()), pk=pk)
     
     context = {
         'publication': publication,
@@ -122,6 +173,8 @@ def publication_detail(request, pk):
     return render(request, 'publication_detail.html', context)
 
 
+@conditional_page(lambda request: latest_change(BlogPost.objects.filter(is_published=True)))
+@cached_page(BlogPost, params=('category', 'tag', 'page', 'cursor'))
 def blog(request):
     """Блог"""
     posts_list = BlogPost.objects.filter(is_published=True)
@@ -131,37 +184,54 @@ def blog(request):
     if category:
         posts_list = posts_list.filter(category=category)
     
-    # Фильтрация по тегу
+    # Фильтрация по тегу (точное совпадение)
     tag = request.GET.get('tag')
     if tag:
-        posts_list = posts_list.filter(tags__icontains=tag)
+        posts_list = posts_list.filter(tag_links__tag__normalized=normalize(tag))
     
     # Пагинация
-    paginator = Paginator(posts_list, 6)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(with_tags(posts_list), 6, BLOG_ORDERING)
+    page_obj = paginator.get_page(request.GET.get('page'), request.GET.get('cursor'))
     
-    # Получаем уникальные категории
-    categories = BlogPost.objects.filter(is_published=True).values_list('category', flat=True).distinct()
+    # Категории с количеством статей
+    categories = get_facets('blog_category')
     
     context = {
         'page_obj': page_obj,
         'categories': categories,
         'current_category': category,
+        'tag_cloud': get_tag_cloud(),
+        'current_tag': tag,
     }
     return render(request, 'blog.html', context)
 
 
 def blog_detail(request, slug):
     """Детальная страница статьи блога"""
-    post = get_object_or_404(BlogPost, slug=slug, is_published=True)
-    post.increment_views()
-    
-    # Похожие статьи
-    related_posts = BlogPost.objects.filter(
+    response = _blog_detail_page(request, slug)
+    # Просмотр учитывается и при отдаче страницы из кеша
+    if response.status_code in (200, 304):
+        record_view(BlogPost, slug)
+    return response
+
+
+def _related_posts(post):
+    """Похожие статьи: опубликованные статьи той же категории"""
+    return BlogPost.objects.filter(
         is_published=True,
         category=post.category
-    ).exclude(pk=post.pk)[:3]
+    ).exclude(pk=post.pk)
+
+
+@conditional_page(lambda request, slug: _detail_change(
+    BlogPost.objects.filter(is_published=True), _related_posts, slug=slug
+))
+@cached_page(BlogPost)
+def _blog_detail_page(request, slug):
+    post = get_object_or_404(with_tags(BlogPost.objects.all()), slug=slug, is_published=True)
+    
+    # Похожие статьи
+    related_posts = _related_posts(post)[:3]
     
     context = {
         'post': post,
@@ -170,26 +240,30 @@ def blog_detail(request, slug):
     return render(request, 'blog_detail.html', context)
 
 
-def contact(request):
+def _save_with_notifications(form, queue_emails):
+    """
+    Сохранить форму вместе с уведомлениями в outbox (одна транзакция)
+
+    Уведомления отправляет воркер process_outbox после коммита.
+
+    Returns:
+        Сохраненный объект
+    """
+    with transaction.atomic():
+        obj = form.save()
+        queue_emails(obj)
+    return obj
+
+
+async def contact(request):
     """Контакты"""
-    profile = Profile.objects.first()
+    profile = await sync_to_async(get_profile)(request)
     
     if request.method == 'POST':
         form = ContactForm(request.POST)
-        if form.is_valid():
-            contact_message = form.save()
-            
-            # Отправка email администратору
-            try:
-                send_mail(
-                    subject=f'Новое сообщение: {contact_message.subject}',
-                    message=f'От: {contact_message.name} ({contact_message.email})\n\n{contact_message.message}',
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[settings.ADMIN_EMAIL],
-                    fail_silently=False,
-                )
-            except Exception as e:
-                print(f"Email error: {e}")
+        if await sync_to_async(form.is_valid)():
+            # Письмо администратору ставится в очередь вместе с сообщением
+            contact_message = await sync_to_async(_save_with_notifications)(form, queue_contact_emails)
             
             messages.success(request, 'Спасибо! Ваше сообщение успешно отправлено.')
             return redirect('contact')
@@ -200,41 +274,23 @@ def contact(request):
         'profile': profile,
         'form': form,
     }
-    return render(request, 'contact.html', context)
+    return await sync_to_async(render)(request, 'contact.html', context)
 
 
-def order_service(request, service_id=None):
+async def order_service(request, service_id=None):
     """Заказ услуги"""
     initial_data = {}
     if service_id:
-        service = get_object_or_404(Service, pk=service_id, is_active=True)
+        service = await Service.objects.filter(pk=service_id, is_active=True).afirst()
+        if service is None:
+            raise Http404('Услуга не найдена')
         initial_data['service'] = service
     
     if request.method == 'POST':
         form = ServiceOrderForm(request.POST)
-        if form.is_valid():
-            order = form.save()
-            
-            # Отправка email администратору
-            try:
-                send_mail(
-                    subject=f'Новый заказ услуги: {order.service.title}',
-                    message=f'Клиент: {order.full_name}\nEmail: {order.email}\nТелефон: {order.phone}\n\nОписание: {order.message}',
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[settings.ADMIN_EMAIL],
-                    fail_silently=False,
-                )
-                
-                # Отправка подтверждения клиенту
-                send_mail(
-                    subject='Подтверждение заказа услуги',
-                    message=f'Здравствуйте, {order.full_name}!\n\nВаш заказ услуги "{order.service.title}" принят. Мы свяжемся с вами в ближайшее время.\n\nС уважением,\nАхмедова Феруза Медетовна',
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[order.email],
-                    fail_silently=False,
-                )
-            except Exception as e:
-                print(f"Email error: {e}")
+        if await sync_to_async(form.is_valid)():
+            # Заказ, уведомление в Telegram и письма сохраняются вместе
+            order = await sync_to_async(_save_with_notifications)(form, queue_service_order_emails)
             
             messages.success(request, 'Спасибо! Ваша заявка успешно отправлена. Мы свяжемся с вами в ближайшее время.')
             return redirect('services')
@@ -244,7 +300,7 @@ def order_service(request, service_id=None):
     context = {
         'form': form,
     }
-    return render(request, 'order_service.html', context)
+    return await sync_to_async(render)(request, 'order_service.html', context)
 
 
 def custom_404(request, exception):
@@ -257,6 +313,8 @@ def custom_500(request):
     return HttpResponseServerError(render(request, '500.html', status=500))
 
 
+@conditional_page(lambda request: latest_change(Book.objects.filter(is_available=True)))
+@cached_page(Book, params=('year', 'page', 'cursor'))
 def books(request):
     """Список книг"""
     books_list = Book.objects.filter(is_available=True)
@@ -267,12 +325,11 @@ def books(request):
         books_list = books_list.filter(publication_year=year)
     
     # Пагинация
-    paginator = Paginator(books_list, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(books_list, 9, BOOK_ORDERING)
+    page_obj = paginator.get_page(request.GET.get('page'), request.GET.get('cursor'))
     
-    # Получаем уникальные годы для фильтра
-    years = Book.objects.values_list('publication_year', flat=True).distinct().order_by('-publication_year')
+    # Годы с количеством книг
+    years = get_facets('book_year')
     
     context = {
         'page_obj': page_obj,
@@ -284,15 +341,31 @@ def books(request):
 
 def book_detail(request, slug):
     """Детальная страница книги"""
-    book = get_object_or_404(Book, slug=slug, is_available=True)
-    book.increment_views()
-    
-    # Похожие книги (по автору или году)
-    related_books = Book.objects.filter(
+    response = _book_detail_page(request, slug)
+    # Просмотр учитывается и при отдаче страницы из кеша
+    if response.status_code in (200, 304):
+        record_view(Book, slug)
+    return response
+
+
+def _related_books(book):
+    """Похожие книги: доступные книги того же автора или года"""
+    return Book.objects.filter(
         is_available=True
     ).filter(
         models.Q(author=book.author) | models.Q(publication_year=book.publication_year)
-    ).exclude(pk=book.pk)[:3]
+    ).exclude(pk=book.pk)
+
+
+@conditional_page(lambda request, slug: _detail_change(
+    Book.objects.filter(is_available=True), _related_books, slug=slug
+))
+@cached_page(Book)
+def _book_detail_page(request, slug):
+    book = get_object_or_404(Book, slug=slug, is_available=True)
+    
+    # Похожие книги (по автору или году)
+    related_books = _related_books(book)[:3]
     
     context = {
         'book': book,
@@ -301,41 +374,20 @@ def book_detail(request, slug):
     return render(request, 'book_detail.html', context)
 
 
-def order_book(request, book_id=None):
+async def order_book(request, book_id=None):
     """Заказ книги"""
     initial_data = {}
     if book_id:
-        book = get_object_or_404(Book, pk=book_id, is_available=True)
+        book = await Book.objects.filter(pk=book_id, is_available=True).afirst()
+        if book is None:
+            raise Http404('Книга не найдена')
         initial_data['book'] = book
     
     if request.method == 'POST':
         form = BookOrderForm(request.POST)
-        if form.is_valid():
-            order = form.save()
-            
-            # Отправка email администратору
-            try:
-                total_price = order.get_total_price()
-                price_info = f"Общая стоимость: {total_price} ₽" if total_price else "Цена не указана"
-                
-                send_mail(
-                    subject=f'Новый заказ книги: {order.book.title}',
-                    message=f'Клиент: {order.full_name}\nEmail: {order.email}\nТелефон: {order.phone}\nАдрес: {order.address}\nКоличество: {order.quantity}\n{price_info}\n\nДополнительно: {order.message}',
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[settings.ADMIN_EMAIL],
-                    fail_silently=False,
-                )
-                
-                # Отправка подтверждения клиенту
-                send_mail(
-                    subject='Подтверждение заказа книги',
-                    message=f'Здравствуйте, {order.full_name}!\n\nВаш заказ книги "{order.book.title}" (количество: {order.quantity}) принят. Мы свяжемся с вами в ближайшее время для уточнения деталей доставки.\n\n{price_info}\n\nС уважением,\nАхмедова Феруза Медетовна',
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[order.email],
-                    fail_silently=False,
-                )
-            except Exception as e:
-                print(f"Email error: {e}")
+        if await sync_to_async(form.is_valid)():
+            # Заказ, уведомление в Telegram и письма сохраняются вместе
+            order = await sync_to_async(_save_with_notifications)(form, queue_book_order_emails)
             
             messages.success(request, f'Спасибо! Ваш заказ книги "{order.book.title}" успешно оформлен. Мы свяжемся с вами в ближайшее время.')
             return redirect('books')
@@ -345,5 +397,4 @@ def order_book(request, book_id=None):
     context = {
         'form': form,
     }
-    return render(request, 'order_book.html', context)
-
+    return await sync_to_async(render)(request, 'order_book.html', context)
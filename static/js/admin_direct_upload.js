@@ -0,0 +1,109 @@
+// Direct-to-R2 uploads for admin file fields (see core/direct_uploads.py)
+//
+// The browser uploads the file in parts straight to presigned R2 URLs and the
+// form only submits a signed token. If anything fails, the file stays in the
+// input and is submitted the usual way.
+
+(function() {
+    'use strict';
+
+    const CONCURRENCY = 4;
+    const pending = new Set();
+
+    function csrfToken() {
+        const input = document.querySelector('input[name="csrfmiddlewaretoken"]');
+        return input ? input.value : '';
+    }
+
+    async function post(url, payload) {
+        const response = await fetch(url, {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrfToken()},
+            body: JSON.stringify(payload),
+        });
+        const data = await response.json().catch(function() { return {}; });
+        if (!response.ok) {
+            throw new Error(data.error || ('HTTP ' + response.status));
+        }
+        return data;
+    }
+
+    async function uploadParts(file, plan, onProgress) {
+        const parts = new Array(plan.urls.length);
+        let next = 0;
+        let done = 0;
+
+        async function worker() {
+            while (next < plan.urls.length) {
+                const index = next++;
+                const blob = file.slice(index * plan.part_size, (index + 1) * plan.part_size);
+                const response = await fetch(plan.urls[index], {method: 'PUT', body: blob});
+                const etag = response.headers.get('ETag');
+                if (!response.ok) {
+                    throw new Error('R2: HTTP ' + response.status);
+                }
+                if (!etag) {
+                    throw new Error('R2 не вернул ETag (проверьте ExposeHeaders в CORS bucket)');
+                }
+                parts[index] = {PartNumber: index + 1, ETag: etag};
+                onProgress(++done / plan.urls.length);
+            }
+        }
+
+        const workers = [];
+        for (let i = 0; i < Math.min(CONCURRENCY, plan.urls.length); i++) {
+            workers.push(worker());
+        }
+        await Promise.all(workers);
+        return parts;
+    }
+
+    async function upload(input) {
+        const file = input.files[0];
+        const url = input.dataset.directUploadUrl;
+        const field = input.dataset.directUploadField;
+        const hidden = input.form.querySelector('input[name="' + input.name + '__direct"]');
+        const status = hidden.nextElementSibling;
+
+        hidden.value = '';
+        status.textContent = 'Загрузка в хранилище…';
+        pending.add(input);
+        let plan = null;
+        try {
+            plan = await post(url, {
+                action: 'create', field: field, filename: file.name,
+                size: file.size, content_type: file.type,
+            });
+            const parts = await uploadParts(file, plan, function(progress) {
+                status.textContent = 'Загрузка в хранилище: ' + Math.round(progress * 100) + '%';
+            });
+            const result = await post(url, {action: 'complete', field: field, upload: plan.upload, parts: parts});
+            hidden.value = result.file;
+            // Файл уже в R2: форма отправит только токен
+            input.value = '';
+            status.textContent = '✓ ' + file.name + ' загружен';
+        } catch (error) {
+            if (plan) {
+                post(url, {action: 'abort', field: field, upload: plan.upload}).catch(function() {});
+            }
+            status.textContent = 'Прямая загрузка не удалась (' + error.message + '), файл будет отправлен с формой';
+        } finally {
+            pending.delete(input);
+        }
+    }
+
+    document.addEventListener('change', function(event) {
+        const input = event.target;
+        if (input.matches && input.matches('input[type="file"][data-direct-upload-url]') && input.files.length) {
+            upload(input);
+        }
+    });
+
+    document.addEventListener('submit', function(event) {
+        if (pending.size) {
+            event.preventDefault();
+            alert('Дождитесь окончания загрузки файлов');
+        }
+    }, true);
+})();